@@ -0,0 +1,144 @@
+"""
+Non-blocking structured logging for HRMS Location Tracking System.
+
+settings.LOGGING_CONFIG points at configure_logging(), which applies the
+LOGGING dict and then moves the handlers of every configured logger behind a
+queue. Request threads only append the LogRecord to the queue; a
+QueueListener thread formats it (JSON by default) and writes it to the
+console/file, so slow disks or consoles no longer add to request latency.
+
+- Records are enqueued unformatted: messages logged with %-style arguments
+  are only interpolated on the listener thread
+- When the queue is full, records are dropped instead of blocking
+- SamplingFilter keeps a fraction of high-volume INFO messages
+  (settings.LOG_SAMPLE_RATES)
+
+Listener threads do not survive fork(); run with workers that set up Django
+themselves (the default for gunicorn/uwsgi without preloading).
+"""
+import atexit
+import json
+import logging
+import logging.config
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+from django.conf import settings
+
+_listeners = []
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line. Attributes passed through
+    `extra=` are included as top-level fields.
+    """
+    RESERVED = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+        }
+        payload.update(
+            (key, value) for key, value in vars(record).items() if key not in self.RESERVED
+        )
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of INFO/DEBUG records whose message template starts
+    with one of the configured prefixes, e.g. {'Location created': 0.1}.
+    Kept records carry a `sample_rate` attribute so counts can be scaled back.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or not isinstance(record.msg, str):
+            return True
+        for prefix, rate in self.rates.items():
+            if record.msg.startswith(prefix):
+                if rate >= 1:
+                    return True
+                record.sample_rate = rate
+                return random.random() < rate
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never formats on the caller's thread and drops records
+    instead of blocking or raising when the queue is full.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens in the listener thread
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def install_queue(logger, queue_size):
+    """
+    Move the logger's handlers behind a bounded queue served by a
+    QueueListener thread. Returns the started listener, or None when the
+    logger has no handlers.
+    """
+    handlers = list(logger.handlers)
+    if not handlers:
+        return None
+
+    log_queue = queue.Queue(queue_size)
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(NonBlockingQueueHandler(log_queue))
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def stop_listeners():
+    """
+    Flush and stop every listener thread.
+    """
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def configure_logging(config):
+    """
+    LOGGING_CONFIG callable: apply the LOGGING dict, then queue the
+    handlers of every configured logger.
+    """
+    stop_listeners()
+    logging.config.dictConfig(config)
+
+    queue_size = getattr(settings, 'LOG_QUEUE_SIZE', 10000)
+    for name in config.get('loggers', {}):
+        listener = install_queue(logging.getLogger(name), queue_size)
+        if listener:
+            _listeners.append(listener)
+
+
+atexit.register(stop_listeners)
@@ -1,9 +1,22 @@
 """
 Custom middleware for HRMS Location Tracking System
 """
+import logging
+import math
+import time
+import zlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
 from django.shortcuts import redirect
 from django.contrib import messages
 
+from .routers import choose_replica, current_replica
+
+logger = logging.getLogger('location')
+
 
 class RoleBasedAccessMiddleware:
     """
@@ -54,3 +67,226 @@ class RoleBasedAccessMiddleware:
         
         response = self.get_response(request)
         return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Middleware to serve safe reads from read replicas:
+    - GET/HEAD requests to views in settings.REPLICA_READ_VIEWS use a replica
+    - After a successful write, the user is pinned to the primary for
+      REPLICA_PIN_SECONDS so they always read their own writes
+    
+    The pin is stored in the cache, so production needs a cache shared
+    by all worker processes.
+    """
+    
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        token = current_replica.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_replica.reset(token)
+        
+        if (request.method not in self.SAFE_METHODS and
+                response.status_code < 400 and
+                request.user.is_authenticated):
+            cache.set(self._pin_key(request.user.id), True, settings.REPLICA_PIN_SECONDS)
+        
+        return response
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in self.SAFE_METHODS:
+            return None
+        if request.resolver_match.view_name not in settings.REPLICA_READ_VIEWS:
+            return None
+        
+        # Resolve the user on the primary before switching
+        user = request.user
+        if user.is_authenticated and cache.get(self._pin_key(user.id)):
+            return None
+        
+        current_replica.set(choose_replica())
+        return None
+    
+    @staticmethod
+    def _pin_key(user_id):
+        return f'db_pin:{user_id}'
+
+
+class IngestAdmissionMiddleware:
+    """
+    Middleware to cap the number of location ingest requests in flight
+    across all worker processes:
+    - Writes to views in settings.INGEST_VIEWS take a slot from a counter
+      kept in the cache
+    - Beyond INGEST_MAX_CONCURRENCY the request is shed with 429 and
+      Retry-After before it reaches the database
+    
+    Slots are counted per SLOT_BUCKET_SECONDS bucket of the time they were
+    taken, and in-flight requests are the sum of the buckets of the last
+    INGEST_SLOT_TTL seconds. A slot leaked by a crashed worker therefore
+    stops counting after INGEST_SLOT_TTL seconds, however busy ingest is.
+    """
+    
+    COUNTER_KEY = 'location:ingest_in_flight'
+    SLOT_BUCKET_SECONDS = 5
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            bucket = getattr(request, '_ingest_slot', None)
+            if bucket is not None:
+                self._release(bucket)
+    
+    def _key(self, bucket):
+        return f'{self.COUNTER_KEY}:{bucket}'
+    
+    def _release(self, bucket):
+        key = self._key(bucket)
+        try:
+            remaining = cache.decr(key)
+        except ValueError:
+            # The bucket expired while the request was running
+            return
+        if remaining < 0:
+            cache.incr(key, -remaining)
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method != 'POST':
+            return None
+        if request.resolver_match.view_name not in settings.INGEST_VIEWS:
+            return None
+        
+        ttl = settings.INGEST_SLOT_TTL
+        bucket = int(time.time() // self.SLOT_BUCKET_SECONDS)
+        key = self._key(bucket)
+        # Kept until the bucket's last slot has stopped counting
+        cache.add(key, 0, ttl + self.SLOT_BUCKET_SECONDS)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, ttl + self.SLOT_BUCKET_SECONDS)
+        
+        buckets = math.ceil(ttl / self.SLOT_BUCKET_SECONDS)
+        counts = cache.get_many([self._key(bucket - offset) for offset in range(buckets)])
+        in_flight = sum(max(count, 0) for count in counts.values())
+        
+        if in_flight > settings.INGEST_MAX_CONCURRENCY:
+            self._release(bucket)
+            response = JsonResponse(
+                {'error': 'Server is busy, please retry later'},
+                status=429
+            )
+            response['Retry-After'] = str(settings.INGEST_RETRY_AFTER)
+            return response
+        
+        request._ingest_slot = bucket
+        return None
+
+
+class ResponseCompressionMiddleware:
+    """
+    Middleware to compress API list/export responses:
+    - Only views in settings.COMPRESSED_VIEWS are compressed (HTML pages carry
+      CSRF tokens and are left alone to avoid BREACH-style attacks)
+    - gzip or deflate is negotiated from Accept-Encoding, honouring q-values
+    - Streaming responses are compressed chunk by chunk
+    """
+    
+    MIN_LENGTH = 200
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not getattr(request, '_compress_response', False):
+            return response
+        
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.status_code != 200 or response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and len(response.content) < self.MIN_LENGTH:
+            return response
+        
+        encoding = self.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        
+        level = settings.RESPONSE_COMPRESSION_LEVEL
+        if response.streaming:
+            response.streaming_content = self._compress_stream(
+                response.streaming_content, encoding, level
+            )
+            del response['Content-Length']
+        else:
+            compressor = self._compressor(encoding, level)
+            original_length = len(response.content)
+            response.content = compressor.compress(response.content) + compressor.flush()
+            response['Content-Length'] = str(len(response.content))
+            logger.debug(
+                "Compressed %s with %s: %s -> %s bytes",
+                request.path, encoding, original_length, len(response.content)
+            )
+        
+        # The compressed body differs byte-for-byte from the original one
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.resolver_match.view_name in settings.COMPRESSED_VIEWS:
+            request._compress_response = True
+        return None
+    
+    @staticmethod
+    def negotiate(accept_encoding):
+        """
+        Pick gzip or deflate from an Accept-Encoding header, or None.
+        """
+        weights = {}
+        for item in accept_encoding.split(','):
+            parts = item.strip().split(';')
+            coding = parts[0].strip().lower()
+            quality = 1.0
+            for param in parts[1:]:
+                name, _, value = param.strip().partition('=')
+                if name.strip() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            weights[coding] = quality
+        
+        candidates = []
+        for preference, coding in enumerate(('gzip', 'deflate')):
+            quality = weights.get(coding, weights.get('*', 0.0))
+            if quality > 0:
+                candidates.append((-quality, preference, coding))
+        return min(candidates)[2] if candidates else None
+    
+    @staticmethod
+    def _compressor(encoding, level):
+        wbits = 16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS
+        return zlib.compressobj(level, zlib.DEFLATED, wbits)
+    
+    def _compress_stream(self, chunks, encoding, level):
+        compressor = self._compressor(encoding, level)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            # Sync flush so clients receive data as it is produced
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
@@ -0,0 +1,127 @@
+"""
+Database routing for HRMS Location Tracking System.
+
+Location rows live on the shard owning their employee when sharding is
+enabled (see location/sharding.py).
+
+Other writes always go to the primary ('default'). Reads go to a read replica only
+while ReplicaRoutingMiddleware has selected one for the current request,
+i.e. for safe requests to the views in settings.REPLICA_READ_VIEWS by users
+who have not written recently.
+"""
+import itertools
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+from location.sharding import shard_aliases, shard_for_employee
+
+logger = logging.getLogger('location')
+
+# Replica alias selected for the current request, if any
+current_replica = ContextVar('current_replica', default=None)
+
+_unhealthy_until = {}
+_lock = threading.Lock()
+_cycle = None
+
+
+def replica_aliases():
+    """
+    Return the configured replica aliases.
+    """
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+def _is_healthy(alias):
+    """
+    Check that a replica accepts connections. Failures are remembered for
+    REPLICA_RETRY_SECONDS so a dead replica is not retried on every request.
+    """
+    if _unhealthy_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+        return True
+    except Exception as e:
+        retry = getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+        _unhealthy_until[alias] = time.monotonic() + retry
+        logger.warning(f"Replica {alias} unavailable, skipping for {retry}s: {str(e)}")
+        return False
+
+
+def choose_replica():
+    """
+    Pick the next healthy replica in round-robin order, or None if there is none.
+    """
+    global _cycle
+
+    aliases = replica_aliases()
+    if not aliases:
+        return None
+
+    with _lock:
+        if _cycle is None:
+            _cycle = itertools.cycle(aliases)
+        candidates = [next(_cycle) for _ in aliases]
+
+    for alias in candidates:
+        if _is_healthy(alias):
+            return alias
+    return None
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to the replica selected for the request, everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = current_replica.get()
+        # Reads inside a write transaction must see that transaction
+        if alias is None or connections['default'].in_atomic_block:
+            return 'default'
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+
+class LocationShardRouter:
+    """
+    Route Location reads/writes to the owning shard when the employee is known
+    from the hints (a Location instance or the User of a related manager).
+    Other queries fall through to the next router.
+    """
+
+    def _shard(self, model, hints):
+        if model._meta.label != 'location.Location' or not shard_aliases():
+            return None
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if instance._meta.label == 'location.Location':
+            return shard_for_employee(instance.employee_id)
+        if instance._meta.label == settings.AUTH_USER_MODEL:
+            return shard_for_employee(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._shard(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Locations on a shard still reference users on the primary
+        if 'location.Location' in (obj1._meta.label, obj2._meta.label):
+            return True
+        return None
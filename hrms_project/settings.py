@@ -77,6 +77,12 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Route safe reads to read replicas (needs request.user)
+    'hrms_project.middleware.ReplicaRoutingMiddleware',
+    # Shed ingest load before it reaches the database
+    'hrms_project.middleware.IngestAdmissionMiddleware',
+    # gzip/deflate for API list/export responses
+    'hrms_project.middleware.ResponseCompressionMiddleware',
     # Custom middleware for role-based access control
     'hrms_project.middleware.RoleBasedAccessMiddleware',
 ]
@@ -105,21 +111,92 @@ WSGI_APPLICATION = 'hrms_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.mysql'),
-        'NAME': os.getenv('DB_NAME', 'hrms_location_db'),
+DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.mysql')
+
+
+def database_config(name, host):
+    """
+    Build a DATABASES entry for the configured engine.
+    For SQLite, `name` is the database file (relative to BASE_DIR) and `host` is ignored.
+    """
+    if DB_ENGINE == 'django.db.backends.sqlite3':
+        return {
+            'ENGINE': DB_ENGINE,
+            'NAME': BASE_DIR / name,
+        }
+    return {
+        'ENGINE': DB_ENGINE,
+        'NAME': name,
         'USER': os.getenv('DB_USER', 'root'),
         'PASSWORD': os.getenv('DB_PASSWORD', ''),
-        'HOST': os.getenv('DB_HOST', 'localhost'),
+        'HOST': host,
         'PORT': os.getenv('DB_PORT', '3306'),
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
             'charset': 'utf8mb4',
         },
     }
+
+
+DATABASES = {
+    'default': database_config(
+        os.getenv('DB_NAME', 'hrms_location_db'),
+        os.getenv('DB_HOST', 'localhost'),
+    ),
 }
 
+# Read replicas: comma-separated hosts (MySQL) or database files (SQLite).
+# Replicas are registered as replica_1, replica_2, ... and receive safe reads
+# of the views listed in REPLICA_READ_VIEWS (see hrms_project/routers.py).
+DB_REPLICAS = [r.strip() for r in os.getenv('DB_REPLICAS', '').split(',') if r.strip()]
+for _index, _replica in enumerate(DB_REPLICAS, start=1):
+    if DB_ENGINE == 'django.db.backends.sqlite3':
+        _config = database_config(_replica, None)
+    else:
+        _config = database_config(os.getenv('DB_NAME', 'hrms_location_db'), _replica)
+    _config['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica_{_index}'] = _config
+
+# Location shards: comma-separated hosts (MySQL) or database files (SQLite).
+# When set, Location rows are hash-partitioned by employee across shard_0,
+# shard_1, ... (see location/sharding.py). Run `migrate --database shard_N`
+# for every shard.
+DB_SHARDS = [r.strip() for r in os.getenv('DB_SHARDS', '').split(',') if r.strip()]
+LOCATION_SHARDS = []
+for _index, _shard in enumerate(DB_SHARDS):
+    if DB_ENGINE == 'django.db.backends.sqlite3':
+        _config = database_config(_shard, None)
+    else:
+        _config = database_config(os.getenv('DB_NAME', 'hrms_location_db'), _shard)
+    DATABASES[f'shard_{_index}'] = _config
+    LOCATION_SHARDS.append(f'shard_{_index}')
+
+# Query the shards of a cross-employee read in parallel threads
+LOCATION_SCATTER_PARALLEL = True
+
+DATABASE_ROUTERS = [
+    'hrms_project.routers.LocationShardRouter',
+    'hrms_project.routers.PrimaryReplicaRouter',
+]
+
+# URL names whose GET/HEAD requests may be served from a replica
+REPLICA_READ_VIEWS = [
+    'location-list',
+    'location-detail',
+    'employee_info',
+    'employee_list',
+    'heatmap_tile',
+    'team_timeline',
+    'export_columns',
+    'admin:location_location_changelist',
+]
+
+# After a successful write, the user's reads stay on the primary for this long
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+
+# A replica that fails its health check is skipped for this long
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', '30'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -174,7 +251,84 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler',
 }
 
+# Cache
+# Rate limiting, admission control, replica pinning and index invalidation
+# share state through the cache. The default is per-process; use a shared
+# backend (e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache,
+# CACHE_LOCATION=redis://127.0.0.1:6379) when running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Location ingest rate limiting (per employee and device): CAPACITY requests
+# in any CAPACITY / REFILL_PER_SECOND seconds (sliding window)
+INGEST_BUCKET_CAPACITY = int(os.getenv('INGEST_BUCKET_CAPACITY', '10'))
+INGEST_REFILL_PER_SECOND = float(os.getenv('INGEST_REFILL_PER_SECOND', '1'))
+
+# Global ingest admission control (see IngestAdmissionMiddleware)
+INGEST_VIEWS = [
+    'location-list',
+    'location-sync',
+]
+INGEST_MAX_CONCURRENCY = int(os.getenv('INGEST_MAX_CONCURRENCY', '50'))
+INGEST_RETRY_AFTER = int(os.getenv('INGEST_RETRY_AFTER', '2'))  # seconds
+INGEST_SLOT_TTL = int(os.getenv('INGEST_SLOT_TTL', '60'))  # seconds
+
+# Offline sync: max points per /api/locations/sync/ batch and tolerated
+# device clock skew for client-supplied timestamps
+SYNC_MAX_POINTS = int(os.getenv('SYNC_MAX_POINTS', '1000'))
+LOCATION_MAX_CLOCK_SKEW = int(os.getenv('LOCATION_MAX_CLOCK_SKEW', '300'))  # seconds
+
+# Changes feed: rows stored this recently are re-sent below the cursor, so
+# inserts that commit out of ID order are not skipped (see location/changes.py)
+CHANGES_LOOKBACK_SECONDS = int(os.getenv('CHANGES_LOOKBACK_SECONDS', '60'))
+
+# Ingest outlier filter (see location/outliers.py): 'quarantine', 'flag' or 'off'.
+# Fixes implying more than OUTLIER_MAX_SPEED from the last accepted fix are
+# outliers until OUTLIER_CONFIRM_COUNT consistent ones confirm a real move
+OUTLIER_FILTER_MODE = os.getenv('OUTLIER_FILTER_MODE', 'quarantine')
+OUTLIER_MAX_SPEED = float(os.getenv('OUTLIER_MAX_SPEED', '70'))  # m/s (~250 km/h)
+OUTLIER_CONFIRM_COUNT = int(os.getenv('OUTLIER_CONFIRM_COUNT', '3'))
+OUTLIER_STATE_TTL = int(os.getenv('OUTLIER_STATE_TTL', '86400'))  # seconds
+
+# Compressed request bodies (Content-Encoding: gzip/deflate) are rejected
+# once they expand beyond this many bytes
+REQUEST_MAX_DECOMPRESSED_SIZE = int(os.getenv('REQUEST_MAX_DECOMPRESSED_SIZE', str(10 * 1024 * 1024)))
+
+# Response compression (see ResponseCompressionMiddleware)
+COMPRESSED_VIEWS = [
+    'location-list',
+    'location-changes',
+    'employee_list',
+    'heatmap_tile',
+    'team_timeline',
+    'export_columns',
+]
+RESPONSE_COMPRESSION_LEVEL = int(os.getenv('RESPONSE_COMPRESSION_LEVEL', '6'))
+
+# Heatmap tiles (see location/heatmap.py): precomputed zoom levels and how
+# long clients may cache a tile response
+HEATMAP_ZOOMS = [int(zoom) for zoom in os.getenv('HEATMAP_ZOOMS', '6,9,12,15').split(',')]
+HEATMAP_TILE_MAX_AGE = int(os.getenv('HEATMAP_TILE_MAX_AGE', '300'))  # seconds
+
+# Device tokens for location ingest (see location/authentication.py)
+DEVICE_TOKEN_MAX_AGE = int(os.getenv('DEVICE_TOKEN_MAX_AGE', str(30 * 86400)))  # seconds
+DEVICE_TOKEN_REVOCATION_REFRESH = int(os.getenv('DEVICE_TOKEN_REVOCATION_REFRESH', '5'))  # seconds
+
 # Logging Configuration
+# Handlers run on a background QueueListener thread (see hrms_project/logconfig.py)
+LOGGING_CONFIG = 'hrms_project.logconfig.configure_logging'
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')  # 'json' or 'verbose'
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+# Fraction of high-volume INFO messages to keep, by message prefix
+LOG_SAMPLE_RATES = {
+    'Location created': float(os.getenv('LOG_SAMPLE_LOCATION_CREATED', '0.1')),
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -183,18 +337,27 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'hrms_project.logconfig.JSONFormatter',
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'hrms_project.logconfig.SamplingFilter',
+            'rates': LOG_SAMPLE_RATES,
+        },
     },
     'handlers': {
         'file': {
             'level': 'ERROR',
             'class': 'logging.FileHandler',
             'filename': BASE_DIR / 'logs' / 'errors.log',
-            'formatter': 'verbose',
+            'formatter': LOG_FORMAT,
         },
         'console': {
             'level': 'INFO',
             'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+            'formatter': LOG_FORMAT,
         },
     },
     'loggers': {
@@ -205,6 +368,7 @@ LOGGING = {
         },
         'location': {
             'handlers': ['console', 'file'],
+            'filters': ['sampling'],
             'level': 'INFO',
             'propagate': False,
         },
@@ -1,23 +1,137 @@
-from django.contrib import admin
+from datetime import datetime, timedelta
+
+from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.models import User
-from .models import Location
+from .models import (
+    Location, Geofence, GeofenceEvent, DailyTravelStats, DeviceToken, HeatmapTile, LocationOutlier,
+    ReportingLine, Visit,
+)
+from .outliers import release
+from .pagination import EstimatedCountPaginator
+from .sharding import shard_aliases, shard_for_employee
+from .timeline import attach_employees
+
+
+class EmployeeAutocompleteFilter(admin.ListFilter):
+    """
+    Employee filter backed by the admin autocomplete endpoint.
+    Unlike list_filter = ['employee'] it never renders every user in the sidebar.
+    """
+    title = 'employee'
+    parameter_name = 'employee__id__exact'
+    template = 'admin/location/employee_autocomplete_filter.html'
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        value = params.pop(self.parameter_name, None)
+        if isinstance(value, list):
+            value = value[-1]
+
+        self.value = value
+        self.employee = None
+        if value:
+            try:
+                self.employee = User.objects.only('username').filter(pk=int(value)).first()
+            except ValueError:
+                raise IncorrectLookupParameters(f'Invalid employee ID: {value}')
+
+    def has_output(self):
+        return True
+
+    def expected_parameters(self):
+        return [self.parameter_name]
+
+    def queryset(self, request, queryset):
+        if self.value:
+            # Read from the shard owning the employee when sharding is enabled
+            shard = shard_for_employee(int(self.value))
+            if shard:
+                queryset = queryset.using(shard)
+            return queryset.filter(employee_id=int(self.value))
+        if shard_aliases():
+            # Rows are spread over the shards; only one employee can be listed
+            return queryset.none()
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'selected': not self.value,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'All',
+        }
+        if self.employee:
+            yield {
+                'selected': True,
+                'query_string': changelist.get_query_string({self.parameter_name: self.value}),
+                'display': self.employee.username,
+            }
+
+
+class RecentTimestampFilter(admin.SimpleListFilter):
+    """
+    Bounded date filter that becomes a single timestamp range condition.
+    Replaces date_hierarchy, which runs DISTINCT date queries over the whole table.
+    """
+    title = 'tracked at'
+    parameter_name = 'tracked'
+    RANGES = {
+        'today': 0,
+        '7d': 7,
+        '30d': 30,
+        '90d': 90,
+    }
+
+    def lookups(self, request, model_admin):
+        return [
+            ('today', 'Today'),
+            ('7d', 'Past 7 days'),
+            ('30d', 'Past 30 days'),
+            ('90d', 'Past 90 days'),
+        ]
+
+    def queryset(self, request, queryset):
+        days = self.RANGES.get(self.value())
+        if days is None:
+            return queryset
+        start = datetime.combine(datetime.now().date(), datetime.min.time()) - timedelta(days=days)
+        return queryset.filter(timestamp__gte=start)
+
+
+class LocationChangeList(ChangeList):
+    """
+    Changelist that loads the employees of sharded rows from 'default' in
+    one query: a shard's auth_user table is empty, so select_related would
+    drop every row.
+    """
+
+    def get_results(self, request):
+        super().get_results(request)
+        if shard_aliases():
+            attach_employees(self.result_list)
 
 
 @admin.register(Location)
 class LocationAdmin(admin.ModelAdmin):
     list_display = ['id', 'get_employee_info', 'latitude', 'longitude', 'accuracy', 'formatted_timestamp']
-    list_filter = ['employee', 'timestamp']
-    search_fields = ['employee__username', 'employee__first_name', 'employee__last_name']
+    list_filter = [EmployeeAutocompleteFilter, RecentTimestampFilter]
+    # Prefix search lets the database use the username index
+    search_fields = ['^employee__username']
     readonly_fields = ['timestamp', 'employee']
-    ordering = ['-timestamp']
+    # Matches Index(fields=['timestamp']); the explicit id tie-breaker avoids a filesort
+    ordering = ['-timestamp', '-id']
+    sortable_by = ['id', 'formatted_timestamp']
     list_per_page = 50
-    date_hierarchy = 'timestamp'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def get_employee_info(self, obj):
         """Display employee username and ID"""
+        if obj.employee is None:
+            return f"(deleted) (ID: {obj.employee_id})"
         return f"{obj.employee.username} (ID: {obj.employee.id})"
     get_employee_info.short_description = 'Employee'
-    get_employee_info.admin_order_field = 'employee__username'
     
     def formatted_timestamp(self, obj):
         """Display formatted timestamp"""
@@ -29,7 +143,163 @@ class LocationAdmin(admin.ModelAdmin):
         """Prevent manual addition of locations from admin"""
         return False
     
+    def get_queryset(self, request):
+        """Optimize query with select_related (not on shards, see LocationChangeList)"""
+        qs = super().get_queryset(request)
+        if shard_aliases():
+            return qs
+        return qs.select_related('employee')
+    
+    def get_changelist(self, request, **kwargs):
+        return LocationChangeList
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Resolve usernames on 'default' when the rows are sharded"""
+        if not shard_aliases() or not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        employee_ids = list(
+            User.objects.filter(username__istartswith=search_term).values_list('id', flat=True)
+        )
+        return queryset.filter(employee_id__in=employee_ids), False
+    
+    def changelist_view(self, request, extra_context=None):
+        if shard_aliases() and not request.GET.get(EmployeeAutocompleteFilter.parameter_name):
+            messages.info(request, 'Locations are sharded by employee: select an employee to list their locations.')
+        return super().changelist_view(request, extra_context)
+
+
+@admin.register(Geofence)
+class GeofenceAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'shape', 'radius', 'is_active', 'updated_at']
+    list_filter = ['shape', 'is_active']
+    search_fields = ['name']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(GeofenceEvent)
+class GeofenceEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'employee', 'geofence', 'event_type', 'timestamp']
+    list_filter = ['event_type', 'geofence']
+    search_fields = ['employee__username', 'geofence__name']
+    readonly_fields = ['employee', 'geofence', 'location', 'event_type', 'timestamp']
+    ordering = ['-timestamp']
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        """Events are only created by the geofence engine"""
+        return False
+
+    def get_queryset(self, request):
+        """Optimize query with select_related"""
+        qs = super().get_queryset(request)
+        return qs.select_related('employee', 'geofence')
+
+
+@admin.register(DailyTravelStats)
+class DailyTravelStatsAdmin(admin.ModelAdmin):
+    list_display = ['id', 'employee', 'date', 'distance_m', 'moving_seconds', 'max_speed_mps', 'point_count']
+    search_fields = ['employee__username']
+    readonly_fields = ['employee', 'date', 'distance_m', 'moving_seconds', 'max_speed_mps', 'point_count', 'updated_at']
+    ordering = ['-date']
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        """Stats are only computed by the travel stats pipeline"""
+        return False
+
+    def get_queryset(self, request):
+        """Optimize query with select_related"""
+        qs = super().get_queryset(request)
+        return qs.select_related('employee')
+
+
+@admin.register(ReportingLine)
+class ReportingLineAdmin(admin.ModelAdmin):
+    list_display = ['id', 'manager', 'employee', 'created_at']
+    search_fields = ['^manager__username', '^employee__username']
+    autocomplete_fields = ['manager', 'employee']
+    ordering = ['manager__username', 'employee__username']
+
+    def get_queryset(self, request):
+        """Optimize query with select_related"""
+        qs = super().get_queryset(request)
+        return qs.select_related('manager', 'employee')
+
+
+@admin.register(Visit)
+class VisitAdmin(admin.ModelAdmin):
+    list_display = ['id', 'employee', 'arrival', 'departure', 'point_count', 'geofence']
+    search_fields = ['^employee__username']
+    readonly_fields = ['employee', 'latitude', 'longitude', 'arrival', 'departure', 'point_count', 'geofence']
+    ordering = ['-arrival']
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        """Visits are only detected by the visit pipeline"""
+        return False
+
+    def get_queryset(self, request):
+        """Optimize query with select_related"""
+        qs = super().get_queryset(request)
+        return qs.select_related('employee', 'geofence')
+
+
+@admin.register(LocationOutlier)
+class LocationOutlierAdmin(admin.ModelAdmin):
+    list_display = ['id', 'employee', 'timestamp', 'latitude', 'longitude', 'accuracy',
+                    'implied_speed', 'jump_distance', 'status']
+    list_filter = ['status']
+    search_fields = ['^employee__username']
+    readonly_fields = ['employee', 'latitude', 'longitude', 'accuracy', 'timestamp', 'client_id',
+                       'received_at', 'status', 'implied_speed', 'jump_distance', 'reference_timestamp']
+    ordering = ['-timestamp']
+    list_per_page = 50
+    actions = ['release_outliers']
+
+    def has_add_permission(self, request):
+        """Outliers are only recorded by the ingest outlier filter"""
+        return False
+
     def get_queryset(self, request):
         """Optimize query with select_related"""
         qs = super().get_queryset(request)
         return qs.select_related('employee')
+
+    @admin.action(description='Release selected outliers into location history')
+    def release_outliers(self, request, queryset):
+        released = release(queryset)
+        self.message_user(request, f'{released} location(s) released')
+
+
+@admin.register(HeatmapTile)
+class HeatmapTileAdmin(admin.ModelAdmin):
+    list_display = ['id', 'zoom', 'x', 'y', 'date', 'point_count', 'updated_at']
+    list_filter = ['zoom']
+    exclude = ['counts']
+    readonly_fields = ['zoom', 'x', 'y', 'date', 'point_count', 'updated_at']
+    ordering = ['-date', 'zoom', 'x', 'y']
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        """Tiles are only built by the heatmap pipeline"""
+        return False
+
+
+@admin.register(DeviceToken)
+class DeviceTokenAdmin(admin.ModelAdmin):
+    list_display = ['id', 'employee', 'device_id', 'created_at', 'expires_at', 'revoked']
+    list_filter = ['revoked']
+    search_fields = ['^employee__username', 'device_id']
+    readonly_fields = ['jti', 'employee', 'device_id', 'created_at', 'expires_at']
+    actions = ['revoke_tokens']
+
+    def has_add_permission(self, request):
+        """Tokens are issued through the device token API"""
+        return False
+
+    @admin.action(description='Revoke selected device tokens')
+    def revoke_tokens(self, request, queryset):
+        # save() per token so the revocation signal fires
+        for device_token in queryset.filter(revoked=False):
+            device_token.revoked = True
+            device_token.save(update_fields=['revoked'])
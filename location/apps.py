@@ -4,3 +4,23 @@ from django.apps import AppConfig
 class LocationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'location'
+
+    def ready(self):
+        from django.contrib.auth.models import User
+        from django.db.models.signals import pre_delete
+
+        # Register geofence, device token and location tombstone signals
+        from . import authentication, changes, geofencing  # noqa: F401
+        from . import sharding
+
+        pre_delete.connect(
+            sharding.delete_employee_locations,
+            sender=User,
+            dispatch_uid='location_delete_employee_locations'
+        )
+        # Runs after the shard cascade above, which leaves tombstones behind
+        pre_delete.connect(
+            changes.delete_employee_tombstones,
+            sender=User,
+            dispatch_uid='location_delete_employee_tombstones'
+        )
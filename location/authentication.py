@@ -0,0 +1,206 @@
+"""
+Stateless device token authentication for location ingest.
+
+A device token is a signed payload (HMAC with SECRET_KEY via django.core.signing)
+carrying the employee ID, username, device ID and a token ID (jti), plus the
+signing timestamp used for expiry. Verifying it needs no database access:
+the user is rebuilt from the payload, and revocation is checked against
+in-memory sets of revoked token IDs and revoked employee IDs that are
+reloaded only when they change.
+
+Deactivating or deleting a user revokes all of their tokens: the signal
+receivers below record a RevokedEmployee entry, which (unlike DeviceToken
+rows) survives the user's deletion. Bulk QuerySet.update(is_active=False)
+sends no signals; revoke those users with revoke_employee().
+
+Clients send:  Authorization: Device <token>
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework import authentication, exceptions
+
+from .models import DeviceToken, RevokedEmployee
+
+logger = logging.getLogger('location')
+
+TOKEN_SALT = 'location.device-token'
+KEYWORD = 'Device'
+REVOCATION_VERSION_CACHE_KEY = 'location:device_token_revocation_version'
+
+
+def token_max_age():
+    return getattr(settings, 'DEVICE_TOKEN_MAX_AGE', 30 * 86400)
+
+
+def issue_token(user, device_id):
+    """
+    Create a DeviceToken record and return (token string, DeviceToken).
+    """
+    device_token = DeviceToken.objects.create(
+        employee=user,
+        device_id=device_id,
+        expires_at=datetime.now() + timedelta(seconds=token_max_age()),
+    )
+    payload = {
+        'uid': user.id,
+        'usr': user.username,
+        'dev': device_id,
+        'jti': device_token.jti.hex,
+    }
+    return signing.dumps(payload, salt=TOKEN_SALT, compress=True), device_token
+
+
+def bump_revocation_version():
+    revocation_list.invalidate()
+    try:
+        cache.incr(REVOCATION_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(REVOCATION_VERSION_CACHE_KEY, 1, None)
+
+
+def revoke_employee(employee_id, reason=RevokedEmployee.REASON_DEACTIVATED):
+    """
+    Reject every device token of an employee, until unrevoke_employee().
+    """
+    entry, created = RevokedEmployee.objects.get_or_create(employee_id=employee_id, defaults={'reason': reason})
+    if not created:
+        if entry.reason == reason:
+            return
+        entry.reason = reason
+        entry.save(update_fields=['reason'])
+    bump_revocation_version()
+
+
+def unrevoke_employee(employee_id):
+    """
+    Accept the (unrevoked) device tokens of a reactivated employee again.
+    """
+    deleted, _ = RevokedEmployee.objects.filter(
+        employee_id=employee_id, reason=RevokedEmployee.REASON_DEACTIVATED
+    ).delete()
+    if deleted:
+        bump_revocation_version()
+
+
+class RevocationList:
+    """
+    In-memory sets of revoked, unexpired token IDs and of revoked employees.
+
+    The set is reloaded when the revocation version in the cache changes,
+    checked at most every DEVICE_TOKEN_REVOCATION_REFRESH seconds.
+    """
+
+    def __init__(self):
+        self._revoked = frozenset()
+        self._employees = frozenset()
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._checked_at = 0.0
+        self._version = None
+
+    def _refresh(self):
+        refresh = getattr(settings, 'DEVICE_TOKEN_REVOCATION_REFRESH', 5)
+        now = time.monotonic()
+        if now - self._checked_at < refresh:
+            return
+
+        with self._lock:
+            if now - self._checked_at < refresh:
+                return
+            version = cache.get(REVOCATION_VERSION_CACHE_KEY, 0)
+            if version != self._version:
+                self._revoked = frozenset(
+                    jti.hex for jti in DeviceToken.objects.filter(
+                        revoked=True, expires_at__gt=datetime.now()
+                    ).values_list('jti', flat=True)
+                )
+                # Tokens of users deleted longer ago than the token lifetime have expired
+                self._employees = frozenset(
+                    RevokedEmployee.objects.exclude(
+                        reason=RevokedEmployee.REASON_DELETED,
+                        created_at__lte=datetime.now() - timedelta(seconds=token_max_age()),
+                    ).values_list('employee_id', flat=True)
+                )
+                self._version = version
+            self._checked_at = now
+
+    def __contains__(self, jti):
+        self._refresh()
+        return jti in self._revoked
+
+    def employee_revoked(self, employee_id):
+        self._refresh()
+        return employee_id in self._employees
+
+
+revocation_list = RevocationList()
+
+
+@receiver(post_save, sender=DeviceToken)
+@receiver(post_delete, sender=DeviceToken)
+def device_token_changed(sender, instance, **kwargs):
+    if not instance.revoked:
+        return
+    bump_revocation_version()
+
+
+@receiver(post_save, sender=User)
+def employee_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Skip saves that cannot change is_active (e.g. last_login updates)
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    if not instance.is_active:
+        revoke_employee(instance.id)
+    elif not created:
+        unrevoke_employee(instance.id)
+
+
+@receiver(pre_delete, sender=User)
+def employee_deleted(sender, instance, **kwargs):
+    revoke_employee(instance.id, reason=RevokedEmployee.REASON_DELETED)
+
+
+class DeviceTokenAuthentication(authentication.BaseAuthentication):
+    """
+    Authenticate requests carrying a signed device token.
+    request.user is an unsaved User built from the token payload; request.auth
+    is the decoded payload.
+    """
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != KEYWORD.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid device token header')
+
+        try:
+            token = auth[1].decode()
+            payload = signing.loads(token, salt=TOKEN_SALT, max_age=token_max_age())
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Device token has expired')
+        except (signing.BadSignature, UnicodeError):
+            raise exceptions.AuthenticationFailed('Invalid device token')
+
+        if payload.get('jti') in revocation_list:
+            raise exceptions.AuthenticationFailed('Device token has been revoked')
+        if revocation_list.employee_revoked(payload['uid']):
+            raise exceptions.AuthenticationFailed('Employee is inactive or has been deleted')
+
+        user = User(id=payload['uid'], username=payload['usr'], is_active=True)
+        return user, payload
+
+    def authenticate_header(self, request):
+        return KEYWORD
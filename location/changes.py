@@ -0,0 +1,135 @@
+"""
+Changes feed for polling clients.
+
+A cursor is the pair (last Location ID, last LocationTombstone ID) seen by
+the client, encoded as "<location_id>-<tombstone_id>". A poll reads the rows
+and tombstones past the cursor on the (employee, id) indexes and costs the
+size of the delta, not of the history.
+
+IDs are handed out at insert but become visible at commit, so a row can
+appear after a higher ID was already served (concurrent inserts, e.g. a
+large offline sync committing after a live fix). Every poll therefore also
+returns the rows and tombstones at or below the cursor that were stored in
+the last CHANGES_LOOKBACK_SECONDS, read on the (employee, received_at) and
+(employee, deleted_at) indexes. Clients must treat created rows and deleted
+IDs as idempotent (keyed by ID). rebalance_location_shards moves the target
+shard's ID sequence past the moved rows, so moved employees keep growing IDs.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, QuerySet
+from django.utils import timezone
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Location, LocationTombstone
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+
+def lookback_seconds():
+    return getattr(settings, 'CHANGES_LOOKBACK_SECONDS', 60)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(location_id, tombstone_id):
+    return f'{location_id}-{tombstone_id}'
+
+
+def decode_cursor(cursor):
+    """
+    Return (location_id, tombstone_id) from a cursor string.
+    """
+    try:
+        location_id, tombstone_id = (int(part) for part in cursor.split('-'))
+    except (AttributeError, ValueError):
+        raise InvalidCursor(f'Invalid cursor "{cursor}"')
+    if location_id < 0 or tombstone_id < 0:
+        raise InvalidCursor(f'Invalid cursor "{cursor}"')
+    return location_id, tombstone_id
+
+
+def current_cursor(employee_id):
+    """
+    Cursor pointing at the employee's latest row and tombstone.
+    """
+    location_id = Location.objects.for_employee(employee_id).aggregate(
+        last_id=Max('id')
+    )['last_id']
+    tombstone_id = LocationTombstone.objects.filter(employee_id=employee_id).aggregate(
+        last_id=Max('id')
+    )['last_id']
+    return encode_cursor(location_id or 0, tombstone_id or 0)
+
+
+def changes_since(employee_id, cursor, limit):
+    """
+    Return (created locations, deleted location IDs, next cursor, has_more)
+    for at most `limit` rows and `limit` tombstones past the cursor, preceded
+    by the lookback overlap (rows and tombstones at or below the cursor that
+    were stored recently).
+    """
+    location_id, tombstone_id = decode_cursor(cursor)
+    locations = Location.objects.for_employee(employee_id)
+    tombstones = LocationTombstone.objects.filter(employee_id=employee_id)
+    cutoff = timezone.now() - timedelta(seconds=lookback_seconds())
+
+    created = list(locations.filter(id__gt=location_id).order_by('id')[:limit + 1])
+    deleted = list(
+        tombstones.filter(id__gt=tombstone_id)
+        .order_by('id')
+        .values_list('id', 'location_id')[:limit + 1]
+    )
+    has_more = len(created) > limit or len(deleted) > limit
+    created = created[:limit]
+    deleted = deleted[:limit]
+
+    next_cursor = encode_cursor(
+        created[-1].id if created else location_id,
+        deleted[-1][0] if deleted else tombstone_id,
+    )
+
+    # Rows that committed after a higher ID was served
+    if location_id:
+        created = list(
+            locations.filter(received_at__gte=cutoff, id__lte=location_id).order_by('id')[:limit]
+        ) + created
+    if tombstone_id:
+        deleted = list(
+            tombstones.filter(deleted_at__gte=cutoff, id__lte=tombstone_id)
+            .order_by('id')
+            .values_list('id', 'location_id')[:limit]
+        ) + deleted
+    return created, [location for _, location in deleted], next_cursor, has_more
+
+
+@receiver(post_delete, sender=Location)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    """
+    Leave a tombstone for every deleted Location, unless the employee
+    themselves is being deleted.
+    """
+    from django.contrib.auth.models import User
+
+    # origin is the deleted instance or queryset that started the cascade
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if issubclass(origin_model, User):
+        return
+    LocationTombstone.objects.create(
+        employee_id=instance.employee_id,
+        location_id=instance.pk,
+    )
+
+
+def delete_employee_tombstones(sender, instance, **kwargs):
+    """
+    pre_delete receiver for User: drop tombstones left by deleting the
+    employee's sharded locations, which the User deletion did not collect.
+    Must be connected after sharding.delete_employee_locations.
+    """
+    LocationTombstone.objects.filter(employee_id=instance.pk).delete()
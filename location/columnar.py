@@ -0,0 +1,285 @@
+"""
+Columnar export of Location rows for analytics (NumPy / pandas).
+
+An export directory holds one sub-directory per partition (one day,
+`day=2024-05-01`, or one employee, `employee=42`). Every column of a
+partition is a raw little-endian array file with no header, so it can be
+opened with np.memmap / np.fromfile without any parsing:
+
+    id.bin          int64    Location ID
+    employee_id.bin int32
+    timestamp.bin   int64    microseconds since 1970-01-01, view as datetime64[us]
+    latitude.bin    float64
+    longitude.bin   float64
+    accuracy.bin    float32  meters
+
+Each partition has a manifest.json with the row count and column dtypes;
+the export root has a manifest.json with the partitioning scheme, the
+export filters and, per database, the last exported Location ID. Appending
+exports only the rows added since then and extends the column files of the
+affected partitions (late offline fixes land in older day partitions).
+Rows are appended in ID order per database.
+
+Column files are extended before the manifests are replaced, so after an
+interrupted run the files may be longer than the manifest says; readers
+must use the manifest row count (load() does) and the next append
+truncates the extra rows.
+"""
+import json
+import os
+import tarfile
+import tempfile
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from . import sharding
+from .models import Location
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+SCHEMES = ['day', 'employee']
+CHUNK_SIZE = 50000
+
+COLUMNS = [
+    ('id', '<i8'),
+    ('employee_id', '<i4'),
+    ('timestamp', '<i8'),
+    ('latitude', '<f8'),
+    ('longitude', '<f8'),
+    ('accuracy', '<f4'),
+]
+
+
+class ExportError(Exception):
+    pass
+
+
+def _read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(path, data):
+    # Replace atomically so readers never see a partial manifest
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _day_start(day):
+    start = datetime.combine(date.fromisoformat(day), time.min)
+    return timezone.make_aware(start) if settings.USE_TZ else start
+
+
+def partition_name(scheme, employee_id, timestamp):
+    if scheme == 'day':
+        return f'day={timestamp:%Y-%m-%d}'
+    return f'employee={employee_id}'
+
+
+def to_columns(rows):
+    """
+    Convert (id, employee_id, timestamp, latitude, longitude, accuracy)
+    rows into a dict of column arrays.
+    """
+    ids, employee_ids, timestamps, latitudes, longitudes, accuracies = zip(*rows)
+    if settings.USE_TZ:
+        timestamps = [ts.astimezone(dt_timezone.utc).replace(tzinfo=None) for ts in timestamps]
+    return {
+        'id': np.array(ids, dtype='<i8'),
+        'employee_id': np.array(employee_ids, dtype='<i4'),
+        'timestamp': np.array(timestamps, dtype='datetime64[us]').astype('<i8'),
+        'latitude': np.array(latitudes, dtype='<f8'),
+        'longitude': np.array(longitudes, dtype='<f8'),
+        'accuracy': np.array(accuracies, dtype='<f4'),
+    }
+
+
+class PartitionWriter:
+    """
+    Appends column arrays to the files of one partition.
+    """
+
+    def __init__(self, root, name):
+        self.path = os.path.join(root, name)
+        self.name = name
+        manifest_path = os.path.join(self.path, MANIFEST)
+        if os.path.exists(manifest_path):
+            self.manifest = _read_json(manifest_path)
+        else:
+            os.makedirs(self.path, exist_ok=True)
+            self.manifest = {
+                'version': FORMAT_VERSION,
+                'partition': name,
+                'rows': 0,
+                'columns': {column: {'file': f'{column}.bin', 'dtype': dtype} for column, dtype in COLUMNS},
+                'min_timestamp': None,
+                'max_timestamp': None,
+                'last_location_ids': {},
+            }
+        self._truncate_to_manifest()
+
+    def _truncate_to_manifest(self):
+        # Drop rows written by an interrupted run that never reached the manifest
+        for column, dtype in COLUMNS:
+            path = os.path.join(self.path, f'{column}.bin')
+            size = self.manifest['rows'] * np.dtype(dtype).itemsize
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                os.truncate(path, size)
+
+    def append(self, rows, database):
+        """
+        Append rows (in ID order) read from one database; rows this
+        partition already holds are skipped.
+        """
+        last_id = self.manifest['last_location_ids'].get(database, 0)
+        if rows[0][0] <= last_id:
+            rows = [row for row in rows if row[0] > last_id]
+            if not rows:
+                return 0
+
+        columns = to_columns(rows)
+        for column, dtype in COLUMNS:
+            with open(os.path.join(self.path, f'{column}.bin'), 'ab') as f:
+                columns[column].astype(dtype, copy=False).tofile(f)
+
+        timestamps = columns['timestamp']
+        low, high = int(timestamps.min()), int(timestamps.max())
+        manifest = self.manifest
+        manifest['rows'] += len(timestamps)
+        manifest['min_timestamp'] = low if manifest['min_timestamp'] is None else min(manifest['min_timestamp'], low)
+        manifest['max_timestamp'] = high if manifest['max_timestamp'] is None else max(manifest['max_timestamp'], high)
+        manifest['last_location_ids'][database] = rows[-1][0]
+        return len(rows)
+
+    def commit(self):
+        _write_json(os.path.join(self.path, MANIFEST), self.manifest)
+
+
+def export(root, scheme=None, append=False, start=None, end=None, employee_id=None):
+    """
+    Export Location rows into `root`. Without `append` the directory must be
+    empty; `start`/`end` (dates, end exclusive) and `employee_id` restrict
+    the rows exported and are kept in the root manifest. With `append`, the
+    rows added since the previous export are written, using the partitioning
+    and filters of the existing export. Returns (rows written, names of the
+    partitions that received rows).
+    """
+    if scheme is not None and scheme not in SCHEMES:
+        raise ExportError(f'Unknown partitioning "{scheme}", expected one of {SCHEMES}')
+
+    manifest_path = os.path.join(root, MANIFEST)
+    if append and os.path.exists(manifest_path):
+        manifest = _read_json(manifest_path)
+        if scheme is not None and manifest['partitioning'] != scheme:
+            raise ExportError(
+                f'"{root}" is partitioned by {manifest["partitioning"]}, not {scheme}'
+            )
+        scheme = manifest['partitioning']
+    else:
+        scheme = scheme or 'day'
+        if os.path.isdir(root) and os.listdir(root):
+            raise ExportError(f'"{root}" is not empty; use append mode to extend an export')
+        os.makedirs(root, exist_ok=True)
+        manifest = {
+            'version': FORMAT_VERSION,
+            'partitioning': scheme,
+            'timezone': 'UTC' if settings.USE_TZ else settings.TIME_ZONE,
+            'columns': dict(COLUMNS),
+            'filters': {
+                'start': start.isoformat() if start else None,
+                'end': end.isoformat() if end else None,
+                'employee_id': employee_id,
+            },
+            'last_location_ids': {},
+        }
+    filters = manifest['filters']
+
+    writers = {}
+    touched = set()
+    written = 0
+
+    def flush(buffered, database):
+        nonlocal written
+        for name, rows in buffered.items():
+            if name not in writers:
+                writers[name] = PartitionWriter(root, name)
+            count = writers[name].append(rows, database)
+            if count:
+                touched.add(name)
+                written += count
+        buffered.clear()
+
+    for alias in sharding.location_databases():
+        database = alias or 'default'
+        queryset = Location.objects.using(alias) if alias else Location.objects.all()
+        queryset = queryset.filter(id__gt=manifest['last_location_ids'].get(database, 0))
+        if filters['employee_id'] is not None:
+            queryset = queryset.filter(employee_id=filters['employee_id'])
+        if filters['start']:
+            queryset = queryset.filter(timestamp__gte=_day_start(filters['start']))
+        if filters['end']:
+            queryset = queryset.filter(timestamp__lt=_day_start(filters['end']))
+
+        buffered = defaultdict(list)
+        pending = 0
+        for row in (
+            queryset.order_by('id')
+            .values_list('id', 'employee_id', 'timestamp', 'latitude', 'longitude', 'accuracy')
+            .iterator(chunk_size=CHUNK_SIZE)
+        ):
+            buffered[partition_name(scheme, row[1], row[2])].append(row)
+            manifest['last_location_ids'][database] = row[0]
+            pending += 1
+            if pending >= CHUNK_SIZE:
+                flush(buffered, database)
+                pending = 0
+        flush(buffered, database)
+
+    # Partitions first: if the run stops before the root manifest is
+    # replaced, the next append reads the same rows again and every
+    # partition skips the ones it already holds
+    for writer in writers.values():
+        writer.commit()
+    _write_json(manifest_path, manifest)
+    return written, sorted(touched)
+
+
+def load(path):
+    """
+    Memory-map the columns of one partition directory.
+    Returns a dict of read-only NumPy arrays; `timestamp` is datetime64[us].
+    """
+    manifest = _read_json(os.path.join(path, MANIFEST))
+    rows = manifest['rows']
+    columns = {}
+    for column, spec in manifest['columns'].items():
+        if rows == 0:
+            columns[column] = np.empty(0, dtype=spec['dtype'])
+            continue
+        columns[column] = np.memmap(
+            os.path.join(path, spec['file']), dtype=spec['dtype'], mode='r', shape=(rows,)
+        )
+    columns['timestamp'] = columns['timestamp'].view('datetime64[us]')
+    return columns
+
+
+def export_archive(day, employee_id=None):
+    """
+    Export the fixes of one day (optionally one employee) and return an
+    uncompressed tar of the export directory, as a temporary file
+    positioned at the start. Extract it and load() the partition.
+    """
+    archive = tempfile.TemporaryFile()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = os.path.join(tmp_dir, f'locations-{day:%Y-%m-%d}')
+        export(root, scheme='day', start=day, end=day + timedelta(days=1), employee_id=employee_id)
+        with tarfile.open(fileobj=archive, mode='w') as tar:
+            tar.add(root, arcname=os.path.basename(root))
+    archive.seek(0)
+    return archive
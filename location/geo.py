@@ -0,0 +1,66 @@
+"""
+Geometry helpers shared by the location tracking features.
+"""
+import math
+
+import numpy as np
+
+# Mean Earth radius in meters
+EARTH_RADIUS_M = 6371008.8
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in meters between two (lat, lon) points given in degrees.
+    """
+    phi1 = math.radians(float(lat1))
+    phi2 = math.radians(float(lat2))
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(float(lon2) - float(lon1))
+
+    a = (math.sin(d_phi / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def meters_to_degrees(meters, latitude):
+    """
+    Convert a distance in meters to (lat_degrees, lon_degrees) spans at the given latitude.
+    Used to build bounding boxes for circles.
+    """
+    lat_deg = meters / 111320.0
+    cos_lat = math.cos(math.radians(float(latitude)))
+    lon_deg = 360.0 if cos_lat < 1e-6 else meters / (111320.0 * cos_lat)
+    return lat_deg, min(lon_deg, 360.0)
+
+
+def point_in_polygon(lat, lon, vertices):
+    """
+    Ray casting point-in-polygon test.
+    `vertices` is a sequence of (lat, lon) pairs; the polygon is closed implicitly.
+    """
+    inside = False
+    n = len(vertices)
+    j = n - 1
+    for i in range(n):
+        lat_i, lon_i = vertices[i]
+        lat_j, lon_j = vertices[j]
+        if (lat_i > lat) != (lat_j > lat):
+            cross_lon = (lon_j - lon_i) * (lat - lat_i) / (lat_j - lat_i) + lon_i
+            if lon < cross_lon:
+                inside = not inside
+        j = i
+    return inside
+
+
+def haversine_m_array(lat1, lon1, lat2, lon2):
+    """
+    Vectorized haversine distance in meters for NumPy arrays of degrees.
+    """
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(lon2 - lon1)
+
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(1.0, np.sqrt(a)))
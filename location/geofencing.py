@@ -0,0 +1,230 @@
+"""
+Geofence engine.
+
+Active geofences are compiled into an in-memory uniform grid keyed by
+(lat cell, lon cell). Each incoming location only tests the fences whose
+bounding box overlaps its cell, so the per-point cost depends on the number
+of nearby fences rather than the total number of fences.
+
+The grid is rebuilt lazily whenever a Geofence is saved or deleted. A version
+counter kept in the cache lets every worker process notice the change.
+"""
+import logging
+import math
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .geo import haversine_m, meters_to_degrees, point_in_polygon
+from .models import Geofence, GeofenceEvent, GeofenceMembership
+
+logger = logging.getLogger('location')
+
+INDEX_VERSION_CACHE_KEY = 'location:geofence_index_version'
+
+# Fences spanning more cells than this are kept in a list checked for every point
+MAX_CELLS_PER_FENCE = 10000
+
+
+class CompiledGeofence:
+    """
+    Geofence geometry converted to floats with a precomputed bounding box.
+    """
+
+    def __init__(self, geofence):
+        self.id = geofence.id
+        self.shape = geofence.shape
+        if self.shape == Geofence.SHAPE_CIRCLE:
+            self.center = (float(geofence.center_latitude), float(geofence.center_longitude))
+            self.radius = float(geofence.radius)
+            lat_span, lon_span = meters_to_degrees(self.radius, self.center[0])
+            self.bbox = (
+                self.center[0] - lat_span, self.center[1] - lon_span,
+                self.center[0] + lat_span, self.center[1] + lon_span,
+            )
+        else:
+            self.vertices = [(float(lat), float(lon)) for lat, lon in geofence.vertices]
+            lats = [v[0] for v in self.vertices]
+            lons = [v[1] for v in self.vertices]
+            self.bbox = (min(lats), min(lons), max(lats), max(lons))
+
+    def contains(self, lat, lon):
+        min_lat, min_lon, max_lat, max_lon = self.bbox
+        if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+            return False
+        if self.shape == Geofence.SHAPE_CIRCLE:
+            return haversine_m(lat, lon, self.center[0], self.center[1]) <= self.radius
+        return point_in_polygon(lat, lon, self.vertices)
+
+
+class GeofenceIndex:
+    """
+    Uniform grid over geofence bounding boxes.
+    """
+
+    def __init__(self, geofences, cell_size):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+        self.oversized = []
+        self.size = 0
+
+        for geofence in geofences:
+            try:
+                fence = CompiledGeofence(geofence)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Skipping invalid geofence {geofence.id}: {str(e)}")
+                continue
+
+            self.size += 1
+            min_lat, min_lon, max_lat, max_lon = fence.bbox
+            lat_range = range(self._cell(min_lat), self._cell(max_lat) + 1)
+            lon_range = range(self._cell(min_lon), self._cell(max_lon) + 1)
+            if len(lat_range) * len(lon_range) > MAX_CELLS_PER_FENCE:
+                self.oversized.append(fence)
+                continue
+            for lat_cell in lat_range:
+                for lon_cell in lon_range:
+                    self.cells[(lat_cell, lon_cell)].append(fence)
+
+    def _cell(self, value):
+        return math.floor(value / self.cell_size)
+
+    def match(self, lat, lon):
+        """
+        Return the set of geofence IDs containing the point.
+        """
+        lat = float(lat)
+        lon = float(lon)
+        candidates = self.cells.get((self._cell(lat), self._cell(lon)), ())
+        matched = {fence.id for fence in candidates if fence.contains(lat, lon)}
+        matched.update(fence.id for fence in self.oversized if fence.contains(lat, lon))
+        return matched
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Return the geofence index, rebuilding it if any geofence changed.
+    """
+    global _index, _index_version
+
+    version = cache.get(INDEX_VERSION_CACHE_KEY, 0)
+    if _index is not None and _index_version == version:
+        return _index
+
+    with _index_lock:
+        if _index is None or _index_version != version:
+            cell_size = getattr(settings, 'GEOFENCE_GRID_CELL_DEGREES', 0.01)
+            _index = GeofenceIndex(Geofence.objects.filter(is_active=True), cell_size)
+            _index_version = version
+            logger.info(f"Geofence index rebuilt with {_index.size} geofences")
+    return _index
+
+
+def invalidate_index():
+    """
+    Force every process to rebuild its geofence index on next use.
+    """
+    global _index
+
+    _index = None
+    try:
+        cache.incr(INDEX_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(INDEX_VERSION_CACHE_KEY, 1, None)
+
+
+@receiver(post_save, sender=Geofence)
+@receiver(post_delete, sender=Geofence)
+def geofence_changed(sender, **kwargs):
+    invalidate_index()
+
+
+def evaluate_locations(locations):
+    """
+    Evaluate location fixes against all active geofences and record
+    enter/exit events for every boundary crossing.
+
+    Locations are processed per employee in timestamp order. Returns the
+    list of created GeofenceEvent objects.
+    """
+    if not locations:
+        return []
+
+    index = get_index()
+
+    by_employee = defaultdict(list)
+    for location in locations:
+        by_employee[location.employee_id].append(location)
+
+    # Current memberships of all affected employees in one query
+    initial = defaultdict(dict)
+    memberships = GeofenceMembership.objects.filter(employee_id__in=by_employee.keys())
+    for membership in memberships:
+        initial[membership.employee_id][membership.geofence_id] = membership.entered_at
+
+    events = []
+    to_create = []
+    to_delete = []
+
+    for employee_id, employee_locations in by_employee.items():
+        employee_locations.sort(key=lambda loc: (loc.timestamp, loc.id or 0))
+        before = initial[employee_id]
+        current = dict(before)
+
+        for location in employee_locations:
+            inside = index.match(location.latitude, location.longitude)
+            for geofence_id in inside - current.keys():
+                current[geofence_id] = location.timestamp
+                events.append(GeofenceEvent(
+                    employee_id=employee_id,
+                    geofence_id=geofence_id,
+                    location_id=location.id,
+                    event_type=GeofenceEvent.EVENT_ENTER,
+                    timestamp=location.timestamp,
+                ))
+            for geofence_id in current.keys() - inside:
+                del current[geofence_id]
+                events.append(GeofenceEvent(
+                    employee_id=employee_id,
+                    geofence_id=geofence_id,
+                    location_id=location.id,
+                    event_type=GeofenceEvent.EVENT_EXIT,
+                    timestamp=location.timestamp,
+                ))
+
+        for geofence_id in before.keys() - current.keys():
+            to_delete.append((employee_id, geofence_id))
+        for geofence_id in current.keys() - before.keys():
+            to_create.append(GeofenceMembership(
+                employee_id=employee_id,
+                geofence_id=geofence_id,
+                entered_at=current[geofence_id],
+            ))
+
+    if events:
+        with transaction.atomic():
+            GeofenceEvent.objects.bulk_create(events)
+            for employee_id, geofence_id in to_delete:
+                GeofenceMembership.objects.filter(
+                    employee_id=employee_id, geofence_id=geofence_id
+                ).delete()
+            GeofenceMembership.objects.bulk_create(to_create, ignore_conflicts=True)
+
+    return events
+
+
+def evaluate_location(location):
+    """
+    Evaluate a single location fix. See evaluate_locations().
+    """
+    return evaluate_locations([location])
@@ -0,0 +1,229 @@
+"""
+Precomputed location density heatmap tiles.
+
+Location fixes are binned into Web Mercator tiles (z/x/y) for every zoom in
+settings.HEATMAP_ZOOMS. Each tile is split into a GRID_SIZE x GRID_SIZE grid
+of count cells and stored per day as a compressed uint32 array, so a tile
+request reads a handful of small rows instead of raw locations.
+
+Tiles are updated incrementally from the rows past the pipeline watermark.
+Every shard hands out its own IDs, so each shard gets its own watermark.
+Counts are additive: a late (offline-synced) fix simply increments the tile
+of the day it was recorded on.
+
+Counts never decrease: deleting fixes (or employees) after they were binned
+leaves them in the tiles. Run `python manage.py compute_heatmap_tiles
+--rebuild` after deletions that must disappear from the heatmap.
+"""
+import logging
+import zlib
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from . import sharding
+from .models import HeatmapTile, Location, ProcessingWatermark
+from .watermarks import advance_watermark, lock_watermark
+
+logger = logging.getLogger('location')
+
+PIPELINE = 'heatmap'
+CHUNK_SIZE = 20000
+
+# Cells per tile side
+GRID_SIZE = 64
+
+# Fixes less accurate than this would smear across several cells
+MAX_ACCURACY_M = 100.0
+# Web Mercator is undefined at the poles
+MAX_LATITUDE = 85.05112878
+
+
+def zooms():
+    """
+    Zoom levels for which tiles are precomputed.
+    """
+    return list(settings.HEATMAP_ZOOMS)
+
+
+def encode_counts(counts):
+    return zlib.compress(np.asarray(counts, dtype='<u4').tobytes())
+
+
+def decode_counts(data):
+    """
+    Decode a stored count array into a writable flat uint32 array.
+    """
+    return np.frombuffer(zlib.decompress(bytes(data)), dtype='<u4').astype(np.uint32)
+
+
+def project(lat, lon, zoom):
+    """
+    Map arrays of degrees to (tile_x, tile_y, cell) arrays at a zoom level,
+    where `cell` is the row-major index inside the tile grid.
+    """
+    n = 2 ** zoom
+    lat_rad = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (lon + 180.0) / 360.0 * n
+    y = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0 * n
+    x = np.clip(x, 0.0, np.nextafter(n, 0))
+    y = np.clip(y, 0.0, np.nextafter(n, 0))
+
+    tile_x = np.floor(x).astype(np.int64)
+    tile_y = np.floor(y).astype(np.int64)
+    cell_x = np.minimum(((x - tile_x) * GRID_SIZE).astype(np.int64), GRID_SIZE - 1)
+    cell_y = np.minimum(((y - tile_y) * GRID_SIZE).astype(np.int64), GRID_SIZE - 1)
+    return tile_x, tile_y, cell_y * GRID_SIZE + cell_x
+
+
+def bin_locations(rows):
+    """
+    Bin (latitude, longitude, timestamp) rows into per-tile count arrays.
+    Returns {(zoom, x, y, date): flat uint32 array}.
+    """
+    if not rows:
+        return {}
+
+    lat = np.array([row[0] for row in rows], dtype=float)
+    lon = np.array([row[1] for row in rows], dtype=float)
+    days = np.array([row[2].date().toordinal() for row in rows], dtype=np.int64)
+
+    partials = {}
+    for zoom in zooms():
+        tile_x, tile_y, cell = project(lat, lon, zoom)
+        keys, inverse = np.unique(
+            np.stack([days, tile_x, tile_y], axis=1), axis=0, return_inverse=True
+        )
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.searchsorted(inverse[order], np.arange(len(keys) + 1))
+        for index, (day, x, y) in enumerate(keys):
+            cells = cell[order[bounds[index]:bounds[index + 1]]]
+            partials[(zoom, int(x), int(y), date.fromordinal(int(day)))] = np.bincount(
+                cells, minlength=GRID_SIZE * GRID_SIZE
+            ).astype(np.uint32)
+    return partials
+
+
+def merge_tiles(partials):
+    """
+    Add binned counts to the stored tiles. Must run inside transaction.atomic().
+    """
+    by_bucket = defaultdict(dict)
+    for (zoom, x, y, day), counts in partials.items():
+        by_bucket[(zoom, day)][(x, y)] = counts
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for (zoom, day), tiles in by_bucket.items():
+        existing = HeatmapTile.objects.select_for_update().filter(
+            zoom=zoom,
+            date=day,
+            x__in={x for x, _ in tiles},
+            y__in={y for _, y in tiles},
+        )
+        for tile in existing:
+            counts = tiles.pop((tile.x, tile.y), None)
+            if counts is None:
+                continue
+            tile.counts = encode_counts(decode_counts(tile.counts) + counts)
+            tile.point_count += int(counts.sum())
+            tile.updated_at = now
+            to_update.append(tile)
+
+        to_create.extend(
+            HeatmapTile(
+                zoom=zoom, x=x, y=y, date=day,
+                counts=encode_counts(counts),
+                point_count=int(counts.sum()),
+            )
+            for (x, y), counts in tiles.items()
+        )
+
+    HeatmapTile.objects.bulk_create(to_create, batch_size=500)
+    HeatmapTile.objects.bulk_update(to_update, ['counts', 'point_count', 'updated_at'], batch_size=500)
+    return len(to_create) + len(to_update)
+
+
+def _pipeline_name(alias):
+    return f'{PIPELINE}:{alias}' if alias else PIPELINE
+
+
+def refresh_database_tiles(alias=None):
+    """
+    Bin the new fixes of one Location database into tiles, CHUNK_SIZE rows
+    per transaction. Returns the number of rows consumed.
+    """
+    locations = Location.objects.using(alias) if alias else Location.objects.all()
+    pipeline = _pipeline_name(alias)
+    consumed = 0
+    while True:
+        with transaction.atomic():
+            watermark = lock_watermark(pipeline)
+            rows = list(
+                locations.filter(id__gt=watermark.last_location_id)
+                .order_by('id')
+                .values_list('id', 'latitude', 'longitude', 'accuracy', 'timestamp')[:CHUNK_SIZE]
+            )
+            if not rows:
+                break
+            partials = bin_locations([
+                (row[1], row[2], row[4]) for row in rows
+                if row[3] is None or row[3] <= MAX_ACCURACY_M
+            ])
+            merge_tiles(partials)
+            advance_watermark(watermark, rows[-1][0])
+        consumed += len(rows)
+
+    logger.info(f"Heatmap tiles refreshed from {alias or 'default'}: {consumed} row(s)")
+    return consumed
+
+
+def refresh_tiles():
+    """
+    Refresh heatmap tiles from every Location database. Returns the number
+    of rows consumed.
+    """
+    return sum(refresh_database_tiles(alias) for alias in sharding.location_databases())
+
+
+def reset_tiles():
+    """
+    Drop all tiles and watermarks so the next refresh rebuilds from scratch.
+    """
+    with transaction.atomic():
+        HeatmapTile.objects.all().delete()
+        ProcessingWatermark.objects.filter(
+            pipeline__in=[_pipeline_name(alias) for alias in sharding.location_databases()]
+        ).delete()
+
+
+def tile_version(zoom, x, y, start, end):
+    """
+    Cheap (last_updated, tile_row_count) summary of a tile over a date range,
+    used for conditional requests before decoding any counts.
+    """
+    summary = HeatmapTile.objects.filter(
+        zoom=zoom, x=x, y=y, date__gte=start, date__lte=end
+    ).aggregate(last_updated=Max('updated_at'), rows=Count('id'))
+    return summary['last_updated'], summary['rows']
+
+
+def tile_counts(zoom, x, y, start, end):
+    """
+    Sum the counts of one tile over the dates start..end (inclusive).
+    Returns a flat uint32 array of GRID_SIZE * GRID_SIZE cells.
+    """
+    total = np.zeros(GRID_SIZE * GRID_SIZE, dtype=np.uint32)
+    stored = HeatmapTile.objects.filter(
+        zoom=zoom, x=x, y=y, date__gte=start, date__lte=end
+    ).values_list('counts', flat=True)
+    for counts in stored:
+        total += decode_counts(counts)
+    return total
@@ -0,0 +1,277 @@
+"""
+Streaming import of historical GPS logs (CSV, NDJSON, GPX).
+
+Readers turn files of any size into a stream of raw records without loading
+them into memory. Records are validated with the LocationSerializer field
+rules (called directly, without building a serializer per row), mapped from
+username to employee ID through a per-process cache and written with
+chunked, shard-aware bulk inserts. import_chunk() runs in worker processes.
+
+Imported rows get a deterministic client_id unless the file provides one,
+so re-running an interrupted import does not duplicate fixes.
+"""
+import csv
+import hashlib
+import json
+import os
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import sharding
+from .models import Location
+from .serializers import LocationSerializer
+
+FORMATS = ['csv', 'ndjson', 'gpx']
+
+# GPX has no accuracy; estimate it from the horizontal dilution of precision
+GPX_UERE_M = 5.0
+
+SEVEN_PLACES = Decimal('0.0000001')
+TWO_PLACES = Decimal('0.01')
+MAX_ACCURACY = Decimal('9999999999999.99')
+
+_validator = None
+_employee_ids = {}
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension == 'jsonl':
+        return 'ndjson'
+    if extension in FORMATS:
+        return extension
+    raise ValueError(f'Cannot detect the format of "{path}", use --format')
+
+
+def read_records(path, file_format, default_username=None):
+    """
+    Yield (source, line, record) for every record of a file; `record` is a
+    dict of raw values, or None when the record could not be parsed.
+    """
+    source = os.path.basename(path)
+    if file_format == 'csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for record in reader:
+                if not record.get('username'):
+                    record['username'] = default_username
+                yield source, reader.line_num, record
+    elif file_format == 'ndjson':
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    yield source, line_number, None
+                    continue
+                if not isinstance(record, dict):
+                    yield source, line_number, None
+                    continue
+                if not record.get('username'):
+                    record['username'] = default_username
+                yield source, line_number, record
+    elif file_format == 'gpx':
+        yield from _read_gpx(path, source, default_username)
+    else:
+        raise ValueError(f'Unsupported format "{file_format}"')
+
+
+def _read_gpx(path, source, username):
+    """
+    Stream GPX track/route/way points, dropping each element once read so
+    memory stays flat for any file size.
+    """
+    stack = []
+    point_number = 0
+    for event, element in ET.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            stack.append(element)
+            continue
+        stack.pop()
+        tag = element.tag.rsplit('}', 1)[-1]
+        if tag not in ('trkpt', 'rtept', 'wpt'):
+            continue
+
+        point_number += 1
+        children = {child.tag.rsplit('}', 1)[-1]: (child.text or '').strip() for child in element}
+        accuracy = None
+        if children.get('hdop'):
+            try:
+                accuracy = str(Decimal(children['hdop']) * Decimal(str(GPX_UERE_M)))
+            except InvalidOperation:
+                accuracy = children['hdop']
+        yield source, point_number, {
+            'username': username,
+            'latitude': element.get('lat'),
+            'longitude': element.get('lon'),
+            'accuracy': accuracy,
+            'timestamp': children.get('time'),
+        }
+        if stack:
+            stack[-1].remove(element)
+
+
+def to_row(source, line, record):
+    """
+    Flatten a raw record into the picklable tuple handed to workers.
+    """
+    return (
+        source,
+        line,
+        record.get('username'),
+        record.get('latitude'),
+        record.get('longitude'),
+        record.get('accuracy'),
+        record.get('timestamp'),
+        record.get('client_id') or None,
+    )
+
+
+def parse_timestamp(value):
+    """
+    Parse an ISO 8601 string or UNIX epoch seconds into a datetime matching
+    the USE_TZ setting.
+    """
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.replace('.', '', 1).isdigit()):
+        parsed = datetime.fromtimestamp(float(value), tz=dt_timezone.utc)
+    else:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+
+    if settings.USE_TZ and timezone.is_naive(parsed):
+        return timezone.make_aware(parsed)
+    if not settings.USE_TZ and timezone.is_aware(parsed):
+        return timezone.make_naive(parsed)
+    return parsed
+
+
+def _resolve_employees(usernames):
+    """
+    Map usernames to employee IDs, querying only the ones not cached yet.
+    Unknown usernames are cached as None.
+    """
+    missing = [username for username in usernames if username not in _employee_ids]
+    if missing:
+        found = dict(User.objects.filter(username__in=missing).values_list('username', 'id'))
+        for username in missing:
+            _employee_ids[username] = found.get(username)
+    return _employee_ids
+
+
+def clean_row(row, default_accuracy):
+    """
+    Validate one raw row. Returns (location fields, None) or (None, reason).
+    """
+    global _validator
+    if _validator is None:
+        _validator = LocationSerializer()
+
+    _, _, username, latitude, longitude, accuracy, timestamp, client_id = row
+    try:
+        latitude = _validator.validate_latitude(Decimal(str(latitude)).quantize(SEVEN_PLACES))
+        longitude = _validator.validate_longitude(Decimal(str(longitude)).quantize(SEVEN_PLACES))
+        if accuracy in (None, ''):
+            if default_accuracy is None:
+                return None, 'missing accuracy'
+            accuracy = default_accuracy
+        accuracy = _validator.validate_accuracy(Decimal(str(accuracy)).quantize(TWO_PLACES))
+        if accuracy > MAX_ACCURACY:
+            return None, 'accuracy out of range'
+    except (InvalidOperation, ValueError, TypeError):
+        return None, 'invalid number'
+    except serializers.ValidationError as e:
+        return None, str(e.detail[0])
+
+    if not timestamp:
+        return None, 'missing timestamp'
+    try:
+        timestamp = _validator.validate_timestamp(parse_timestamp(timestamp))
+    except (ValueError, TypeError, OverflowError, OSError):
+        return None, 'invalid timestamp'
+    except serializers.ValidationError as e:
+        return None, str(e.detail[0])
+
+    if client_id is not None and len(str(client_id)) > 64:
+        return None, 'client_id longer than 64 characters'
+
+    return {
+        'username': username,
+        'latitude': latitude,
+        'longitude': longitude,
+        'accuracy': accuracy,
+        'timestamp': timestamp,
+        'client_id': str(client_id) if client_id is not None else None,
+    }, None
+
+
+def _count_stored(locations):
+    """
+    Count the stored Location rows matching the (employee, client_id) of
+    `locations`; indexed by the unique constraint.
+    """
+    client_ids = defaultdict(set)
+    for location in locations:
+        client_ids[location.employee_id].add(location.client_id)
+
+    stored = 0
+    for employee_id, ids in client_ids.items():
+        ids = sorted(ids)
+        for start in range(0, len(ids), 1000):
+            stored += Location.objects.for_employee(employee_id).filter(
+                client_id__in=ids[start:start + 1000]
+            ).count()
+    return stored
+
+
+def import_chunk(rows, default_accuracy=None, dry_run=False):
+    """
+    Validate and bulk insert a chunk of rows. Returns (number of rows
+    inserted, or valid ones for a dry run, list of (source, line, reason)
+    for rejected rows).
+    """
+    rejected = []
+    cleaned = []
+    for row in rows:
+        fields, reason = clean_row(row, default_accuracy)
+        if reason:
+            rejected.append((row[0], row[1], reason))
+        else:
+            cleaned.append((row, fields))
+
+    employee_ids = _resolve_employees({fields['username'] for _, fields in cleaned if fields['username']})
+    locations = []
+    for row, fields in cleaned:
+        username = fields.pop('username')
+        employee_id = employee_ids.get(username) if username else None
+        if employee_id is None:
+            rejected.append((row[0], row[1], 'unknown employee'))
+            continue
+        if fields['client_id'] is None:
+            key = f"{employee_id}|{fields['timestamp'].isoformat()}|{fields['latitude']}|{fields['longitude']}"
+            fields['client_id'] = 'import-' + hashlib.sha1(key.encode()).hexdigest()
+        locations.append(Location(employee_id=employee_id, **fields))
+
+    if locations and not dry_run:
+        # Rows imported before (same client_id) are skipped; ignore_conflicts
+        # hides which ones, so the matching rows are counted before and after
+        stored = _count_stored(locations)
+        sharding.bulk_create_locations(locations, batch_size=1000, ignore_conflicts=True)
+        return _count_stored(locations) - stored, rejected
+    return len(locations), rejected
+
+
+def init_worker():
+    """
+    Worker process initializer; Django is not set up yet in spawned workers.
+    """
+    import django
+
+    django.setup()
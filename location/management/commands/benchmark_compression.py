@@ -0,0 +1,110 @@
+"""
+Management command to measure bytes saved and CPU cost of gzip/deflate
+for typical location payloads (history pages and sync upload batches).
+"""
+import io
+import json
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from location.parsers import decompress_stream
+
+
+class Command(BaseCommand):
+    help = 'Measures compression ratio and CPU time for location API payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='20,100,1000',
+                            help='Comma-separated numbers of points per payload')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        repeat = options['repeat']
+
+        self.stdout.write(self.style.SUCCESS('Response compression (history pages)'))
+        self.stdout.write('=' * 78)
+        self.stdout.write(
+            f'  {"points":>6}  {"encoding":<10}{"level":>5}  {"bytes":>9} -> {"compressed":>10}'
+            f'  {"saved":>6}  {"cpu/resp":>9}'
+        )
+        for size in sizes:
+            body = JSONRenderer().render(self._history_page(size))
+            for encoding, wbits in [('gzip', 16 + zlib.MAX_WBITS), ('deflate', zlib.MAX_WBITS)]:
+                for level in (1, 6, 9):
+                    elapsed, compressed = self._time(
+                        lambda: self._compress(body, level, wbits), repeat
+                    )
+                    self.stdout.write(
+                        f'  {size:>6}  {encoding:<10}{level:>5}  {len(body):>9} -> '
+                        f'{len(compressed):>10}  {1 - len(compressed) / len(body):>6.1%}'
+                        f'  {elapsed * 1000:>7.3f}ms'
+                    )
+        self.stdout.write('=' * 78)
+
+        self.stdout.write(self.style.SUCCESS('Request decompression (sync batches)'))
+        self.stdout.write('=' * 78)
+        for size in sizes:
+            body = json.dumps({'points': self._sync_points(size)}).encode()
+            compressed = self._compress(body, 6, 16 + zlib.MAX_WBITS)
+            elapsed, _ = self._time(
+                lambda: decompress_stream(io.BytesIO(compressed), 'gzip', len(body)), repeat
+            )
+            self.stdout.write(
+                f'  {size:>6} points  {len(body):>9} -> {len(compressed):>9} bytes on the wire'
+                f'  ({1 - len(compressed) / len(body):.1%} saved), '
+                f'decompress {elapsed * 1000:.3f}ms'
+            )
+        self.stdout.write('=' * 78)
+
+    @staticmethod
+    def _compress(body, level, wbits):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+        return compressor.compress(body) + compressor.flush()
+
+    @staticmethod
+    def _time(func, repeat):
+        start = time.process_time()
+        for _ in range(repeat):
+            result = func()
+        return (time.process_time() - start) / repeat, result
+
+    @staticmethod
+    def _history_page(size):
+        now = datetime.now()
+        return {
+            'count': size,
+            'next': None,
+            'previous': None,
+            'results': [
+                {
+                    'id': 1000000 + i,
+                    'employee_name': 'emp01',
+                    'latitude': f'{28.6139 + i * 0.00013:.7f}',
+                    'longitude': f'{77.2090 + i * 0.00011:.7f}',
+                    'accuracy': f'{5 + i % 20:.2f}',
+                    'timestamp': (now - timedelta(seconds=30 * i)).isoformat(),
+                    'received_at': (now - timedelta(seconds=30 * i - 1)).isoformat(),
+                    'client_id': f'3f1c9a2e-{i:012d}',
+                }
+                for i in range(size)
+            ],
+        }
+
+    @staticmethod
+    def _sync_points(size):
+        now = datetime.now()
+        return [
+            {
+                'client_id': f'3f1c9a2e-{i:012d}',
+                'latitude': f'{28.6139 + i * 0.00013:.7f}',
+                'longitude': f'{77.2090 + i * 0.00011:.7f}',
+                'accuracy': f'{5 + i % 20:.2f}',
+                'timestamp': (now - timedelta(seconds=30 * i)).isoformat(),
+            }
+            for i in range(size)
+        ]
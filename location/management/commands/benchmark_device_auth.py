@@ -0,0 +1,64 @@
+"""
+Management command to compare location ingest throughput with session
+authentication versus stateless device tokens.
+"""
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from location.authentication import issue_token
+from location.queryplans import server_name
+from location.models import Location
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks POST /api/locations/ requests/sec with session vs device token auth'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Requests per authentication scheme')
+
+    def handle(self, *args, **options):
+        # Measure authentication cost, not the ingest rate limit
+        with override_settings(INGEST_BUCKET_CAPACITY=10 ** 9):
+            self._run(options['requests'])
+
+    def _run(self, count):
+        user, _ = User.objects.get_or_create(username='bench_device')
+        payload = {'latitude': '28.6139000', 'longitude': '77.2090000', 'accuracy': '5.00'}
+
+        # Client's default Host 'testserver' is rejected by ALLOWED_HOSTS
+        session_client = Client(SERVER_NAME=server_name())
+        session_client.force_login(user)
+
+        token, _ = issue_token(user, 'benchmark-device')
+        token_client = Client(SERVER_NAME=server_name(), HTTP_AUTHORIZATION=f'Device {token}')
+
+        self.stdout.write(self.style.SUCCESS(f'Benchmarking {count} ingest requests per scheme'))
+        self.stdout.write('=' * 60)
+        results = {}
+        for name, client in [('Session', session_client), ('Device token', token_client)]:
+            # Warm up connections and caches
+            client.post('/api/locations/', payload)
+            start = time.perf_counter()
+            for _ in range(count):
+                response = client.post('/api/locations/', payload)
+                if response.status_code != 201:
+                    self.stdout.write(self.style.ERROR(
+                        f'{name}: unexpected status {response.status_code}'
+                    ))
+                    return
+            elapsed = time.perf_counter() - start
+            results[name] = count / elapsed
+            self.stdout.write(
+                f'  {name:<14} {results[name]:8.1f} req/s   '
+                f'{elapsed / count * 1000:6.2f} ms/request'
+            )
+        self.stdout.write('=' * 60)
+        self.stdout.write(self.style.SUCCESS(
+            f'Speedup: {results["Device token"] / results["Session"]:.2f}x'
+        ))
+
+        Location.objects.for_employee(user.id).delete()
@@ -0,0 +1,140 @@
+"""
+Management command to benchmark the Location admin changelist on a large table.
+
+Example (seeds up to 10M rows first, then times the common changelist views):
+    python manage.py benchmark_location_admin --rows 10000000 --seed
+"""
+import math
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.template.response import TemplateResponse
+from django.test import RequestFactory
+
+from location.models import Location
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the Location admin changelist, optionally seeding a large table first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000,
+                            help='Target number of Location rows (default: 10M)')
+        parser.add_argument('--employees', type=int, default=500,
+                            help='Number of benchmark employees to spread rows across')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread seeded timestamps over this many past days')
+        parser.add_argument('--seed', action='store_true',
+                            help='Insert rows until the table reaches --rows')
+        parser.add_argument('--batch-size', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed runs per scenario')
+
+    def handle(self, *args, **options):
+        employee_ids = self._ensure_employees(options['employees'])
+
+        if options['seed']:
+            self._seed(options['rows'], employee_ids, options['days'], options['batch_size'])
+
+        superuser, _ = User.objects.get_or_create(
+            username='bench_admin',
+            defaults={'is_staff': True, 'is_superuser': True},
+        )
+        model_admin = admin.site._registry[Location]
+        factory = RequestFactory()
+        # Deep page, but never past the last one (the changelist redirects to ?e=1)
+        deep_page = max(1, min(1000, math.ceil(Location.objects.count() / model_admin.list_per_page)))
+
+        scenarios = [
+            ('Unfiltered, page 1', {}),
+            (f'Unfiltered, page {deep_page}', {'p': str(deep_page)}),
+            ('Employee filter', {'employee__id__exact': str(employee_ids[0])}),
+            ('Past 7 days', {'tracked': '7d'}),
+            ('Username prefix search', {'q': 'bench_emp00'}),
+        ]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Benchmarking changelist on {connection.vendor} ({options["repeat"]} runs each)'
+        ))
+        self.stdout.write('=' * 60)
+        for name, params in scenarios:
+            timings = []
+            for _ in range(options['repeat']):
+                request = factory.get('/admin/location/location/', params)
+                request.user = superuser
+                start = time.perf_counter()
+                response = model_admin.changelist_view(request)
+                if not isinstance(response, TemplateResponse):
+                    break
+                response.render()
+                timings.append((time.perf_counter() - start) * 1000)
+            if not timings:
+                self.stdout.write(self.style.WARNING(
+                    f'  {name:<28} skipped (HTTP {response.status_code}, no changelist rendered)'
+                ))
+                continue
+            self.stdout.write(
+                f'  {name:<28} median {statistics.median(timings):8.1f} ms   '
+                f'max {max(timings):8.1f} ms'
+            )
+        self.stdout.write('=' * 60)
+
+    def _ensure_employees(self, count):
+        existing = set(User.objects.filter(username__startswith='bench_emp')
+                       .values_list('username', flat=True))
+        User.objects.bulk_create([
+            User(username=f'bench_emp{i:05d}')
+            for i in range(count)
+            if f'bench_emp{i:05d}' not in existing
+        ])
+        return list(User.objects.filter(username__startswith='bench_emp')
+                    .order_by('username').values_list('id', flat=True)[:count])
+
+    def _seed(self, target, employee_ids, days, batch_size):
+        current = Location.objects.count()
+        missing = target - current
+        if missing <= 0:
+            self.stdout.write(f'Table already has {current} rows, skipping seed')
+            return
+
+        self.stdout.write(f'Seeding {missing} rows...')
+        table = connection.ops.quote_name(Location._meta.db_table)
+        sql = (
+            f'INSERT INTO {table} (employee_id, latitude, longitude, accuracy, timestamp, received_at) '
+            f'VALUES (%s, %s, %s, %s, %s, %s)'
+        )
+        now = datetime.now()
+        span = days * 86400
+        started = time.perf_counter()
+
+        # Raw inserts skip model overhead for millions of rows
+        inserted = 0
+        while inserted < missing:
+            size = min(batch_size, missing - inserted)
+            rows = []
+            for _ in range(size):
+                timestamp = now - timedelta(seconds=random.randint(0, span))
+                rows.append((
+                    random.choice(employee_ids),
+                    round(random.uniform(8, 35), 7),
+                    round(random.uniform(68, 97), 7),
+                    round(random.uniform(3, 50), 2),
+                    timestamp,
+                    timestamp,
+                ))
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+            inserted += size
+            self.stdout.write(f'  {inserted}/{missing} rows', ending='\r')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {missing} rows in {elapsed:.1f}s ({missing / elapsed:.0f} rows/s)'
+        ))
@@ -0,0 +1,133 @@
+"""
+Management command to measure the request latency impact of logging:
+handlers called on the request thread versus the queue-based setup, with a
+log sink that stalls on every write (slow disk or console).
+"""
+import logging
+import statistics
+import time
+from logging.handlers import QueueListener
+from queue import Queue
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from hrms_project.logconfig import JSONFormatter, NonBlockingQueueHandler, SamplingFilter
+from location.models import Location
+from location.queryplans import server_name
+
+
+class StallingStream:
+    """
+    File-like sink that blocks for a fixed time on every write.
+    """
+
+    def __init__(self, stall_seconds):
+        self.stall_seconds = stall_seconds
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        time.sleep(self.stall_seconds)
+
+    def flush(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks p50/p99 latency of POST /api/locations/ with direct vs queued logging'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000,
+                            help='Requests per scenario')
+        parser.add_argument('--stall-ms', type=float, default=2.0,
+                            help='Time the log sink blocks on every write')
+        parser.add_argument('--sample-rate', type=float,
+                            default=settings.LOG_SAMPLE_RATES.get('Location created', 0.1),
+                            help='Kept fraction of "Location created" records when sampling')
+
+    def handle(self, *args, **options):
+        logger = logging.getLogger('location')
+        saved = (list(logger.handlers), list(logger.filters), logger.level, logger.propagate)
+        user, _ = User.objects.get_or_create(username='bench_logging')
+
+        scenarios = [
+            ('Direct handler', False, None),
+            ('Queued', True, None),
+            ('Queued + sampled', True, options['sample_rate']),
+        ]
+        self.stdout.write(self.style.SUCCESS(
+            f'Benchmarking {options["requests"]} ingest requests per scenario, '
+            f'log sink stalls {options["stall_ms"]} ms per write'
+        ))
+        self.stdout.write('=' * 72)
+        try:
+            # Measure logging cost, not the ingest rate limit
+            with override_settings(INGEST_BUCKET_CAPACITY=10 ** 9):
+                for name, queued, sample_rate in scenarios:
+                    self._configure(logger, queued, sample_rate, options['stall_ms'] / 1000)
+                    timings = self._run(user, options['requests'])
+                    dropped = self.queue_handler.dropped if self.queue_handler else 0
+                    self._teardown(logger)
+                    written = self.stream.writes
+                    quantiles = statistics.quantiles(timings, n=100)
+                    self.stdout.write(
+                        f'  {name:<18} p50 {quantiles[49]:7.2f} ms   p99 {quantiles[98]:7.2f} ms   '
+                        f'max {max(timings):7.2f} ms   {written:>5} written   {dropped:>5} dropped'
+                    )
+        finally:
+            logger.handlers[:] = saved[0]
+            logger.filters[:] = saved[1]
+            logger.setLevel(saved[2])
+            logger.propagate = saved[3]
+            Location.objects.for_employee(user.id).delete()
+        self.stdout.write('=' * 72)
+
+    def _configure(self, logger, queued, sample_rate, stall_seconds):
+        self.stream = StallingStream(stall_seconds)
+        handler = logging.StreamHandler(self.stream)
+        handler.setFormatter(JSONFormatter())
+
+        logger.handlers[:] = []
+        logger.filters[:] = []
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if sample_rate is not None:
+            logger.addFilter(SamplingFilter({'Location created': sample_rate}))
+
+        self.listener = None
+        self.queue_handler = None
+        if queued:
+            log_queue = Queue(settings.LOG_QUEUE_SIZE)
+            self.queue_handler = NonBlockingQueueHandler(log_queue)
+            logger.addHandler(self.queue_handler)
+            self.listener = QueueListener(log_queue, handler)
+            self.listener.start()
+        else:
+            logger.addHandler(handler)
+
+    def _teardown(self, logger):
+        if self.listener:
+            # Drains the queue, so every line is counted
+            self.listener.stop()
+        logger.handlers[:] = []
+        logger.filters[:] = []
+
+    def _run(self, user, count):
+        # Client's default Host 'testserver' is rejected by ALLOWED_HOSTS
+        client = Client(SERVER_NAME=server_name())
+        client.force_login(user)
+        payload = {'latitude': '28.6139000', 'longitude': '77.2090000', 'accuracy': '5.00'}
+
+        # Warm up connections and caches
+        client.post('/api/locations/', payload, content_type='application/json')
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.post('/api/locations/', payload, content_type='application/json')
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 201:
+                raise RuntimeError(f'Unexpected status {response.status_code}')
+        return timings
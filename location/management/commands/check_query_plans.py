@@ -0,0 +1,70 @@
+"""
+Management command to EXPLAIN the queries of the hot API paths and fail on
+full table scans or sorts outside an index (see location/queryplans.py).
+Meant for CI against a database with representative data.
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from location import queryplans
+
+
+class Command(BaseCommand):
+    help = 'Checks the query plans of hot API paths for full scans and filesorts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employee',
+            help='Username to run the paths as (default: an employee with locations)'
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            choices=[name for name, _ in queryplans.HOT_PATHS],
+            help='Only check this path (repeatable)'
+        )
+        parser.add_argument(
+            '--show-plans',
+            action='store_true',
+            help='Print the plan of every query, not only the failing ones'
+        )
+
+    def handle(self, *args, **options):
+        if options['employee']:
+            try:
+                employee = User.objects.get(username=options['employee'])
+            except User.DoesNotExist:
+                raise CommandError(f'Employee "{options["employee"]}" does not exist')
+        else:
+            employee = queryplans.default_employee()
+            if employee is None:
+                raise CommandError('No users found; create one or pass --employee')
+
+        try:
+            reports = queryplans.check_hot_paths(employee, options['path'])
+        except (queryplans.UnsupportedBackend, RuntimeError) as e:
+            raise CommandError(str(e))
+
+        failing = 0
+        for name, path_reports in reports.items():
+            self.stdout.write('=' * 60)
+            self.stdout.write(f'{name} ({len(path_reports)} queries, as {employee.username})')
+            self.stdout.write('=' * 60)
+            for report in path_reports:
+                if not report.issues and not options['show_plans']:
+                    continue
+                self.stdout.write(f'[{report.alias}] {report.sql}')
+                for row in report.plan:
+                    self.stdout.write(f'    {row}')
+                for issue in report.issues:
+                    self.stdout.write(self.style.ERROR(f'  {issue.kind}: {issue.detail}'))
+                if report.suggestion:
+                    self.stdout.write(self.style.WARNING(f'  suggestion: {report.suggestion}'))
+            path_failing = sum(1 for report in path_reports if report.issues)
+            failing += path_failing
+            if not path_failing:
+                self.stdout.write(self.style.SUCCESS('  all queries use indexes'))
+
+        if failing:
+            raise CommandError(f'{failing} query plan(s) with full scans or filesorts')
+        self.stdout.write(self.style.SUCCESS('All hot query plans use indexes'))
@@ -0,0 +1,29 @@
+"""
+Management command to refresh the precomputed heatmap tiles.
+Only location fixes added since the last run are binned; deleted fixes stay
+counted until the tiles are rebuilt with --rebuild.
+"""
+from django.core.management.base import BaseCommand
+
+from location import heatmap
+
+
+class Command(BaseCommand):
+    help = 'Bins new location fixes into the precomputed heatmap tiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Drop all tiles and rebuild them from every stored fix (removes deleted fixes)'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            heatmap.reset_tiles()
+            self.stdout.write('Dropped existing heatmap tiles')
+
+        consumed = heatmap.refresh_tiles()
+        self.stdout.write(self.style.SUCCESS(
+            f'Binned {consumed} location fix(es) at zoom levels {heatmap.zooms()}'
+        ))
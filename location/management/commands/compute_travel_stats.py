@@ -0,0 +1,35 @@
+"""
+Management command to refresh daily distance and travel statistics.
+Only days that received new location fixes since the last run are recomputed.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from location import travel_stats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes daily travel stats for days that received new location fixes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employee',
+            help='Username of a single employee to refresh (default: all employees)'
+        )
+
+    def handle(self, *args, **options):
+        username = options.get('employee')
+
+        if username:
+            try:
+                employee = User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'Employee "{username}" does not exist')
+            days = travel_stats.refresh_employee_stats(employee.id)
+            self.stdout.write(self.style.SUCCESS(
+                f'Recomputed {len(days)} day(s) for {username}'
+            ))
+            return
+
+        total = travel_stats.refresh_all_stats()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed {total} day(s) across all employees'))
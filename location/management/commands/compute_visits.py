@@ -0,0 +1,35 @@
+"""
+Management command to detect visits (stay points) from location fixes.
+Only fixes received since the last run are processed.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from location import visits
+
+
+class Command(BaseCommand):
+    help = 'Detects visits (stay points) from newly received location fixes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employee',
+            help='Username of a single employee to refresh (default: all employees)'
+        )
+
+    def handle(self, *args, **options):
+        username = options.get('employee')
+
+        if username:
+            try:
+                employee = User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'Employee "{username}" does not exist')
+            count = visits.refresh_employee_visits(employee.id)
+            self.stdout.write(self.style.SUCCESS(
+                f'Rebuilt {count} visit(s) for {username}'
+            ))
+            return
+
+        total = visits.refresh_all_visits()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} visit(s) across all employees'))
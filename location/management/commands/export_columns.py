@@ -0,0 +1,67 @@
+"""
+Management command to export location fixes as memory-mappable column files
+(see location/columnar.py for the layout).
+
+Examples:
+    python manage.py export_columns /data/locations --start-date 2024-05-01
+    python manage.py export_columns /data/locations --append   # daily cron
+"""
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from location import columnar
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Exports location fixes as per-day or per-employee column files for NumPy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Export directory')
+        parser.add_argument('--partition', choices=columnar.SCHEMES,
+                            help='One directory per day (default for new exports) or per employee')
+        parser.add_argument('--append', action='store_true',
+                            help='Extend an existing export with the fixes added since its last run')
+        parser.add_argument('--start-date', help='First day to export (YYYY-MM-DD)')
+        parser.add_argument('--end-date', help='Last day to export, inclusive (YYYY-MM-DD)')
+        parser.add_argument('--employee', help='Username of a single employee to export')
+
+    def handle(self, *args, **options):
+        start = parse_date(options['start_date']) if options['start_date'] else None
+        end = parse_date(options['end_date']) + timedelta(days=1) if options['end_date'] else None
+        employee_id = None
+        if options['employee']:
+            try:
+                employee_id = User.objects.get(username=options['employee']).id
+            except User.DoesNotExist:
+                raise CommandError(f'Employee "{options["employee"]}" does not exist')
+        if options['append'] and (start or end or employee_id):
+            self.stdout.write(self.style.WARNING(
+                'Appending uses the filters of the existing export; '
+                '--start-date, --end-date and --employee only apply to a new export'
+            ))
+
+        try:
+            written, partitions = columnar.export(
+                options['output'],
+                scheme=options['partition'],
+                append=options['append'],
+                start=start,
+                end=end,
+                employee_id=employee_id,
+            )
+        except columnar.ExportError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {written} location fix(es) into {len(partitions)} partition(s) '
+            f'under {options["output"]}'
+        ))
@@ -0,0 +1,150 @@
+"""
+Management command to import historical GPS logs (CSV, NDJSON or GPX).
+
+Files are streamed, validated and bulk inserted in parallel worker processes.
+CSV/NDJSON records use the keys username, latitude, longitude, accuracy,
+timestamp (ISO 8601 or UNIX seconds) and optionally client_id. GPX files
+carry no username, so --employee is required for them.
+
+Geofence events are not generated for imported history; travel stats,
+visits and heatmap tiles pick the rows up on their next run.
+
+Example:
+    python manage.py import_locations logs/*.csv --workers 8 --rejects rejects.csv
+"""
+import csv
+import os
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from location import importers
+
+
+class Command(BaseCommand):
+    help = 'Streams CSV/NDJSON/GPX location logs into the Location table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Files to import')
+        parser.add_argument('--format', choices=importers.FORMATS,
+                            help='File format (default: detected from the extension)')
+        parser.add_argument('--employee',
+                            help='Username for records without one (required for GPX)')
+        parser.add_argument('--default-accuracy', type=float,
+                            help='Accuracy in meters for records without one')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (0 imports in this process; use 1 with SQLite)')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Rows validated and inserted per task')
+        parser.add_argument('--rejects', help='Write rejected rows (source, line, reason) to this CSV file')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate only, do not write anything')
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            if not os.path.isfile(path):
+                raise CommandError(f'File "{path}" does not exist')
+            try:
+                file_format = options['format'] or importers.detect_format(path)
+            except ValueError as e:
+                raise CommandError(str(e))
+            if file_format == 'gpx' and not options['employee']:
+                raise CommandError('GPX files need --employee')
+
+        self.reasons = Counter()
+        self.written = 0
+        self.rejected = 0
+        self.processed = 0
+        self.rejects_file = open(options['rejects'], 'w', newline='') if options['rejects'] else None
+        self.rejects_writer = csv.writer(self.rejects_file) if self.rejects_file else None
+        if self.rejects_writer:
+            self.rejects_writer.writerow(['source', 'line', 'reason'])
+
+        self.started = time.perf_counter()
+        try:
+            chunks = self._chunks(options)
+            task_args = (options['default_accuracy'], options['dry_run'])
+            if options['workers'] <= 0:
+                for chunk in chunks:
+                    self._collect(chunk, importers.import_chunk(chunk, *task_args))
+            else:
+                self._run_parallel(chunks, task_args, options['workers'])
+        finally:
+            if self.rejects_file:
+                self.rejects_file.close()
+
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+        if options['dry_run']:
+            summary = f'Validated {self.written} row(s)'
+        else:
+            skipped = self.processed - self.rejected - self.written
+            summary = f'Imported {self.written} new row(s), skipped {skipped} already imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{summary}, rejected {self.rejected} of {self.processed} '
+            f'in {elapsed:.1f}s ({self.processed / max(elapsed, 1e-9):.0f} rows/s)'
+        ))
+        for reason, count in self.reasons.most_common():
+            self.stdout.write(self.style.WARNING(f'  {count:>8}  {reason}'))
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+
+    def _chunks(self, options):
+        """
+        Stream rows from every file in chunks; unparsable records are
+        rejected here, before reaching the workers.
+        """
+        def rows():
+            for path in options['paths']:
+                file_format = options['format'] or importers.detect_format(path)
+                for source, line, record in importers.read_records(path, file_format, options['employee']):
+                    if record is None:
+                        self._reject(source, line, 'malformed record')
+                        self.processed += 1
+                        continue
+                    yield importers.to_row(source, line, record)
+
+        stream = rows()
+        while True:
+            chunk = list(islice(stream, options['chunk_size']))
+            if not chunk:
+                return
+            yield chunk
+
+    def _run_parallel(self, chunks, task_args, workers):
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=importers.init_worker) as executor:
+            pending = {}
+            for chunk in chunks:
+                future = executor.submit(importers.import_chunk, chunk, *task_args)
+                pending[future] = chunk
+                # Bound the rows held in memory while workers catch up
+                if len(pending) >= workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._collect(pending.pop(future), future.result())
+            for future in wait(pending).done:
+                self._collect(pending.pop(future), future.result())
+
+    def _collect(self, chunk, result):
+        written, rejected = result
+        self.written += written
+        self.processed += len(chunk)
+        for source, line, reason in rejected:
+            self._reject(source, line, reason)
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            f'  {self.processed} rows, {self.processed / max(elapsed, 1e-9):.0f} rows/s',
+            ending='\r'
+        )
+
+    def _reject(self, source, line, reason):
+        self.rejected += 1
+        self.reasons[reason] += 1
+        if self.rejects_writer:
+            self.rejects_writer.writerow([source, line, reason])
@@ -0,0 +1,138 @@
+"""
+Management command to move Location rows to the shard that owns their employee.
+
+Run after changing DB_SHARDS, or once after enabling sharding to move the
+existing rows out of the 'default' database. Rows keep their primary keys,
+so shards must use disjoint ID ranges; the target's ID sequence is moved
+past the moved rows. Rows are copied first and deleted from the source only
+once the copy has committed, so an interrupted run can simply be repeated.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connections, transaction
+
+from location.models import Location
+from location.sharding import shard_aliases, shard_for_employee
+
+
+def advance_sequence(alias, last_id):
+    """
+    Make the Location ID sequence of a database continue after `last_id`,
+    so rows inserted after a move get higher IDs than the moved rows (the
+    per-employee ID cursors and watermarks rely on it).
+    """
+    connection = connections[alias]
+    table = Location._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('UPDATE sqlite_sequence SET seq = MAX(seq, %s) WHERE name = %s', [last_id, table])
+            if not cursor.rowcount:
+                cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, last_id])
+        elif connection.vendor == 'mysql':
+            # MySQL never lowers AUTO_INCREMENT below the highest stored ID
+            cursor.execute(f'ALTER TABLE {connection.ops.quote_name(table)} AUTO_INCREMENT = {int(last_id) + 1}')
+        else:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Location]):
+                cursor.execute(sql)
+
+
+class Command(BaseCommand):
+    help = 'Moves Location rows to the shard owning their employee'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many rows would move')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        aliases = shard_aliases()
+        if not aliases:
+            raise CommandError('Sharding is disabled (DB_SHARDS is empty)')
+
+        fields = Location._meta.concrete_fields
+        started = time.perf_counter()
+        moved_total = 0
+
+        for source in ['default'] + aliases:
+            employee_ids = (
+                Location.objects.using(source).order_by()
+                .values_list('employee_id', flat=True).distinct()
+            )
+            for employee_id in list(employee_ids):
+                target = shard_for_employee(employee_id, aliases)
+                if target == source:
+                    continue
+
+                rows = Location.objects.using(source).filter(employee_id=employee_id)
+                count = rows.count()
+                self.stdout.write(f'  employee {employee_id}: {count} rows {source} -> {target}')
+                if options['dry_run']:
+                    moved_total += count
+                    continue
+
+                try:
+                    moved_total += self._move(
+                        rows, employee_id, source, target, fields, options['batch_size']
+                    )
+                except IntegrityError as e:
+                    raise CommandError(
+                        f'ID collision while moving employee {employee_id} to {target} '
+                        f'({e}). Shards must use disjoint ID ranges.'
+                    )
+
+        elapsed = time.perf_counter() - started
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {moved_total} rows in {elapsed:.1f}s'))
+
+    def _move(self, rows, employee_id, source, target, fields, batch_size):
+        """
+        Copy the rows to the target shard and commit, then delete the copied
+        rows from the source. If the run stops in between, the next run
+        skips the rows already on the target and finishes the delete.
+        Raw SQL keeps the original IDs and timestamps (bulk_create would
+        re-apply auto_now_add) and skips the delete collector, which would
+        null geofence events pointing at the moved rows.
+        """
+        connection = connections[target]
+        table = connection.ops.quote_name(Location._meta.db_table)
+        column_sql = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        sql = f'INSERT INTO {table} ({column_sql}) VALUES ({placeholders})'
+        attnames = [field.attname for field in fields]
+
+        copied = set(
+            Location.objects.using(target).filter(employee_id=employee_id).values_list('id', flat=True)
+        )
+        moved_ids = []
+        with transaction.atomic(using=target):
+            batch = []
+            for row in rows.order_by('id').values_list(*attnames).iterator(chunk_size=batch_size):
+                moved_ids.append(row[0])
+                if row[0] in copied:
+                    continue
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    with connection.cursor() as cursor:
+                        cursor.executemany(sql, batch)
+                    batch = []
+            if batch:
+                with connection.cursor() as cursor:
+                    cursor.executemany(sql, batch)
+        if moved_ids:
+            # Outside the transaction: ALTER TABLE commits implicitly on MySQL
+            advance_sequence(target, max(moved_ids))
+
+        # Only once the copy has committed
+        source_connection = connections[source]
+        source_table = source_connection.ops.quote_name(Location._meta.db_table)
+        for start in range(0, len(moved_ids), batch_size):
+            chunk = moved_ids[start:start + batch_size]
+            with transaction.atomic(using=source), source_connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {source_table} WHERE {source_connection.ops.quote_name("id")} '
+                    f'IN ({", ".join(["%s"] * len(chunk))})',
+                    chunk
+                )
+        return len(moved_ids)
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.30 on 2026-10-19 23:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('location', '0002_alter_location_accuracy_alter_location_latitude_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Geofence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Office or site name', max_length=100)),
+                ('shape', models.CharField(choices=[('circle', 'Circle'), ('polygon', 'Polygon')], default='circle', help_text='Geometry type of the geofence', max_length=10)),
+                ('center_latitude', models.DecimalField(blank=True, decimal_places=7, help_text='Circle center latitude', max_digits=10, null=True)),
+                ('center_longitude', models.DecimalField(blank=True, decimal_places=7, help_text='Circle center longitude', max_digits=11, null=True)),
+                ('radius', models.DecimalField(blank=True, decimal_places=2, help_text='Circle radius in meters', max_digits=10, null=True)),
+                ('vertices', models.JSONField(blank=True, default=list, help_text='Polygon vertices as a list of [latitude, longitude] pairs')),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Geofence',
+                'verbose_name_plural': 'Geofences',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='GeofenceMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entered_at', models.DateTimeField()),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='geofence_memberships', to=settings.AUTH_USER_MODEL)),
+                ('geofence', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='location.geofence')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GeofenceEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('enter', 'Enter'), ('exit', 'Exit')], max_length=5)),
+                ('timestamp', models.DateTimeField(help_text='Time of the triggering location fix')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='geofence_events', to=settings.AUTH_USER_MODEL)),
+                ('geofence', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='location.geofence')),
+                ('location', models.ForeignKey(blank=True, help_text='Location fix that triggered the transition', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='geofence_events', to='location.location')),
+            ],
+            options={
+                'verbose_name': 'Geofence Event',
+                'verbose_name_plural': 'Geofence Events',
+                'ordering': ['-timestamp'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='geofencemembership',
+            constraint=models.UniqueConstraint(fields=('employee', 'geofence'), name='unique_geofence_membership'),
+        ),
+        migrations.AddIndex(
+            model_name='geofenceevent',
+            index=models.Index(fields=['employee', '-timestamp'], name='location_ge_employe_7e6024_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='geofenceevent',
+            index=models.Index(fields=['geofence', '-timestamp'], name='location_ge_geofenc_56dfd2_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-19 23:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('location', '0003_geofences'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessingWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pipeline', models.CharField(max_length=50)),
+                ('last_location_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='processing_watermarks', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyTravelStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('distance_m', models.FloatField(default=0, help_text='Distance travelled in meters')),
+                ('moving_seconds', models.IntegerField(default=0, help_text='Time spent moving in seconds')),
+                ('max_speed_mps', models.FloatField(default=0, help_text='Maximum speed in meters per second')),
+                ('point_count', models.IntegerField(default=0, help_text='Location fixes used')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_travel_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily Travel Stats',
+                'verbose_name_plural': 'Daily Travel Stats',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='processingwatermark',
+            constraint=models.UniqueConstraint(fields=('pipeline', 'employee'), name='unique_processing_watermark'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailytravelstats',
+            constraint=models.UniqueConstraint(fields=('employee', 'date'), name='unique_daily_travel_stats'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-19 23:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('location', '0004_travel_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='geofenceevent',
+            name='location',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text='Location fix that triggered the transition', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='geofence_events', to='location.location'),
+        ),
+        migrations.AlterField(
+            model_name='location',
+            name='employee',
+            field=models.ForeignKey(db_constraint=False, help_text='Employee who recorded this location', on_delete=django.db.models.deletion.CASCADE, related_name='locations', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
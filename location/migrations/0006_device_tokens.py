@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 23:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('location', '0005_location_db_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('device_id', models.CharField(help_text='Client-provided device identifier', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('revoked', models.BooleanField(default=False)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='device_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Device Token',
+                'verbose_name_plural': 'Device Tokens',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['revoked', 'expires_at'], name='location_de_revoked_da76ab_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def copy_timestamp_to_received_at(apps, schema_editor):
+    Location = apps.get_model('location', 'Location')
+    Location.objects.using(schema_editor.connection.alias).update(
+        received_at=models.F('timestamp')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0006_device_tokens'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='location',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='When the location was recorded (device time for offline uploads)'),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='received_at',
+            field=models.DateTimeField(null=True, help_text='When the server received the location'),
+        ),
+        migrations.RunPython(copy_timestamp_to_received_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='location',
+            name='received_at',
+            field=models.DateTimeField(auto_now_add=True, help_text='When the server received the location'),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='client_id',
+            field=models.CharField(blank=True, help_text='Client-generated point ID used to deduplicate retried uploads', max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='location',
+            constraint=models.UniqueConstraint(fields=('employee', 'client_id'), name='unique_location_client_id'),
+        ),
+    ]
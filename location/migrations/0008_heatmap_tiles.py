@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-19 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0007_location_offline_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeatmapTile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zoom', models.PositiveSmallIntegerField()),
+                ('x', models.PositiveIntegerField()),
+                ('y', models.PositiveIntegerField()),
+                ('date', models.DateField()),
+                ('counts', models.BinaryField()),
+                ('point_count', models.IntegerField(default=0, help_text='Location fixes binned into this tile')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Heatmap Tile',
+                'verbose_name_plural': 'Heatmap Tiles',
+                'ordering': ['-date', 'zoom', 'x', 'y'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='heatmaptile',
+            constraint=models.UniqueConstraint(fields=('zoom', 'x', 'y', 'date'), name='unique_heatmap_tile'),
+        ),
+    ]
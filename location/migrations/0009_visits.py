@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-19 23:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('location', '0008_heatmap_tiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingwatermark',
+            name='resume_timestamp',
+            field=models.DateTimeField(blank=True, help_text='Fix timestamp from which a stateful pipeline resumes', null=True),
+        ),
+        migrations.CreateModel(
+            name='Visit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.DecimalField(decimal_places=7, help_text='Centroid latitude', max_digits=10)),
+                ('longitude', models.DecimalField(decimal_places=7, help_text='Centroid longitude', max_digits=10)),
+                ('arrival', models.DateTimeField()),
+                ('departure', models.DateTimeField(help_text='Last fix of the stay (latest fix while ongoing)')),
+                ('point_count', models.IntegerField(default=0, help_text='Location fixes in the stay')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visits', to=settings.AUTH_USER_MODEL)),
+                ('geofence', models.ForeignKey(blank=True, help_text='Geofence containing the stay, if any', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='visits', to='location.geofence')),
+            ],
+            options={
+                'verbose_name': 'Visit',
+                'verbose_name_plural': 'Visits',
+                'ordering': ['-arrival'],
+                'indexes': [models.Index(fields=['employee', '-arrival'], name='location_vi_employe_7b4298_idx'), models.Index(fields=['employee', 'departure'], name='location_vi_employe_d0334d_idx')],
+            },
+        ),
+    ]
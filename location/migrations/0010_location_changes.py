@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-19 23:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('location', '0009_visits'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['employee', 'id'], name='location_lo_employe_1e871a_idx'),
+        ),
+        migrations.AddField(
+            model_name='locationtombstone',
+            name='employee',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='location_tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='locationtombstone',
+            index=models.Index(fields=['employee', 'id'], name='location_lo_employe_7a18fa_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 23:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('location', '0010_location_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportingLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='manager_lines', to=settings.AUTH_USER_MODEL)),
+                ('manager', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_lines', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Reporting Line',
+                'verbose_name_plural': 'Reporting Lines',
+                'ordering': ['manager', 'employee'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reportingline',
+            constraint=models.UniqueConstraint(fields=('manager', 'employee'), name='unique_reporting_line'),
+        ),
+        migrations.AddConstraint(
+            model_name='reportingline',
+            constraint=models.CheckConstraint(check=models.Q(('manager', models.F('employee')), _negated=True), name='reporting_line_not_self'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-19 23:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('location', '0011_reporting_lines'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationOutlier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('longitude', models.DecimalField(decimal_places=7, max_digits=11)),
+                ('accuracy', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('timestamp', models.DateTimeField()),
+                ('client_id', models.CharField(blank=True, max_length=64, null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('status', models.CharField(choices=[('quarantined', 'Quarantined'), ('flagged', 'Flagged')], default='quarantined', max_length=12)),
+                ('implied_speed', models.FloatField(help_text='Accuracy-adjusted speed from the reference fix (m/s)')),
+                ('jump_distance', models.FloatField(help_text='Accuracy-adjusted distance from the reference fix (m)')),
+                ('reference_timestamp', models.DateTimeField(help_text='Timestamp of the reference fix')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='location_outliers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Location Outlier',
+                'verbose_name_plural': 'Location Outliers',
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['employee', '-timestamp'], name='location_lo_employe_73d9a1_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='locationoutlier',
+            constraint=models.UniqueConstraint(fields=('employee', 'client_id'), name='unique_outlier_client_id'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-20 00:07
+
+from django.db import migrations, models
+
+
+def revoke_inactive_employees(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    RevokedEmployee = apps.get_model('location', 'RevokedEmployee')
+    alias = schema_editor.connection.alias
+    RevokedEmployee.objects.using(alias).bulk_create([
+        RevokedEmployee(employee_id=user_id, reason='deactivated')
+        for user_id in User.objects.using(alias).filter(is_active=False).values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('location', '0012_location_outliers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedEmployee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee_id', models.BigIntegerField(unique=True)),
+                ('reason', models.CharField(choices=[('deactivated', 'Deactivated'), ('deleted', 'Deleted')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Revoked Employee',
+                'verbose_name_plural': 'Revoked Employees',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.RunPython(revoke_inactive_employees, migrations.RunPython.noop),
+    ]
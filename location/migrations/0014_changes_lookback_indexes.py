@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-20 00:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0013_revoked_employees'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['employee', 'received_at'], name='location_lo_employe_960b23_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locationtombstone',
+            index=models.Index(fields=['employee', 'deleted_at'], name='location_lo_employe_afdb14_idx'),
+        ),
+    ]
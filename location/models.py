@@ -1,6 +1,26 @@
+import uuid
+
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
+from .sharding import shard_for_employee
+
+
+class LocationQuerySet(models.QuerySet):
+    """
+    QuerySet aware of employee-based sharding (see location/sharding.py).
+    """
+
+    def for_employee(self, employee_id):
+        """
+        Locations of one employee, read from the shard that owns them.
+        """
+        shard = shard_for_employee(employee_id)
+        queryset = self.using(shard) if shard else self
+        return queryset.filter(employee_id=employee_id)
+
 
 class Location(models.Model):
     """
@@ -10,6 +30,8 @@ class Location(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='locations',
+        # Shards do not hold the user table, so no database-level constraint
+        db_constraint=False,
         help_text='Employee who recorded this location'
     )
     latitude = models.DecimalField(
@@ -28,18 +50,499 @@ class Location(models.Model):
         help_text='GPS accuracy in meters'
     )
     timestamp = models.DateTimeField(
+        default=timezone.now,
+        help_text='When the location was recorded (device time for offline uploads)'
+    )
+    received_at = models.DateTimeField(
         auto_now_add=True,
-        help_text='When the location was recorded'
+        help_text='When the server received the location'
+    )
+    client_id = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text='Client-generated point ID used to deduplicate retried uploads'
     )
 
+    objects = LocationQuerySet.as_manager()
+
     class Meta:
         ordering = ['-timestamp']
         indexes = [
             models.Index(fields=['employee', '-timestamp']),
             models.Index(fields=['timestamp']),
+            # Changes feed: rows of one employee past a cursor ID, and the
+            # recently stored rows re-sent as lookback overlap
+            models.Index(fields=['employee', 'id']),
+            models.Index(fields=['employee', 'received_at']),
+        ]
+        constraints = [
+            # NULL client IDs (legacy/web uploads) never conflict
+            models.UniqueConstraint(
+                fields=['employee', 'client_id'],
+                name='unique_location_client_id'
+            ),
         ]
         verbose_name = 'Location'
         verbose_name_plural = 'Locations'
 
     def __str__(self):
         return f"{self.employee.username} - {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
+
+    def save(self, *args, **kwargs):
+        # Always store the row on the shard owning the employee
+        shard = shard_for_employee(self.employee_id)
+        if shard:
+            kwargs['using'] = shard
+        super().save(*args, **kwargs)
+
+
+class ReportingLine(models.Model):
+    """
+    Manager -> direct report relationship. Managers can view the merged
+    location timeline of their reports.
+    """
+    manager = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='report_lines'
+    )
+    employee = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='manager_lines'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['manager', 'employee']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['manager', 'employee'],
+                name='unique_reporting_line'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(manager=models.F('employee')),
+                name='reporting_line_not_self'
+            ),
+        ]
+        verbose_name = 'Reporting Line'
+        verbose_name_plural = 'Reporting Lines'
+
+    def __str__(self):
+        return f"{self.employee.username} reports to {self.manager.username}"
+
+
+class LocationTombstone(models.Model):
+    """
+    Record of a deleted Location row, served by the changes feed so polling
+    clients can drop rows they already have (see location/changes.py).
+    Tombstones live on the default database even when Location is sharded.
+    """
+    employee = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='location_tombstones'
+    )
+    location_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['employee', 'id']),
+            models.Index(fields=['employee', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"Location {self.location_id} deleted at {self.deleted_at}"
+
+
+class LocationOutlier(models.Model):
+    """
+    Fix rejected by the ingest outlier filter (impossible speed relative to
+    the employee's last accepted fix, see location/outliers.py).
+    Quarantined fixes are kept only here; flagged fixes were also stored
+    as Location rows.
+    """
+    STATUS_QUARANTINED = 'quarantined'
+    STATUS_FLAGGED = 'flagged'
+    STATUS_CHOICES = [
+        (STATUS_QUARANTINED, 'Quarantined'),
+        (STATUS_FLAGGED, 'Flagged'),
+    ]
+
+    employee = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='location_outliers'
+    )
+    latitude = models.DecimalField(max_digits=10, decimal_places=7)
+    longitude = models.DecimalField(max_digits=11, decimal_places=7)
+    accuracy = models.DecimalField(max_digits=15, decimal_places=2)
+    timestamp = models.DateTimeField()
+    client_id = models.CharField(max_length=64, null=True, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=STATUS_QUARANTINED)
+    implied_speed = models.FloatField(help_text='Accuracy-adjusted speed from the reference fix (m/s)')
+    jump_distance = models.FloatField(help_text='Accuracy-adjusted distance from the reference fix (m)')
+    reference_timestamp = models.DateTimeField(help_text='Timestamp of the reference fix')
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['employee', '-timestamp']),
+        ]
+        constraints = [
+            # Retried uploads of a quarantined point are recorded once
+            models.UniqueConstraint(
+                fields=['employee', 'client_id'],
+                name='unique_outlier_client_id'
+            ),
+        ]
+        verbose_name = 'Location Outlier'
+        verbose_name_plural = 'Location Outliers'
+
+    def __str__(self):
+        return f"{self.employee.username} - {self.timestamp} ({self.implied_speed:.0f} m/s, {self.status})"
+
+
+class Geofence(models.Model):
+    """
+    Office/site boundary used to derive attendance from location fixes.
+    A geofence is either a circle (center + radius) or a polygon (list of vertices).
+    """
+    SHAPE_CIRCLE = 'circle'
+    SHAPE_POLYGON = 'polygon'
+    SHAPE_CHOICES = [
+        (SHAPE_CIRCLE, 'Circle'),
+        (SHAPE_POLYGON, 'Polygon'),
+    ]
+
+    name = models.CharField(max_length=100, help_text='Office or site name')
+    shape = models.CharField(
+        max_length=10,
+        choices=SHAPE_CHOICES,
+        default=SHAPE_CIRCLE,
+        help_text='Geometry type of the geofence'
+    )
+    center_latitude = models.DecimalField(
+        max_digits=10,
+        decimal_places=7,
+        null=True,
+        blank=True,
+        help_text='Circle center latitude'
+    )
+    center_longitude = models.DecimalField(
+        max_digits=11,
+        decimal_places=7,
+        null=True,
+        blank=True,
+        help_text='Circle center longitude'
+    )
+    radius = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text='Circle radius in meters'
+    )
+    vertices = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='Polygon vertices as a list of [latitude, longitude] pairs'
+    )
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Geofence'
+        verbose_name_plural = 'Geofences'
+
+    def __str__(self):
+        return f"{self.name} ({self.get_shape_display()})"
+
+    def clean(self):
+        """
+        Validate that the fields required by the selected shape are present.
+        """
+        if self.shape == self.SHAPE_CIRCLE:
+            if self.center_latitude is None or self.center_longitude is None or not self.radius:
+                raise ValidationError('Circle geofences need a center and a positive radius')
+            if self.radius <= 0:
+                raise ValidationError({'radius': 'Radius must be a positive number'})
+        elif self.shape == self.SHAPE_POLYGON:
+            if not isinstance(self.vertices, list) or len(self.vertices) < 3:
+                raise ValidationError({'vertices': 'Polygon geofences need at least 3 vertices'})
+            for vertex in self.vertices:
+                if (not isinstance(vertex, (list, tuple)) or len(vertex) != 2 or
+                        not -90 <= float(vertex[0]) <= 90 or
+                        not -180 <= float(vertex[1]) <= 180):
+                    raise ValidationError(
+                        {'vertices': 'Each vertex must be a [latitude, longitude] pair'}
+                    )
+
+
+class GeofenceMembership(models.Model):
+    """
+    Geofences an employee is currently inside.
+    A row exists between an enter event and the matching exit event.
+    """
+    employee = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='geofence_memberships'
+    )
+    geofence = models.ForeignKey(
+        Geofence,
+        on_delete=models.CASCADE,
+        related_name='memberships'
+    )
+    entered_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['employee', 'geofence'],
+                name='unique_geofence_membership'
+            ),
+        ]
+
+
+class GeofenceEvent(models.Model):
+    """
+    Enter/exit transition of an employee across a geofence boundary.
+    """
+    EVENT_ENTER = 'enter'
+    EVENT_EXIT = 'exit'
+    EVENT_CHOICES = [
+        (EVENT_ENTER, 'Enter'),
+        (EVENT_EXIT, 'Exit'),
+    ]
+
+    employee = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='geofence_events'
+    )
+    geofence = models.ForeignKey(
+        Geofence,
+        on_delete=models.CASCADE,
+        related_name='events'
+    )
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        # Location rows may live on another shard
+        db_constraint=False,
+        related_name='geofence_events',
+        help_text='Location fix that triggered the transition'
+    )
+    event_type = models.CharField(max_length=5, choices=EVENT_CHOICES)
+    timestamp = models.DateTimeField(help_text='Time of the triggering location fix')
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['employee', '-timestamp']),
+            models.Index(fields=['geofence', '-timestamp']),
+        ]
+        verbose_name = 'Geofence Event'
+        verbose_name_plural = 'Geofence Events'
+
+    def __str__(self):
+        return f"{self.employee.username} {self.event_type} {self.geofence.name}"
+
+
+class ProcessingWatermark(models.Model):
+    """
+    Last Location ID consumed by an incremental processing pipeline.
+    Pipelines that track progress per employee store one row per employee.
+    """
+    pipeline = models.CharField(max_length=50)
+    employee = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='processing_watermarks'
+    )
+    last_location_id = models.BigIntegerField(default=0)
+    resume_timestamp = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Fix timestamp from which a stateful pipeline resumes'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['pipeline', 'employee'],
+                name='unique_processing_watermark'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.pipeline} @ {self.last_location_id}"
+
+
+class DailyTravelStats(models.Model):
+    """
+    Distance travelled, moving time and max speed of an employee for one day.
+    Computed incrementally from consecutive Location rows.
+    """
+    employee = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='daily_travel_stats'
+    )
+    date = models.DateField()
+    distance_m = models.FloatField(default=0, help_text='Distance travelled in meters')
+    moving_seconds = models.IntegerField(default=0, help_text='Time spent moving in seconds')
+    max_speed_mps = models.FloatField(default=0, help_text='Maximum speed in meters per second')
+    point_count = models.IntegerField(default=0, help_text='Location fixes used')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['employee', 'date'],
+                name='unique_daily_travel_stats'
+            ),
+        ]
+        verbose_name = 'Daily Travel Stats'
+        verbose_name_plural = 'Daily Travel Stats'
+
+    def __str__(self):
+        return f"{self.employee.username} - {self.date} ({self.distance_m / 1000:.2f} km)"
+
+
+class Visit(models.Model):
+    """
+    Stay point: a period during which an employee remained within a small
+    radius (client site, break, office). Detected from consecutive Location
+    rows by location/visits.py.
+    """
+    employee = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='visits'
+    )
+    latitude = models.DecimalField(max_digits=10, decimal_places=7, help_text='Centroid latitude')
+    longitude = models.DecimalField(max_digits=10, decimal_places=7, help_text='Centroid longitude')
+    arrival = models.DateTimeField()
+    departure = models.DateTimeField(help_text='Last fix of the stay (latest fix while ongoing)')
+    point_count = models.IntegerField(default=0, help_text='Location fixes in the stay')
+    geofence = models.ForeignKey(
+        Geofence,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='visits',
+        help_text='Geofence containing the stay, if any'
+    )
+
+    class Meta:
+        ordering = ['-arrival']
+        indexes = [
+            models.Index(fields=['employee', '-arrival']),
+            models.Index(fields=['employee', 'departure']),
+        ]
+        verbose_name = 'Visit'
+        verbose_name_plural = 'Visits'
+
+    @property
+    def duration_seconds(self):
+        return int((self.departure - self.arrival).total_seconds())
+
+    def __str__(self):
+        return f"{self.employee.username} - {self.arrival:%Y-%m-%d %H:%M} ({self.duration_seconds // 60} min)"
+
+
+class DeviceToken(models.Model):
+    """
+    Signed device token issued to an employee's device.
+    Tokens are verified statelessly; this table only records issued tokens
+    so they can be revoked (see location/authentication.py).
+    """
+    jti = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    employee = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='device_tokens'
+    )
+    device_id = models.CharField(max_length=100, help_text='Client-provided device identifier')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    revoked = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['revoked', 'expires_at']),
+        ]
+        verbose_name = 'Device Token'
+        verbose_name_plural = 'Device Tokens'
+
+    def __str__(self):
+        return f"{self.employee.username} - {self.device_id}"
+
+
+class RevokedEmployee(models.Model):
+    """
+    Employee whose device tokens are all rejected: deactivated (the entry is
+    removed on reactivation) or deleted. Keyed by ID without a foreign key so
+    the entry outlives the user and their DeviceToken rows.
+    """
+    REASON_DEACTIVATED = 'deactivated'
+    REASON_DELETED = 'deleted'
+    REASON_CHOICES = [
+        (REASON_DEACTIVATED, 'Deactivated'),
+        (REASON_DELETED, 'Deleted'),
+    ]
+
+    employee_id = models.BigIntegerField(unique=True)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Revoked Employee'
+        verbose_name_plural = 'Revoked Employees'
+
+    def __str__(self):
+        return f"{self.employee_id} ({self.reason})"
+
+
+class HeatmapTile(models.Model):
+    """
+    Location counts of one map tile (Web Mercator z/x/y) for one day.
+    `counts` holds a zlib-compressed uint32 grid of HEATMAP_GRID_SIZE x
+    HEATMAP_GRID_SIZE cells, built incrementally by location/heatmap.py.
+    """
+    zoom = models.PositiveSmallIntegerField()
+    x = models.PositiveIntegerField()
+    y = models.PositiveIntegerField()
+    date = models.DateField()
+    counts = models.BinaryField()
+    point_count = models.IntegerField(default=0, help_text='Location fixes binned into this tile')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date', 'zoom', 'x', 'y']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['zoom', 'x', 'y', 'date'],
+                name='unique_heatmap_tile'
+            ),
+        ]
+        verbose_name = 'Heatmap Tile'
+        verbose_name_plural = 'Heatmap Tiles'
+
+    def __str__(self):
+        return f"{self.zoom}/{self.x}/{self.y} - {self.date} ({self.point_count} points)"
@@ -0,0 +1,240 @@
+"""
+Impossible-speed filter for incoming location fixes.
+
+Every fix is compared with the employee's last accepted fix: the distance
+between them, reduced by both accuracy radii, divided by the time between
+them is the implied speed. Fixes faster than OUTLIER_MAX_SPEED are outliers
+("teleports" from spoofed or glitchy GPS).
+
+The last accepted fix is kept in the cache, so screening a single fix costs
+one cache read and write (plus one indexed query on a cache miss). Batches
+are sorted by time and screened with NumPy: the speeds between consecutive
+fixes are computed at once and only the fixes after the first suspicious
+jump are walked one by one. Late fixes of an offline batch are compared
+with the cached fix first and then with each other.
+
+A real fast move (a flight) is accepted once OUTLIER_CONFIRM_COUNT
+consecutive outliers are consistent with each other; they become the new
+reference. Concurrent requests of one employee may overwrite each other's
+cached state; that only makes the filter more lenient for a moment.
+
+OUTLIER_FILTER_MODE:
+- 'quarantine': outliers are kept out of Location, in LocationOutlier only
+- 'flag': outliers are stored as usual and also recorded in LocationOutlier
+- 'off': no screening
+"""
+import logging
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import sharding
+from .geo import haversine_m, haversine_m_array
+from .models import Location, LocationOutlier
+
+logger = logging.getLogger('location')
+
+CACHE_KEY = 'location:trajectory:{}'
+
+# Fixes closer in time than this are compared as if this far apart
+MIN_INTERVAL_SECONDS = 1.0
+
+
+def mode():
+    return getattr(settings, 'OUTLIER_FILTER_MODE', 'quarantine')
+
+
+def _fix(location):
+    return (
+        float(location.latitude),
+        float(location.longitude),
+        float(location.accuracy),
+        location.timestamp,
+    )
+
+
+def implied_speed(reference, fix):
+    """
+    Return (accuracy-adjusted jump distance in meters, implied speed in m/s)
+    between two (latitude, longitude, accuracy, timestamp) fixes.
+    """
+    distance = haversine_m(reference[0], reference[1], fix[0], fix[1])
+    jump = max(0.0, distance - reference[2] - fix[2])
+    seconds = max(abs((fix[3] - reference[3]).total_seconds()), MIN_INTERVAL_SECONDS)
+    return jump, jump / seconds
+
+
+def consecutive_speeds(fixes):
+    """
+    Vectorized implied_speed() between each fix and the previous one.
+    Returns an array one shorter than `fixes`.
+    """
+    lat = np.array([fix[0] for fix in fixes])
+    lon = np.array([fix[1] for fix in fixes])
+    accuracy = np.array([fix[2] for fix in fixes])
+    base = fixes[0][3]
+    seconds = np.array([(fix[3] - base).total_seconds() for fix in fixes])
+
+    distance = haversine_m_array(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    jump = np.maximum(0.0, distance - accuracy[:-1] - accuracy[1:])
+    return jump / np.maximum(np.abs(np.diff(seconds)), MIN_INTERVAL_SECONDS)
+
+
+def _load_state(employee_id):
+    """
+    Return (last accepted fix, pending outlier fix, outlier streak).
+    """
+    state = cache.get(CACHE_KEY.format(employee_id))
+    if state is not None:
+        return state
+
+    latest = (
+        Location.objects.for_employee(employee_id)
+        .order_by('-timestamp')
+        .values_list('latitude', 'longitude', 'accuracy', 'timestamp')
+        .first()
+    )
+    last = (float(latest[0]), float(latest[1]), float(latest[2]), latest[3]) if latest else None
+    return last, None, 0
+
+
+def _save_state(employee_id, state):
+    cache.set(CACHE_KEY.format(employee_id), state, getattr(settings, 'OUTLIER_STATE_TTL', 86400))
+
+
+def screen(employee_id, locations):
+    """
+    Screen unsaved Location objects of one employee.
+    Returns (locations to store, LocationOutlier objects); outliers are
+    unsaved, except the stored ones matching retried uploads.
+    """
+    current_mode = mode()
+    if current_mode == 'off' or not locations:
+        return list(locations), []
+
+    # Retried uploads of quarantined fixes stay quarantined
+    outliers = []
+    client_ids = [location.client_id for location in locations if location.client_id]
+    if client_ids:
+        known = {
+            outlier.client_id: outlier
+            for outlier in LocationOutlier.objects.filter(
+                employee_id=employee_id,
+                client_id__in=client_ids,
+                status=LocationOutlier.STATUS_QUARANTINED,
+            )
+        }
+        outliers = [known[location.client_id] for location in locations if location.client_id in known]
+        locations = [location for location in locations if location.client_id not in known]
+        if not locations:
+            return [], outliers
+
+    max_speed = float(settings.OUTLIER_MAX_SPEED)
+    confirm_count = int(getattr(settings, 'OUTLIER_CONFIRM_COUNT', 3))
+    locations = sorted(locations, key=lambda location: location.timestamp)
+    fixes = [_fix(location) for location in locations]
+    cached_last, pending, streak = _load_state(employee_id)
+    last = cached_last
+
+    # Fast path: every fix up to the first suspicious jump is accepted
+    chain = ([last] if last is not None else []) + fixes
+    start = 0
+    if len(chain) > 1:
+        fast = consecutive_speeds(chain) <= max_speed
+        start = len(fixes) if fast.all() else int(np.argmin(fast))
+        if last is None:
+            # The first fix has no reference and is always accepted
+            start = len(fixes) if fast.all() else start + 1
+    elif last is None:
+        start = 1
+    accepted = locations[:start]
+    if start:
+        last, pending, streak = fixes[start - 1], None, 0
+
+    for location, fix in zip(locations[start:], fixes[start:]):
+        jump, speed = implied_speed(last, fix)
+        if speed <= max_speed:
+            accepted.append(location)
+            last, pending, streak = fix, None, 0
+            continue
+
+        # Outliers consistent with each other mean the employee really moved
+        if pending is not None and implied_speed(pending, fix)[1] <= max_speed:
+            streak += 1
+        else:
+            streak = 1
+        pending = fix
+        if streak >= confirm_count:
+            logger.info(
+                "Outlier filter for employee %s: accepted new position after %s consistent jumps",
+                employee_id, streak, extra={'employee_id': employee_id},
+            )
+            accepted.append(location)
+            last, pending, streak = fix, None, 0
+            continue
+
+        outliers.append(LocationOutlier(
+            employee_id=employee_id,
+            latitude=location.latitude,
+            longitude=location.longitude,
+            accuracy=location.accuracy,
+            timestamp=location.timestamp,
+            client_id=location.client_id,
+            status=(LocationOutlier.STATUS_FLAGGED if current_mode == 'flag'
+                    else LocationOutlier.STATUS_QUARANTINED),
+            implied_speed=round(speed, 2),
+            jump_distance=round(jump, 2),
+            reference_timestamp=last[3],
+        ))
+        if current_mode == 'flag':
+            accepted.append(location)
+
+    # Late offline batches must not move the reference back in time
+    if cached_last is not None and last[3] < cached_last[3]:
+        last = cached_last
+    _save_state(employee_id, (last, pending, streak))
+
+    if outliers:
+        logger.warning(
+            "Outlier filter for employee %s: %s of %s fix(es) %s",
+            employee_id, len(outliers), len(locations), current_mode,
+            extra={'employee_id': employee_id},
+        )
+    return accepted, outliers
+
+
+def record_outliers(outliers):
+    """
+    Store new LocationOutlier objects; retried uploads (same client_id) are skipped.
+    """
+    outliers = [outlier for outlier in outliers if outlier.pk is None]
+    if outliers:
+        LocationOutlier.objects.bulk_create(outliers, batch_size=1000, ignore_conflicts=True)
+
+
+def release(outliers):
+    """
+    Move quarantined outliers into Location and delete the outlier records
+    (flagged ones are already stored, their records are just dismissed).
+    Released fixes do not generate geofence events. Returns the number of
+    fixes moved into Location.
+    """
+    outliers = list(outliers)
+    locations = [
+        Location(
+            employee_id=outlier.employee_id,
+            latitude=outlier.latitude,
+            longitude=outlier.longitude,
+            accuracy=outlier.accuracy,
+            timestamp=outlier.timestamp,
+            client_id=outlier.client_id,
+        )
+        for outlier in outliers
+        if outlier.status == LocationOutlier.STATUS_QUARANTINED
+    ]
+    with transaction.atomic():
+        sharding.bulk_create_locations(locations, ignore_conflicts=True)
+        LocationOutlier.objects.filter(id__in=[outlier.id for outlier in outliers]).delete()
+    return len(locations)
@@ -0,0 +1,98 @@
+"""
+Request parsers accepting compressed bodies.
+
+Clients may send `Content-Encoding: gzip` or `deflate` bodies to the ingest
+endpoints. The body is decompressed incrementally and rejected with 413 as
+soon as the decompressed size exceeds REQUEST_MAX_DECOMPRESSED_SIZE, so a
+small "zip bomb" can never expand into memory.
+"""
+import io
+import zlib
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError, UnsupportedMediaType
+from rest_framework.parsers import FormParser, JSONParser
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# zlib window bits per Content-Encoding ('deflate' is zlib-wrapped per RFC 9110)
+WBITS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'x-gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+
+
+class RequestEntityTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Decompressed request body is too large.'
+    default_code = 'request_too_large'
+
+
+def decompress_stream(stream, encoding, max_size):
+    """
+    Decompress `stream` chunk by chunk into a BytesIO, raising
+    RequestEntityTooLarge once more than `max_size` bytes are produced.
+    """
+    try:
+        decompressor = zlib.decompressobj(WBITS[encoding])
+    except KeyError:
+        raise UnsupportedMediaType(encoding, detail=f'Unsupported Content-Encoding "{encoding}"')
+
+    output = io.BytesIO()
+    size = 0
+    try:
+        while True:
+            chunk = stream.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            data = decompressor.decompress(chunk, max_size - size + 1)
+            while True:
+                size += len(data)
+                if size > max_size:
+                    raise RequestEntityTooLarge()
+                output.write(data)
+                # Input left over because of the max_length cap
+                if not decompressor.unconsumed_tail:
+                    break
+                data = decompressor.decompress(decompressor.unconsumed_tail, max_size - size + 1)
+        tail = decompressor.flush()
+        if size + len(tail) > max_size:
+            raise RequestEntityTooLarge()
+        output.write(tail)
+    except zlib.error as e:
+        raise ParseError(f'Invalid {encoding} request body: {e}')
+
+    output.seek(0)
+    return output
+
+
+class DecompressingParserMixin:
+    """
+    Decompress the request stream according to Content-Encoding before parsing.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        encoding = ''
+        if request is not None:
+            encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+
+        if stream is not None and encoding and encoding != 'identity':
+            max_size = getattr(settings, 'REQUEST_MAX_DECOMPRESSED_SIZE', 10 * 1024 * 1024)
+            stream = decompress_stream(stream, encoding, max_size)
+
+        return super().parse(stream, media_type, parser_context)
+
+
+class CompressedJSONParser(DecompressingParserMixin, JSONParser):
+    """
+    JSONParser accepting gzip/deflate request bodies.
+    """
+
+
+class CompressedFormParser(DecompressingParserMixin, FormParser):
+    """
+    FormParser accepting gzip/deflate request bodies.
+    """
@@ -0,0 +1,261 @@
+"""
+Query-plan checks for the hot ORM query paths.
+
+The hot API views are called in-process (no HTTP, no middleware) while the
+SQL they run is captured on every database alias; each SELECT is then
+EXPLAINed on the backend that ran it:
+
+- SQLite: EXPLAIN QUERY PLAN; `SCAN <table>` without an index is a full
+  scan, `USE TEMP B-TREE FOR ... ORDER BY` is a sort outside any index
+- MySQL: EXPLAIN; access type ALL is a full scan, `Using filesort` /
+  `Using temporary` in Extra are reported as well
+
+Queries that sharding.scatter() runs in worker threads are not captured;
+run the check without LOCATION_SHARDS to cover cross-employee views.
+
+Scans of a whole index (e.g. GROUP BY over every employee) read the index
+in order and are not reported. For every reported query, suggest_index()
+proposes an index from the query's equality filters, ORDER BY and range
+filter, plus a covering variant with the selected columns.
+
+Tests can call assert_efficient() on a queryset or a callable, e.g.
+
+    queryplans.assert_efficient(Location.objects.for_employee(1)[:20])
+
+Run `python manage.py check_query_plans` to check every hot path.
+"""
+import re
+from collections import namedtuple
+from contextlib import ExitStack
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .models import Location
+
+# (name, URL); {employee_id} is filled in
+HOT_PATHS = [
+    ('location-list', '/api/locations/'),
+    ('location-list (employee_id)', '/api/locations/?employee_id={employee_id}'),
+    ('location-changes', '/api/locations/changes/?since=0-0'),
+    ('employee_info', '/api/employee/'),
+    ('employee_list', '/api/employees/'),
+]
+
+SUPPORTED_VENDORS = ['sqlite', 'mysql']
+
+PlanIssue = namedtuple('PlanIssue', ['kind', 'table', 'detail'])
+QueryReport = namedtuple('QueryReport', ['alias', 'sql', 'plan', 'issues', 'suggestion'])
+
+
+class UnsupportedBackend(Exception):
+    pass
+
+
+def _databases():
+    # Views called without middleware never read from a replica
+    return [alias for alias in connections if not alias.startswith('replica_')]
+
+
+def explain(alias, sql, params=None):
+    """
+    Return the plan of a SELECT as a list of dicts (one per plan row).
+    """
+    connection = connections[alias]
+    if connection.vendor not in SUPPORTED_VENDORS:
+        raise UnsupportedBackend(f'EXPLAIN checks do not support {connection.vendor}')
+
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def find_issues(vendor, plan):
+    """
+    Return the PlanIssues (full scans, sorts) found in a plan.
+    """
+    issues = []
+    for row in plan:
+        if vendor == 'sqlite':
+            detail = row['detail']
+            match = re.match(r'SCAN (\S+)', detail)
+            if match and 'USING' not in detail:
+                issues.append(PlanIssue('full scan', match.group(1), detail))
+            if detail.startswith('USE TEMP B-TREE'):
+                issues.append(PlanIssue('filesort', None, detail))
+        else:
+            extra = row.get('Extra') or ''
+            if row.get('type') == 'ALL':
+                issues.append(PlanIssue('full scan', row.get('table'), f"type=ALL rows={row.get('rows')}"))
+            if 'Using filesort' in extra:
+                issues.append(PlanIssue('filesort', row.get('table'), extra))
+            if 'Using temporary' in extra:
+                issues.append(PlanIssue('temporary table', row.get('table'), extra))
+    return issues
+
+
+def _model_for_table(table):
+    for model in apps.get_models():
+        if model._meta.db_table == table:
+            return model
+    return None
+
+
+def suggest_index(sql):
+    """
+    Suggest an index for the main table of a Django-generated SELECT:
+    equality-filtered columns first, then the ORDER BY columns, then one
+    range-filtered column. Returns a string, or None when nothing useful
+    can be derived (e.g. primary key lookups).
+    """
+    identifier = r'[`"]?(\w+)[`"]?'
+    main = re.search(r'\bFROM ' + identifier, sql)
+    if not main:
+        return None
+    table = main.group(1)
+    model = _model_for_table(table)
+    if model is None:
+        return None
+    fields = {field.column: field.name for field in model._meta.concrete_fields}
+    primary_key = model._meta.pk.column
+
+    column = rf'[`"]{table}[`"]\.[`"](\w+)[`"]'
+    where = re.split(r'\bORDER BY\b|\bGROUP BY\b|\bLIMIT\b', sql.split(' WHERE ', 1)[1])[0] if ' WHERE ' in sql else ''
+    order = re.search(r'\bORDER BY (.+?)(?:\bLIMIT\b|$)', sql)
+
+    # Equality columns, then the sort, then one range column
+    index = []
+    for name in re.findall(column + r' (?:= |IN \()', where):
+        if name not in index:
+            index.append(name)
+    if primary_key in index:
+        return None
+    for name, direction in re.findall(column + r'( DESC)?', order.group(1) if order else ''):
+        if name not in index:
+            index.append(('-' if direction else '') + name)
+    for name in re.findall(column + r' (?:>|<|BETWEEN)', where)[:1]:
+        if name not in {column_name.lstrip('-') for column_name in index}:
+            index.append(name)
+    if not index:
+        return None
+
+    def field(name):
+        descending = name.startswith('-')
+        return ('-' if descending else '') + fields.get(name.lstrip('-'), name.lstrip('-'))
+
+    suggestion = f"models.Index(fields={[field(name) for name in index]}) on {table}"
+    select = sql.split(' FROM ', 1)[0]
+    indexed = {name.lstrip('-') for name in index}
+    selected = [name for name in dict.fromkeys(re.findall(column, select)) if name not in indexed]
+    if selected and len(selected) <= 4:
+        covering = [field(name) for name in index] + [field(name) for name in selected]
+        suggestion += f"; covering: models.Index(fields={covering})"
+    return suggestion
+
+
+def check_sql(alias, sql, params=None):
+    """
+    EXPLAIN one query and return a QueryReport.
+    """
+    plan = explain(alias, sql, params)
+    issues = find_issues(connections[alias].vendor, plan)
+    return QueryReport(alias, sql, plan, issues, suggest_index(sql) if issues else None)
+
+
+def capture(func):
+    """
+    Run func() and return [(alias, sql)] for every SELECT it ran on the
+    primary and the shards.
+    """
+    with ExitStack() as stack:
+        contexts = {
+            alias: stack.enter_context(CaptureQueriesContext(connections[alias]))
+            for alias in _databases()
+        }
+        func()
+    return [
+        (alias, query['sql'])
+        for alias, context in contexts.items()
+        for query in context.captured_queries
+        if query['sql'].lstrip().upper().startswith('SELECT')
+    ]
+
+
+def server_name():
+    """
+    A host accepted by ALLOWED_HOSTS ('testserver' usually is not).
+    """
+    return next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+
+
+def call_view(url, user):
+    """
+    Call the view serving a GET URL as `user`, bypassing middleware.
+    """
+    path = url.split('?', 1)[0]
+    match = resolve(path)
+    request = APIRequestFactory().get(url, SERVER_NAME=server_name())
+    force_authenticate(request, user=user)
+    response = match.func(request, *match.args, **match.kwargs)
+    if response.status_code >= 400:
+        raise RuntimeError(f'GET {url} answered {response.status_code}: {getattr(response, "data", "")}')
+    return response
+
+
+def default_employee():
+    """
+    An employee with recorded locations (any user when there is none).
+    """
+    for alias in _databases():
+        employee_id = Location.objects.using(alias).values_list('employee_id', flat=True).first()
+        if employee_id and User.objects.filter(id=employee_id).exists():
+            return User.objects.get(id=employee_id)
+    return User.objects.order_by('id').first()
+
+
+def check_hot_paths(employee, paths=None):
+    """
+    Run the hot paths as `employee` and EXPLAIN their queries.
+    Returns {path name: [QueryReport, ...]}.
+    """
+    reports = {}
+    for name, url in HOT_PATHS:
+        if paths and name not in paths:
+            continue
+        queries = capture(lambda: call_view(url.format(employee_id=employee.id), employee))
+        reports[name] = [check_sql(alias, sql) for alias, sql in queries]
+    return reports
+
+
+def assert_efficient(query, allowed_tables=()):
+    """
+    Test helper: fail when a queryset (or every SELECT run by a callable)
+    has a full scan or sort in its plan. Full scans of `allowed_tables`
+    (e.g. small lookup tables) are tolerated.
+    """
+    if callable(query):
+        reports = [check_sql(alias, sql) for alias, sql in capture(query)]
+    else:
+        sql, params = query.query.sql_with_params()
+        reports = [check_sql(query.db, sql, params)]
+
+    failures = []
+    for report in reports:
+        issues = [
+            issue for issue in report.issues
+            if not (issue.kind == 'full scan' and issue.table in allowed_tables)
+        ]
+        if issues:
+            failures.append(
+                f"{report.sql}\n  " + '\n  '.join(f'{issue.kind}: {issue.detail}' for issue in issues) +
+                (f"\n  suggestion: {report.suggestion}" if report.suggestion else '')
+            )
+    if failures:
+        raise AssertionError('Inefficient query plan:\n' + '\n'.join(failures))
@@ -1,6 +1,23 @@
+from datetime import timedelta
+
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import Location
+from django.utils import timezone
+from .models import Location, GeofenceEvent, DailyTravelStats, Visit
+
+
+class LocalDateTimeField(serializers.DateTimeField):
+    """
+    DateTimeField that converts aware input to the current time zone when
+    USE_TZ is False (DRF converts it to naive UTC), matching the CSV/GPX
+    importers and the naive local times stored everywhere else.
+    """
+
+    def enforce_timezone(self, value):
+        if not settings.USE_TZ and timezone.is_aware(value):
+            return timezone.make_naive(value)
+        return super().enforce_timezone(value)
 
 
 class LocationSerializer(serializers.ModelSerializer):
@@ -9,12 +26,13 @@ class LocationSerializer(serializers.ModelSerializer):
     """
     employee_id = serializers.IntegerField(write_only=True, required=False)
     employee_name = serializers.CharField(source='employee.username', read_only=True)
+    timestamp = LocalDateTimeField(required=False)
     
     class Meta:
         model = Location
         fields = ['id', 'employee_id', 'employee_name', 'latitude', 
-                  'longitude', 'accuracy', 'timestamp']
-        read_only_fields = ['id', 'timestamp', 'employee_name']
+                  'longitude', 'accuracy', 'timestamp', 'received_at', 'client_id']
+        read_only_fields = ['id', 'received_at', 'employee_name']
     
     def validate_latitude(self, value):
         """
@@ -46,6 +64,25 @@ class LocationSerializer(serializers.ModelSerializer):
             )
         return value
     
+    def validate_client_id(self, value):
+        """
+        Treat a blank client_id as absent so it never takes part in deduplication.
+        """
+        return value or None
+    
+    def validate_timestamp(self, value):
+        """
+        Validate that the device timestamp is not in the future
+        (allowing for some clock skew). Aware timestamps have already been
+        converted by LocalDateTimeField, so both sides are in the same zone.
+        """
+        skew = timedelta(seconds=getattr(settings, 'LOCATION_MAX_CLOCK_SKEW', 300))
+        if value > timezone.now() + skew:
+            raise serializers.ValidationError(
+                "Timestamp cannot be in the future"
+            )
+        return value
+    
     def create(self, validated_data):
         """
         Create a new location record.
@@ -71,3 +108,78 @@ class LocationSerializer(serializers.ModelSerializer):
         
         validated_data['employee'] = employee
         return super().create(validated_data)
+
+
+class TeamLocationSerializer(LocationSerializer):
+    """
+    Read-only location serializer for manager views, exposing the employee ID.
+    """
+    employee_id = serializers.IntegerField(read_only=True)
+
+    class Meta(LocationSerializer.Meta):
+        read_only_fields = LocationSerializer.Meta.fields
+
+
+class LocationSyncSerializer(serializers.Serializer):
+    """
+    Serializer for batched offline uploads.
+    Every point must carry a client_id so retried uploads can be deduplicated.
+    """
+    points = LocationSerializer(many=True, allow_empty=False)
+
+    def validate_points(self, value):
+        """
+        Validate batch size and that every point has a client_id.
+        """
+        max_points = getattr(settings, 'SYNC_MAX_POINTS', 1000)
+        if len(value) > max_points:
+            raise serializers.ValidationError(
+                f"A sync batch may contain at most {max_points} points"
+            )
+        if any(not point.get('client_id') for point in value):
+            raise serializers.ValidationError(
+                "Every point needs a client_id"
+            )
+        return value
+
+
+class GeofenceEventSerializer(serializers.ModelSerializer):
+    """
+    Read-only serializer for geofence enter/exit events.
+    """
+    geofence_name = serializers.CharField(source='geofence.name', read_only=True)
+
+    class Meta:
+        model = GeofenceEvent
+        fields = ['id', 'geofence', 'geofence_name', 'event_type', 'location', 'timestamp']
+        read_only_fields = fields
+
+
+class DailyTravelStatsSerializer(serializers.ModelSerializer):
+    """
+    Read-only serializer for per-day travel statistics.
+    """
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DailyTravelStats
+        fields = ['date', 'distance_km', 'distance_m', 'moving_seconds',
+                  'max_speed_mps', 'point_count', 'updated_at']
+        read_only_fields = fields
+
+    def get_distance_km(self, obj):
+        return round(obj.distance_m / 1000, 3)
+
+
+class VisitSerializer(serializers.ModelSerializer):
+    """
+    Read-only serializer for detected visits (stay points).
+    """
+    geofence_name = serializers.CharField(source='geofence.name', read_only=True, default=None)
+    duration_seconds = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Visit
+        fields = ['id', 'latitude', 'longitude', 'arrival', 'departure', 'duration_seconds',
+                  'point_count', 'geofence', 'geofence_name']
+        read_only_fields = fields
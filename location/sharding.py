@@ -0,0 +1,108 @@
+"""
+Employee-based sharding of Location rows.
+
+When settings.LOCATION_SHARDS lists database aliases, every Location row is
+stored on the shard selected by hashing its employee ID. All other tables
+(users, geofences, stats, ...) stay on the 'default' database.
+
+- Single-employee access goes through Location.objects.for_employee(), which
+  reads from the owning shard; saves are routed by Location.save() and
+  LocationShardRouter.
+- Cross-employee queries use scatter() to run on every shard in parallel.
+- Every shard carries the full schema (`migrate --database shard_N`), and
+  shards must hand out disjoint primary keys (e.g. MySQL
+  auto_increment_increment / auto_increment_offset) so IDs stay unique.
+"""
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+
+def shard_aliases():
+    """
+    Return the configured shard aliases, or an empty list when sharding is disabled.
+    """
+    return list(getattr(settings, 'LOCATION_SHARDS', []))
+
+
+def shard_for_employee(employee_id, aliases=None):
+    """
+    Return the alias of the shard owning the employee's locations, or None
+    when sharding is disabled.
+    """
+    aliases = shard_aliases() if aliases is None else aliases
+    if not aliases or employee_id is None:
+        return None
+    return aliases[zlib.crc32(str(int(employee_id)).encode()) % len(aliases)]
+
+
+def location_databases():
+    """
+    Databases holding Location rows. None stands for the normal routing.
+    """
+    return shard_aliases() or [None]
+
+
+def scatter(func):
+    """
+    Run func(queryset) against the Location table of every shard in parallel
+    and return the list of results. LOCATION_SCATTER_PARALLEL = False runs
+    them one after the other on the calling thread (e.g. in tests, where
+    other threads cannot see the test transaction).
+    """
+    from .models import Location
+
+    def run(alias):
+        queryset = Location.objects.using(alias) if alias else Location.objects.all()
+        try:
+            return func(queryset)
+        finally:
+            if alias:
+                connections[alias].close()
+
+    databases = location_databases()
+    if len(databases) == 1 or not getattr(settings, 'LOCATION_SCATTER_PARALLEL', True):
+        return [
+            func(Location.objects.using(alias) if alias else Location.objects.all())
+            for alias in databases
+        ]
+
+    with ThreadPoolExecutor(max_workers=len(databases)) as executor:
+        return list(executor.map(run, databases))
+
+
+def bulk_create_locations(locations, batch_size=1000, **kwargs):
+    """
+    Bulk insert Location objects, grouped by owning shard.
+    """
+    from .models import Location
+
+    aliases = shard_aliases()
+    if not aliases:
+        return Location.objects.bulk_create(locations, batch_size=batch_size, **kwargs)
+
+    by_shard = defaultdict(list)
+    for location in locations:
+        by_shard[shard_for_employee(location.employee_id, aliases)].append(location)
+
+    created = []
+    for alias, shard_locations in by_shard.items():
+        created.extend(Location.objects.using(alias).bulk_create(
+            shard_locations, batch_size=batch_size, **kwargs
+        ))
+    return created
+
+
+def delete_employee_locations(sender, instance, **kwargs):
+    """
+    pre_delete receiver for User: cascade deletion to the owning shard,
+    which Django's collector cannot see.
+    """
+    from .models import Location
+
+    shard = shard_for_employee(instance.pk)
+    if shard:
+        Location.objects.using(shard).filter(employee_id=instance.pk).delete()
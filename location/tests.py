@@ -1,3 +1,864 @@
-from django.test import TestCase
+import gzip
+import io
+import math
+import os
+import random
+import tarfile
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from rest_framework.test import APIClient
+
+from hrms_project.middleware import IngestAdmissionMiddleware, ReplicaRoutingMiddleware
+from hrms_project.routers import PrimaryReplicaRouter, current_replica, replica_aliases
+
+from . import geofencing, heatmap, outliers, queryplans, sharding, timeline, travel_stats, visits
+from .authentication import issue_token, revocation_list
+from .models import Geofence, GeofenceEvent, Location, ProcessingWatermark, Visit
+from .throttling import IngestRateThrottle
+
+# Meters per degree of latitude
+METERS_PER_DEGREE = 111195.0
+
+# Sharding tests need the shard databases configured, e.g. with SQLite:
+#   DB_SHARDS=shard_0.sqlite3,shard_1.sqlite3 DB_REPLICAS=replica.sqlite3 python manage.py test location
+requires_shards = skipUnless(
+    len(settings.LOCATION_SHARDS) >= 2, 'DB_SHARDS must list at least two shard databases'
+)
+# Replica tests likewise need DB_REPLICAS (any SQLite file; tests mirror 'default')
+requires_replicas = skipUnless(replica_aliases(), 'DB_REPLICAS must list a replica database')
+
+
+@override_settings(LOCATION_SCATTER_PARALLEL=False)
+class LocationTestCase(TestCase):
+    """
+    TestCase allowed to use the shard databases when they are configured.
+    Scatter queries run on the test thread, inside the test transaction.
+    """
+    databases = {'default', *settings.LOCATION_SHARDS}
+
+
+def employees_on_distinct_shards(prefix):
+    """
+    Create users until two of them are owned by different shards.
+    """
+    employees = {}
+    number = 0
+    while len(employees) < 2:
+        employee = User.objects.create_user(username=f'{prefix}{number}', password='secret')
+        employees.setdefault(sharding.shard_for_employee(employee.id), employee)
+        number += 1
+    return list(employees.values())
+
+
+class TravelStatsTests(LocationTestCase):
+    """
+    Distance accumulation in location/travel_stats.py.
+    """
+
+    def setUp(self):
+        self.employee = User.objects.create_user(username='driver', password='secret')
+        self.start = datetime(2024, 5, 1, 9, 0, 0)
+
+    def record(self, fixes):
+        sharding.bulk_create_locations([
+            Location(employee=self.employee, latitude=round(lat, 7), longitude=round(lon, 7),
+                     accuracy=accuracy, timestamp=timestamp)
+            for lat, lon, accuracy, timestamp in fixes
+        ])
+
+    def drive(self, interval_seconds, speed_mps=12.0, duration_seconds=3600, accuracy=10.0):
+        # Straight drive north along a meridian
+        steps = int(duration_seconds / interval_seconds)
+        return [
+            (28.0 + speed_mps * step * interval_seconds / METERS_PER_DEGREE, 77.0, accuracy,
+             self.start + timedelta(seconds=step * interval_seconds))
+            for step in range(steps + 1)
+        ]
+
+    def test_dense_fixes_count_the_full_distance(self):
+        self.record(self.drive(interval_seconds=1))
+        stats = travel_stats.compute_day_stats(self.employee.id, date(2024, 5, 1))
+
+        self.assertAlmostEqual(stats['distance_m'] / 1000, 43.2, delta=0.5)
+        self.assertAlmostEqual(stats['max_speed_mps'], 12.0, delta=0.5)
+        self.assertGreater(stats['moving_seconds'], 3500)
+        self.assertEqual(stats['point_count'], 3601)
+
+    def test_sparse_fixes_count_the_full_distance(self):
+        self.record(self.drive(interval_seconds=5))
+        stats = travel_stats.compute_day_stats(self.employee.id, date(2024, 5, 1))
+
+        self.assertAlmostEqual(stats['distance_m'] / 1000, 43.2, delta=0.5)
+
+    def test_jitter_while_standing_still_is_ignored(self):
+        rng = random.Random(7)
+        fixes = []
+        for step in range(3600):
+            angle = rng.uniform(0, 2 * math.pi)
+            offset = rng.uniform(0, 8.0) / METERS_PER_DEGREE
+            fixes.append((28.0 + offset * math.sin(angle), 77.0 + offset * math.cos(angle), 10.0,
+                          self.start + timedelta(seconds=step)))
+        self.record(fixes)
+        stats = travel_stats.compute_day_stats(self.employee.id, date(2024, 5, 1))
+
+        self.assertLess(stats['distance_m'], 50)
+
+    def test_departure_after_a_stop_is_not_averaged_over_the_stop(self):
+        stop = [(28.0, 77.0, 10.0, self.start + timedelta(seconds=step * 10)) for step in range(360)]
+        departure = self.start + timedelta(hours=1)
+        move = [
+            (28.0 + 12.0 * step / METERS_PER_DEGREE, 77.0, 10.0, departure + timedelta(seconds=step))
+            for step in range(1, 601)
+        ]
+        self.record(stop + move)
+        stats = travel_stats.compute_day_stats(self.employee.id, date(2024, 5, 1))
+
+        self.assertAlmostEqual(stats['distance_m'] / 1000, 7.2, delta=0.1)
+        self.assertLess(stats['moving_seconds'], 700)
+
+
+class DeviceTokenRevocationTests(LocationTestCase):
+    """
+    Device tokens of deactivated and deleted employees (location/authentication.py).
+    """
+
+    def setUp(self):
+        # Rolled-back tests reuse user IDs; drop the revocations they loaded
+        cache.clear()
+        revocation_list.invalidate()
+        self.employee = User.objects.create_user(username='field', password='secret')
+        token, _ = issue_token(self.employee, 'phone-1')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Device {token}')
+
+    def post_fix(self):
+        return self.client.post('/api/locations/', {
+            'latitude': 28.0, 'longitude': 77.0, 'accuracy': 10.0,
+            'timestamp': datetime.now().replace(microsecond=0).isoformat(),
+        }, format='json')
+
+    def test_active_employee_is_accepted(self):
+        self.assertEqual(self.post_fix().status_code, 201)
+
+    def test_deactivated_employee_is_rejected_until_reactivated(self):
+        self.employee.is_active = False
+        self.employee.save()
+        self.assertEqual(self.post_fix().status_code, 401)
+
+        self.employee.is_active = True
+        self.employee.save()
+        self.assertEqual(self.post_fix().status_code, 201)
+
+    def test_deleted_employee_is_rejected(self):
+        employee_id = self.employee.id
+        self.employee.delete()
+        response = self.post_fix()
+
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Location.objects.for_employee(employee_id).exists())
+
+
+class TimestampTests(LocationTestCase):
+    """
+    Device timestamps sent with a UTC offset (USE_TZ=False).
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.employee = User.objects.create_user(username='offset', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def post_fix(self, timestamp):
+        return self.client.post('/api/locations/', {
+            'latitude': 28.0, 'longitude': 77.0, 'accuracy': 10.0, 'timestamp': timestamp,
+        }, format='json')
+
+    def test_aware_timestamp_is_stored_in_local_time(self):
+        response = self.post_fix('2024-05-01T03:30:00Z')
+
+        self.assertEqual(response.status_code, 201)
+        # Asia/Kolkata is UTC+05:30
+        self.assertEqual(Location.objects.for_employee(self.employee.id).get().timestamp, datetime(2024, 5, 1, 9, 0))
+
+    def test_future_check_applies_to_aware_timestamps(self):
+        now = datetime.now(dt_timezone.utc).replace(microsecond=0)
+
+        self.assertEqual(self.post_fix(now.isoformat()).status_code, 201)
+        self.assertEqual(self.post_fix((now + timedelta(hours=1)).isoformat()).status_code, 400)
+
+
+class IngestParserTests(LocationTestCase):
+    """
+    Request body formats accepted by location ingest.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='parser', password='secret'))
+
+    def test_multipart_body_is_accepted(self):
+        response = self.client.post('/api/locations/', {
+            'latitude': 28.0, 'longitude': 77.0, 'accuracy': 10.0,
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, 201)
+
+
+class QueryPlanTests(LocationTestCase):
+    """
+    Query plans of the hot API paths (location/queryplans.py).
+    """
+
+    def setUp(self):
+        cache.clear()
+        start = datetime(2024, 5, 1, 9, 0, 0)
+        self.employees = [
+            User.objects.create_user(username=f'planner{number}', password='secret') for number in range(3)
+        ]
+        sharding.bulk_create_locations([
+            Location(employee=employee, latitude=28.0 + step / 1000, longitude=77.0, accuracy=10.0,
+                     timestamp=start + timedelta(minutes=step))
+            for employee in self.employees
+            for step in range(50)
+        ])
+
+    # The test runner's 'testserver' host is not allowed in production settings
+    @override_settings(ALLOWED_HOSTS=['localhost', '127.0.0.1'])
+    def test_hot_paths_use_indexes(self):
+        reports = queryplans.check_hot_paths(self.employees[0])
+
+        self.assertEqual({name for name, _ in queryplans.HOT_PATHS}, set(reports))
+        for name, path_reports in reports.items():
+            self.assertTrue(path_reports, name)
+            for report in path_reports:
+                self.assertEqual(report.issues, [], f'{name}: {report.sql}')
+
+    def test_assert_efficient_accepts_indexed_queries(self):
+        queryplans.assert_efficient(Location.objects.for_employee(self.employees[0].id)[:20])
+        queryplans.assert_efficient(lambda: queryplans.call_view('/api/employees/', self.employees[0]))
+
+    def test_assert_efficient_reports_full_scans(self):
+        queryset = Location.objects.filter(accuracy__gt=5).order_by()
+
+        with self.assertRaisesMessage(AssertionError, 'full scan'):
+            queryplans.assert_efficient(queryset)
+        queryplans.assert_efficient(queryset, allowed_tables=[Location._meta.db_table])
+
+
+@override_settings(INGEST_BUCKET_CAPACITY=3, INGEST_REFILL_PER_SECOND=0.01)
+class IngestRateThrottleTests(LocationTestCase):
+    """
+    Per-device ingest rate limit (location/throttling.py).
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='burst', password='secret'))
+
+    def test_requests_over_capacity_are_throttled(self):
+        statuses = [
+            self.client.post('/api/locations/', {'latitude': 28.0, 'longitude': 77.0, 'accuracy': 10.0},
+                             format='json').status_code
+            for _ in range(5)
+        ]
+
+        self.assertEqual(statuses, [201, 201, 201, 429, 429])
+
+    def allowed_at(self, throttle, request, at):
+        # Also moves the cache's clock
+        with mock.patch('time.time', return_value=at):
+            return throttle.allow_request(request, None)
+
+    def test_burst_cannot_repeat_right_after_a_window_boundary(self):
+        # A window is 300 s, counted in 30 s sub-windows
+        throttle = IngestRateThrottle()
+        request = mock.Mock(user=User.objects.get(username='burst'), auth=None)
+        self.assertEqual([self.allowed_at(throttle, request, 290.0) for _ in range(3)], [True] * 3)
+
+        self.assertFalse(self.allowed_at(throttle, request, 301.0))
+        self.assertAlmostEqual(throttle.wait(), 600.0 - 301.0)
+        self.assertFalse(self.allowed_at(throttle, request, 599.0))
+        self.assertTrue(self.allowed_at(throttle, request, 600.0))
+
+
+@override_settings(INGEST_MAX_CONCURRENCY=1, INGEST_SLOT_TTL=60)
+class IngestAdmissionTests(LocationTestCase):
+    """
+    In-flight ingest slots of hrms_project/middleware.py.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.middleware = IngestAdmissionMiddleware(lambda request: HttpResponse(status=201))
+
+    def take_slot(self, at):
+        request = RequestFactory().post('/api/locations/')
+        request.resolver_match = resolve('/api/locations/')
+        # Also moves the cache's clock
+        with mock.patch('time.time', return_value=at):
+            response = self.middleware.process_view(request, None, (), {})
+        return request, response
+
+    def test_released_slots_are_available_again(self):
+        request, response = self.take_slot(at=1000.0)
+        self.assertIsNone(response)
+        self.middleware._release(request._ingest_slot)
+
+        self.assertIsNone(self.take_slot(at=1001.0)[1])
+
+    def test_leaked_slot_expires_under_steady_traffic(self):
+        # Taken by a worker that died before releasing it
+        self.take_slot(at=1000.0)
+
+        self.assertEqual(self.take_slot(at=1030.0)[1].status_code, 429)
+        self.assertEqual(self.take_slot(at=1050.0)[1].status_code, 429)
+        self.assertIsNone(self.take_slot(at=1070.0)[1])
+
+
+class SyncGeofenceTests(LocationTestCase):
+    """
+    Geofence events recorded for offline batches (LocationViewSet.sync).
+    """
+
+    def setUp(self):
+        cache.clear()
+        Geofence.objects.create(name='Office', center_latitude=28.0, center_longitude=77.0, radius=200)
+        self.employee = User.objects.create_user(username='commuter', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+        self.now = datetime.now().replace(microsecond=0)
+
+    def tearDown(self):
+        # The in-memory index would outlive the rolled-back geofence
+        geofencing.invalidate_index()
+
+    def fix(self, client_id, latitude, hours_ago):
+        return {
+            'client_id': client_id, 'latitude': latitude, 'longitude': 77.0, 'accuracy': 10.0,
+            'timestamp': (self.now - timedelta(hours=hours_ago)).isoformat(),
+        }
+
+    def sync(self, *points):
+        response = self.client.post('/api/locations/sync/', {'points': list(points)}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def stored(self, client_id):
+        return Location.objects.for_employee(self.employee.id).get(client_id=client_id)
+
+    def events(self):
+        return list(GeofenceEvent.objects.order_by('id').values_list('event_type', 'location_id'))
+
+    def test_backlog_older_than_latest_fix_records_no_events(self):
+        self.sync(self.fix('live', 28.0, 0))
+        live = self.stored('live')
+        self.sync(self.fix('old-1', 28.1, 3), self.fix('old-2', 28.0, 2))
+
+        self.assertEqual(self.events(), [('enter', live.id)])
+
+    def test_newer_fixes_record_events_with_location_ids(self):
+        self.sync(self.fix('a', 28.1, 2))
+        self.sync(self.fix('b', 28.0, 1), self.fix('c', 28.1, 0))
+
+        self.assertEqual(self.events(), [
+            ('enter', self.stored('b').id),
+            ('exit', self.stored('c').id),
+        ])
+
+
+@requires_shards
+class ShardedAdminTests(LocationTestCase):
+    """
+    Location admin changelist with sharded rows.
+    """
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(username='root', password='secret')
+        self.employees = employees_on_distinct_shards('sharded')
+        sharding.bulk_create_locations([
+            Location(employee=employee, latitude=28.0, longitude=77.0, accuracy=10.0,
+                     timestamp=datetime(2024, 5, 1, 9, step))
+            for employee in self.employees
+            for step in range(3)
+        ])
+        self.client.force_login(self.admin_user)
+
+    def test_employee_filter_lists_the_shard_rows(self):
+        employee = self.employees[1]
+        response = self.client.get('/admin/location/location/', {'employee__id__exact': employee.id})
+
+        changelist = response.context['cl']
+        self.assertEqual(changelist.result_count, 3)
+        self.assertEqual([location.employee for location in changelist.result_list], [employee] * 3)
+        self.assertContains(response, f'{employee.username} (ID: {employee.id})')
+
+    def test_unfiltered_changelist_asks_for_an_employee(self):
+        response = self.client.get('/admin/location/location/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+        self.assertContains(response, 'select an employee')
+
+
+@requires_shards
+class RebalanceShardsTests(LocationTestCase):
+    """
+    rebalance_location_shards on the multi-SQLite setup.
+    """
+
+    def setUp(self):
+        self.employees = employees_on_distinct_shards('moved')
+        # Rows written before sharding was enabled
+        Location.objects.using('default').bulk_create([
+            Location(employee=employee, latitude=28.0, longitude=77.0, accuracy=10.0,
+                     timestamp=datetime(2024, 5, 1, 9, step))
+            for employee in self.employees
+            for step in range(3)
+        ])
+        self.ids = {
+            employee.id: list(Location.objects.using('default').filter(employee=employee)
+                              .order_by('id').values_list('id', flat=True))
+            for employee in self.employees
+        }
+
+    def rebalance(self):
+        call_command('rebalance_location_shards', stdout=io.StringIO())
+
+    def test_rows_move_to_the_owning_shard(self):
+        self.rebalance()
+
+        self.assertFalse(Location.objects.using('default').exists())
+        for employee in self.employees:
+            self.assertEqual(
+                list(Location.objects.for_employee(employee.id).order_by('id').values_list('id', flat=True)),
+                self.ids[employee.id],
+            )
+
+    def test_new_rows_get_ids_after_the_moved_rows(self):
+        self.rebalance()
+
+        for employee in self.employees:
+            location = Location.objects.create(employee=employee, latitude=28.0, longitude=77.0, accuracy=10.0)
+            self.assertGreater(location.id, max(self.ids[employee.id]))
+
+    def test_interrupted_move_can_be_repeated(self):
+        # A previous run copied the first employee's rows but did not delete them
+        employee = self.employees[0]
+        Location.objects.using(sharding.shard_for_employee(employee.id)).bulk_create(
+            Location.objects.using('default').filter(employee=employee)
+        )
+        self.rebalance()
+
+        self.assertFalse(Location.objects.using('default').exists())
+        self.assertEqual(Location.objects.for_employee(employee.id).count(), 3)
+
+
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    """
+    Read routing of hrms_project/routers.py.
+    """
+
+    def test_reads_follow_the_selected_replica(self):
+        router = PrimaryReplicaRouter()
+        token = current_replica.set('replica_1')
+        try:
+            self.assertEqual(router.db_for_read(Location), 'replica_1')
+            self.assertEqual(router.db_for_write(Location), 'default')
+        finally:
+            current_replica.reset(token)
+        self.assertEqual(router.db_for_read(Location), 'default')
+
+
+@requires_replicas
+class ReplicaRoutingMiddlewareTests(LocationTestCase):
+    """
+    Replica selection and read-your-writes pinning of ReplicaRoutingMiddleware.
+    """
+    databases = {'default', *replica_aliases()}
+
+    def setUp(self):
+        cache.clear()
+        # Unsaved: a write would lock the tables the mirrored replica reads
+        self.employee = User(id=1, username='reader')
+        self.selected = []
+        self.middleware = ReplicaRoutingMiddleware(self.view)
+
+    def view(self, request):
+        self.middleware.process_view(request, None, (), {})
+        self.selected.append(current_replica.get())
+        return HttpResponse(status=201 if request.method == 'POST' else 200)
+
+    def request(self, method, path):
+        request = getattr(RequestFactory(), method)(path)
+        request.user = self.employee
+        request.resolver_match = resolve(path)
+        self.middleware(request)
+        return self.selected[-1]
+
+    def test_listed_views_read_from_a_replica(self):
+        self.assertIn(self.request('get', '/api/locations/'), replica_aliases())
+        self.assertIsNone(self.request('get', '/api/employee/travel-stats/'))
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        self.assertIsNone(self.request('post', '/api/locations/'))
+        self.assertIsNone(self.request('get', '/api/locations/'))
+
+
+class ChangesFeedTests(LocationTestCase):
+    """
+    Changes feed of LocationViewSet (location/changes.py).
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.employee = User.objects.create_user(username='poller', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def add_fixes(self, count):
+        start = datetime(2024, 5, 1, 9, 0, 0)
+        sharding.bulk_create_locations([
+            Location(employee=self.employee, latitude=28.0, longitude=77.0, accuracy=10.0,
+                     timestamp=start + timedelta(minutes=step))
+            for step in range(count)
+        ])
+
+    def poll(self, since='0-0'):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/locations/changes/', {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(queries)
+
+    def test_query_count_does_not_grow_with_the_delta(self):
+        self.add_fixes(1)
+        small, small_queries = self.poll()
+        self.add_fixes(20)
+        large, large_queries = self.poll()
+
+        self.assertEqual(len(large['created']), 21)
+        self.assertEqual(large['created'][0]['employee_name'], 'poller')
+        self.assertEqual(small_queries, large_queries)
+
+    def test_rows_committed_below_the_cursor_are_sent_again(self):
+        Location.objects.create(id=10, employee=self.employee, latitude=28.0, longitude=77.0, accuracy=10.0)
+        first, _ = self.poll()
+        self.assertEqual(first['cursor'], '10-0')
+
+        # An insert that took ID 5 commits after ID 10 was served
+        Location.objects.create(id=5, employee=self.employee, latitude=28.0, longitude=77.0, accuracy=10.0)
+        second, _ = self.poll(first['cursor'])
+
+        self.assertEqual([row['id'] for row in second['created']], [5, 10])
+        self.assertEqual(second['cursor'], '10-0')
+
+    def test_rows_older_than_the_lookback_are_not_sent_again(self):
+        Location.objects.create(id=10, employee=self.employee, latitude=28.0, longitude=77.0, accuracy=10.0)
+        Location.objects.for_employee(self.employee.id).update(received_at=datetime.now() - timedelta(hours=1))
+        response, _ = self.poll('10-0')
+
+        self.assertEqual(response['created'], [])
+
+
+class ColumnarExportTests(LocationTestCase):
+    """
+    Columnar export endpoint (location/columnar.py).
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(username='analyst', password='secret'))
+        employee = User.objects.create_user(username='exported', password='secret')
+        sharding.bulk_create_locations([
+            Location(employee=employee, latitude=28.0, longitude=77.0, accuracy=10.0,
+                     timestamp=datetime(2024, 5, 1, 9, minute))
+            for minute in range(30)
+        ])
+
+    def test_archive_is_compressed_when_accepted(self):
+        response = self.client.get('/api/export/columns/?date=2024-05-01', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        archive = gzip.decompress(b''.join(response.streaming_content))
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            names = tar.getnames()
+            self.assertIn('locations-2024-05-01/day=2024-05-01/latitude.bin', names)
+            self.assertEqual(tar.getmember('locations-2024-05-01/day=2024-05-01/latitude.bin').size, 30 * 8)
+
+
+class VisitDetectionTests(LocationTestCase):
+    """
+    Incremental stay-point detection in location/visits.py.
+    """
+
+    def setUp(self):
+        geofencing.invalidate_index()
+        self.employee = User.objects.create_user(username='visitor', password='secret')
+        self.start = datetime(2024, 5, 1, 9, 0, 0)
+
+    def stay(self, place, first_minute, last_minute):
+        # One fix a minute at a place 1 km north of the previous one
+        sharding.bulk_create_locations([
+            Location(employee=self.employee, latitude=round(28.0 + place * 1000 / METERS_PER_DEGREE, 7),
+                     longitude=77.0, accuracy=10.0, timestamp=self.start + timedelta(minutes=minute))
+            for minute in range(first_minute, last_minute + 1)
+        ])
+
+    def visits(self):
+        return list(Visit.objects.filter(employee=self.employee).order_by('arrival'))
+
+    def test_open_stay_is_extended_from_the_watermark(self):
+        self.stay(place=0, first_minute=0, last_minute=10)
+        visits.refresh_employee_visits(self.employee.id)
+        watermark = ProcessingWatermark.objects.get(pipeline=visits.PIPELINE, employee_id=self.employee.id)
+        self.assertEqual(watermark.resume_timestamp, self.start)
+
+        self.stay(place=0, first_minute=11, last_minute=20)
+        visits.refresh_employee_visits(self.employee.id)
+
+        [visit] = self.visits()
+        self.assertEqual(visit.arrival, self.start)
+        self.assertEqual(visit.departure, self.start + timedelta(minutes=20))
+        self.assertEqual(visit.point_count, 21)
+
+    def test_stay_closed_by_a_later_run_is_kept(self):
+        self.stay(place=0, first_minute=0, last_minute=20)
+        visits.refresh_employee_visits(self.employee.id)
+        self.stay(place=1, first_minute=30, last_minute=50)
+        visits.refresh_employee_visits(self.employee.id)
+
+        first, second = self.visits()
+        self.assertEqual((first.arrival, first.point_count), (self.start, 21))
+        self.assertEqual(second.arrival, self.start + timedelta(minutes=30))
+        watermark = ProcessingWatermark.objects.get(pipeline=visits.PIPELINE, employee_id=self.employee.id)
+        self.assertEqual(watermark.resume_timestamp, second.arrival)
+
+    def test_late_fixes_rebuild_only_the_visits_after_them(self):
+        self.stay(place=0, first_minute=0, last_minute=20)
+        self.stay(place=2, first_minute=60, last_minute=80)
+        visits.refresh_employee_visits(self.employee.id)
+        first = self.visits()[0]
+
+        # Synced from an offline phone: a stay between the two
+        self.stay(place=1, first_minute=30, last_minute=45)
+        visits.refresh_employee_visits(self.employee.id)
+
+        stays = self.visits()
+        self.assertEqual([visit.arrival for visit in stays],
+                         [self.start + timedelta(minutes=minute) for minute in (0, 30, 60)])
+        self.assertEqual(stays[0].pk, first.pk)
+        self.assertEqual([visit.point_count for visit in stays], [21, 16, 21])
+
+
+@mock.patch.object(timeline, 'BATCH_SIZE', 2)
+class TeamTimelineTests(LocationTestCase):
+    """
+    Keyset pages of the k-way merged timeline in location/timeline.py.
+    """
+
+    def setUp(self):
+        self.employees = [
+            User.objects.create_user(username=f'member{number}', password='secret') for number in range(3)
+        ]
+        self.start = datetime(2024, 5, 1, 9, 0, 0)
+        # Minutes shared by several employees, and repeated by one of them,
+        # so page boundaries fall inside timestamp ties
+        fixes = []
+        for employee, minutes in zip(self.employees, ([0, 1, 1, 2, 5], [1, 2, 2, 3], [0, 1, 3, 3, 4])):
+            fixes += [
+                Location(employee=employee, latitude=28.0, longitude=77.0, accuracy=10.0,
+                         timestamp=self.start + timedelta(minutes=minute))
+                for minute in minutes
+            ]
+        sharding.bulk_create_locations(fixes)
+
+    def expected(self, start=None, end=None):
+        rows = [
+            (location.timestamp, location.employee_id, location.id)
+            for employee in self.employees
+            for location in Location.objects.for_employee(employee.id)
+            if (start is None or location.timestamp >= start) and (end is None or location.timestamp < end)
+        ]
+        return sorted(rows, reverse=True)
+
+    def read_pages(self, limit, **bounds):
+        employee_ids = [employee.id for employee in self.employees]
+        rows, pages, cursor = [], 0, None
+        while True:
+            page, cursor = timeline.merged_timeline(employee_ids, limit, cursor=cursor, **bounds)
+            rows += [(location.timestamp, location.employee_id, location.id) for location in page]
+            pages += 1
+            if cursor is None:
+                return rows, pages
+
+    def test_pages_cover_every_row_once_in_order(self):
+        for limit in (1, 2, 3, 4, 14, 20):
+            rows, pages = self.read_pages(limit)
+
+            self.assertEqual(rows, self.expected(), f'limit={limit}')
+            # The last page ends without a cursor, even when exactly full
+            self.assertEqual(pages, math.ceil(14 / limit))
+
+    def test_pages_respect_the_time_range(self):
+        start = self.start + timedelta(minutes=1)
+        end = self.start + timedelta(minutes=3)
+        rows, _ = self.read_pages(3, start=start, end=end)
+
+        self.assertEqual(rows, self.expected(start, end))
+        self.assertEqual(len(rows), 7)
+
+    def test_invalid_cursor_is_rejected(self):
+        with self.assertRaises(timeline.InvalidCursor):
+            timeline.merged_timeline([self.employees[0].id], 10, cursor='not-a-cursor')
+
+
+@override_settings(OUTLIER_FILTER_MODE='quarantine', OUTLIER_MAX_SPEED=70, OUTLIER_CONFIRM_COUNT=3)
+class OutlierScreenTests(LocationTestCase):
+    """
+    Impossible-speed filter of location/outliers.py across successive batches.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.employee = User.objects.create_user(username='teleporter', password='secret')
+        self.start = datetime(2024, 5, 1, 9, 0, 0)
+
+    def fix(self, km_north, minute):
+        return Location(employee=self.employee, latitude=round(28.0 + km_north * 1000 / METERS_PER_DEGREE, 7),
+                        longitude=77.0, accuracy=10.0, timestamp=self.start + timedelta(minutes=minute))
+
+    def screen(self, *fixes):
+        accepted, rejected = outliers.screen(self.employee.id, [self.fix(*fix) for fix in fixes])
+        return self.minutes(accepted), self.minutes(rejected)
+
+    def minutes(self, rows):
+        return [int((row.timestamp - self.start).total_seconds() // 60) for row in rows]
+
+    def test_batch_is_accepted_up_to_the_first_jump(self):
+        self.assertEqual(self.screen((0, 0), (1, 1), (100, 2), (2, 3)), ([0, 1, 3], [2]))
+
+    def test_consistent_jumps_are_confirmed_across_batches(self):
+        self.screen((0, 0), (1, 1))
+
+        self.assertEqual(self.screen((100, 2)), ([], [2]))
+        self.assertEqual(self.screen((101, 3)), ([], [3]))
+        self.assertEqual(self.screen((102, 4)), ([4], []))
+        # The confirmed position is the new reference
+        self.assertEqual(self.screen((103, 5)), ([5], []))
+
+    def test_late_batch_does_not_move_the_reference_back(self):
+        self.screen((0, 60))
+        self.assertEqual(self.screen((50, 0), (50, 1)), ([0, 1], []))
+
+        # 50 km from the latest fix one minute earlier
+        self.assertEqual(self.screen((50, 61)), ([], [61]))
+
+    def test_reference_is_read_from_the_database_on_a_cache_miss(self):
+        sharding.bulk_create_locations([self.fix(0, 0)])
+
+        accepted, rejected = outliers.screen(self.employee.id, [self.fix(100, 1)])
+        self.assertEqual(accepted, [])
+        self.assertEqual(rejected[0].reference_timestamp, self.start)
+
+
+@override_settings(HEATMAP_ZOOMS=[0, 12])
+class HeatmapTileTests(LocationTestCase):
+    """
+    Heatmap tile pipeline (location/heatmap.py) and tile endpoint.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.employee = User.objects.create_user(username='mapped', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(username='cartographer', password='secret'))
+        sharding.bulk_create_locations([
+            Location(employee=self.employee, latitude=28.0, longitude=77.0, accuracy=accuracy,
+                     timestamp=datetime(2024, 5, 1, 9, minute))
+            for minute, accuracy in enumerate([10.0] * 20 + [500.0] * 5)
+        ])
+        [self.x], [self.y], [self.cell] = heatmap.project(np.array([28.0]), np.array([77.0]), 12)
+
+    def counts(self):
+        return heatmap.tile_counts(12, self.x, self.y, date(2024, 5, 1), date(2024, 5, 1))
+
+    def test_projection_places_points_in_their_tile_cell(self):
+        tile_x, tile_y, cell = heatmap.project(
+            np.array([0.0, 89.9, -89.9, 28.0]), np.array([0.0, -180.0, 180.0, 77.0]), 1
+        )
+        center = heatmap.GRID_SIZE // 2 * heatmap.GRID_SIZE + heatmap.GRID_SIZE // 2
+
+        self.assertEqual((tile_x[0], tile_y[0], cell[0]), (1, 1, 0))
+        # Poles and the antimeridian are clipped into the edge tiles
+        self.assertEqual((tile_x[1], tile_y[1], cell[1]), (0, 0, 0))
+        self.assertEqual((tile_x[2], tile_y[2], cell[2]), (1, 1, heatmap.GRID_SIZE ** 2 - 1))
+        self.assertEqual((tile_x[3], tile_y[3]), (1, 0))
+        self.assertEqual(heatmap.project(np.array([0.0]), np.array([0.0]), 0)[2][0], center)
+
+    def test_refresh_bins_only_new_accurate_fixes(self):
+        call_command('compute_heatmap_tiles', stdout=io.StringIO())
+        call_command('compute_heatmap_tiles', stdout=io.StringIO())
+
+        counts = self.counts()
+        self.assertEqual(counts[self.cell], 20)
+        self.assertEqual(counts.sum(), 20)
+
+    def test_rebuild_drops_deleted_fixes(self):
+        call_command('compute_heatmap_tiles', stdout=io.StringIO())
+        Location.objects.for_employee(self.employee.id).filter(timestamp__lt=datetime(2024, 5, 1, 9, 10)).delete()
+        call_command('compute_heatmap_tiles', stdout=io.StringIO())
+        self.assertEqual(self.counts().sum(), 20)
+
+        call_command('compute_heatmap_tiles', rebuild=True, stdout=io.StringIO())
+        self.assertEqual(self.counts().sum(), 10)
+
+    def test_tile_is_compressed_and_revalidated_with_its_etag(self):
+        call_command('compute_heatmap_tiles', stdout=io.StringIO())
+        url = f'/api/heatmap/12/{self.x}/{self.y}/?start=2024-05-01&end=2024-05-01'
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'"total":20', gzip.decompress(response.content))
+
+        # The compressed response carries a weak ETag, which still matches
+        revalidated = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+
+class ImportLocationsTests(LocationTestCase):
+    """
+    import_locations command (location/importers.py).
+    """
+
+    def setUp(self):
+        self.employee = User.objects.create_user(username='importer', password='secret')
+        handle, self.path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as csv_file:
+            csv_file.write('username,latitude,longitude,accuracy,timestamp\n')
+            for minute in range(5):
+                csv_file.write(f'importer,28.0,77.0,10,2024-05-01T09:{minute:02d}:00\n')
+            csv_file.write('nobody,28.0,77.0,10,2024-05-01T09:00:00\n')
+        self.addCleanup(os.remove, self.path)
+
+    def run_import(self):
+        output = io.StringIO()
+        call_command('import_locations', self.path, workers=0, stdout=output)
+        return output.getvalue()
+
+    def test_reimported_rows_are_reported_as_skipped(self):
+        self.assertIn('Imported 5 new row(s), skipped 0 already imported, rejected 1 of 6', self.run_import())
+        self.assertIn('Imported 0 new row(s), skipped 5 already imported, rejected 1 of 6', self.run_import())
+        self.assertEqual(Location.objects.for_employee(self.employee.id).count(), 5)
@@ -0,0 +1,94 @@
+"""
+Rate limiting for location ingest.
+
+IngestRateThrottle admits at most INGEST_BUCKET_CAPACITY requests per
+employee and device in any INGEST_BUCKET_CAPACITY / INGEST_REFILL_PER_SECOND
+seconds, the sustained rate of a token bucket with that capacity and refill
+rate. Unlike a fixed window, a burst at the end of one window cannot be
+followed by another full burst right after the boundary.
+
+The window slides over SUB_WINDOWS counters kept in the Django cache, so
+every worker process sharing the cache sees the same counts. A request is
+counted in the current sub-window and admitted when the counts covering
+the last window (the oldest sub-window in full, so the limit errs on the
+strict side) stay within the capacity. Counting uses cache.add(),
+cache.incr() and cache.decr(), which are atomic on the shared backends
+(Redis, Memcached), so concurrent requests can never overwrite each
+other's count. A rejected request is uncounted again and answers 429 with
+Retry-After set to the time until enough old sub-windows slide out.
+"""
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger('location')
+
+# Counters per window; more is smoother but reads more cache keys per request
+SUB_WINDOWS = 10
+
+
+class IngestRateThrottle(BaseThrottle):
+    """
+    Sliding-window throttle keyed by employee and device.
+    """
+    cache_format = 'location:ingest_window:{}'
+
+    def __init__(self):
+        self.capacity = int(getattr(settings, 'INGEST_BUCKET_CAPACITY', 10))
+        refill_rate = float(getattr(settings, 'INGEST_REFILL_PER_SECOND', 1.0))
+        self.window = max(1.0, self.capacity / refill_rate)
+        self.sub_window = self.window / SUB_WINDOWS
+        self._wait = None
+
+    def get_cache_key(self, request):
+        # Device tokens carry the device ID; browser sessions share one counter
+        device = request.auth.get('dev') if isinstance(request.auth, dict) else 'session'
+        return self.cache_format.format(f'{request.user.id}:{device}')
+
+    def allow_request(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return True
+
+        now = time.time()
+        current = int(now // self.sub_window)
+        prefix = self.get_cache_key(request)
+        key = f'{prefix}:{current}'
+        # A counter is only needed while it is inside the window
+        timeout = math.ceil(self.window + self.sub_window) + 1
+
+        cache.add(key, 0, timeout)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            # Evicted between add() and incr()
+            cache.add(key, 1, timeout)
+            count = 1
+
+        previous = [f'{prefix}:{index}' for index in range(current - SUB_WINDOWS, current)]
+        stored = cache.get_many(previous)
+        counts = [stored.get(previous_key, 0) for previous_key in previous]
+        excess = sum(counts) + count - self.capacity
+        if excess <= 0:
+            return True
+
+        try:
+            cache.decr(key)
+        except ValueError:
+            pass
+        # Oldest sub-windows slide out first; excess counts this request too
+        freed = 0
+        self._wait = (current + SUB_WINDOWS + 1) * self.sub_window - now
+        for offset, sub_count in enumerate(counts):
+            freed += sub_count
+            if freed >= excess:
+                self._wait = (current + offset + 1) * self.sub_window - now
+                break
+        logger.warning(f"Ingest rate limit hit for user {request.user.id} ({prefix})")
+        return False
+
+    def wait(self):
+        return self._wait
@@ -0,0 +1,116 @@
+"""
+Merged location timeline of several employees (a manager's team).
+
+Sorting `employee__in` rows by timestamp makes the database sort the whole
+union. Instead every employee is read with its own range scan on the
+(employee, -timestamp) index, in small batches fetched on demand, and the
+streams are combined with a heap-based k-way merge. A page therefore reads
+about `limit` rows plus one batch per employee, wherever it starts.
+
+Pages are addressed with a keyset cursor: the (timestamp, employee_id, id)
+of the last row returned. Rows are ordered by that triple, newest first.
+"""
+import base64
+import heapq
+import json
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+from .models import Location
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+# Rows fetched per employee scan; later batches are only read when consumed
+BATCH_SIZE = 50
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(location):
+    payload = json.dumps([location.timestamp.isoformat(), location.employee_id, location.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Return (timestamp, employee_id, location_id) from a cursor string.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, employee_id, location_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), int(employee_id), int(location_id)
+    except (TypeError, ValueError):
+        raise InvalidCursor(f'Invalid cursor "{cursor}"')
+
+
+def _after_cursor(employee_id, cursor):
+    """
+    Filter selecting the employee's rows that sort after the cursor.
+    """
+    if cursor is None:
+        return Q()
+    timestamp, cursor_employee_id, cursor_id = cursor
+    if employee_id < cursor_employee_id:
+        return Q(timestamp__lte=timestamp)
+    if employee_id > cursor_employee_id:
+        return Q(timestamp__lt=timestamp)
+    return Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=cursor_id)
+
+
+def _employee_stream(employee_id, condition):
+    """
+    Yield the employee's rows newest first, BATCH_SIZE rows per query.
+    """
+    queryset = Location.objects.for_employee(employee_id).filter(condition)
+    while True:
+        batch = list(queryset.order_by('-timestamp', '-id')[:BATCH_SIZE])
+        yield from batch
+        if len(batch) < BATCH_SIZE:
+            return
+        last = batch[-1]
+        queryset = Location.objects.for_employee(employee_id).filter(condition).filter(
+            Q(timestamp__lt=last.timestamp) | Q(timestamp=last.timestamp, id__lt=last.id)
+        )
+
+
+def merged_timeline(employee_ids, limit, cursor=None, start=None, end=None):
+    """
+    Return (locations, next cursor or None) for one page of the employees'
+    merged timeline, optionally limited to start <= timestamp < end.
+    """
+    cursor = decode_cursor(cursor) if cursor else None
+    streams = []
+    for employee_id in sorted(set(employee_ids)):
+        condition = _after_cursor(employee_id, cursor)
+        if start is not None:
+            condition &= Q(timestamp__gte=start)
+        if end is not None:
+            condition &= Q(timestamp__lt=end)
+        streams.append(_employee_stream(employee_id, condition))
+
+    merged = heapq.merge(
+        *streams,
+        key=lambda location: (location.timestamp, location.employee_id, location.id),
+        reverse=True,
+    )
+    page = []
+    for location in merged:
+        if len(page) == limit:
+            return page, encode_cursor(page[-1])
+        page.append(location)
+    return page, None
+
+
+def attach_employees(locations):
+    """
+    Set `employee` on each location from one User query; Location rows may
+    live on another database than users, so select_related cannot be used.
+    """
+    users = User.objects.in_bulk({location.employee_id for location in locations})
+    for location in locations:
+        location.employee = users.get(location.employee_id)
+    return locations
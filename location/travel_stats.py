@@ -0,0 +1,149 @@
+"""
+Daily distance and travel statistics.
+
+Stats are computed in one streaming pass over the Location rows of one
+employee and day. GPS noise is filtered with an anchor fix (see
+displacements()): a stationary phone whose fixes jitter inside their
+accuracy radius does not accumulate distance, while dense fixes of a real
+move are counted in full.
+
+Only days that received fixes after the employee's watermark are
+recomputed.
+"""
+import logging
+import math
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import TruncDate
+
+from .geo import haversine_m
+from .models import DailyTravelStats, Location
+from .watermarks import advance_watermark, lock_watermark
+
+logger = logging.getLogger('location')
+
+PIPELINE = 'travel_stats'
+CHUNK_SIZE = 5000
+
+# Fixes less accurate than this are ignored entirely
+MAX_ACCURACY_M = 100.0
+# Segments slower than this are treated as standing still
+MIN_MOVING_SPEED_MPS = 0.5
+# Segments shorter than this cannot produce a meaningful speed
+MIN_SEGMENT_SECONDS = 1.0
+
+
+def displacements(rows):
+    """
+    Yield (distance in meters, seconds) for every move of the employee.
+    `rows` yields (latitude, longitude, accuracy, timestamp) in time order.
+
+    Jitter is filtered with an anchor fix: a fix only counts as a move once
+    it lies farther from the anchor than the combined accuracy radius of
+    both; it then becomes the new anchor and the whole displacement is
+    counted. While fixes stay inside the radius at walking-pace-or-slower
+    the employee is standing still, and the anchor time follows them so a
+    later departure is not averaged over the stop.
+
+    This is a plain loop on purpose, unlike the haversine_m_array() pass
+    in outliers.py: every fix is measured against the anchor left by the
+    fixes before it, so a chunk cannot be computed in one array operation.
+    Splitting a chunk at each anchor change would cost one NumPy call per
+    fix on a drive, where every fix moves the anchor. The scalar loop
+    handles about a million fixes per second, well ahead of the database
+    iterator that feeds it.
+    """
+    anchor = None
+    for lat, lon, accuracy, timestamp in rows:
+        fix = (float(lat), float(lon), float(accuracy), timestamp)
+        if anchor is None:
+            anchor = fix
+            continue
+
+        distance = haversine_m(anchor[0], anchor[1], fix[0], fix[1])
+        seconds = (fix[3] - anchor[3]).total_seconds()
+        if distance > math.hypot(anchor[2], fix[2]):
+            yield distance, seconds
+            anchor = fix
+        elif seconds >= MIN_SEGMENT_SECONDS and distance / seconds < MIN_MOVING_SPEED_MPS:
+            anchor = (anchor[0], anchor[1], anchor[2], fix[3])
+
+
+def compute_day_stats(employee_id, day):
+    """
+    Compute travel stats of one employee for one day.
+    """
+    start = datetime.combine(day, time.min)
+    rows = Location.objects.for_employee(employee_id).filter(
+        timestamp__gte=start,
+        timestamp__lt=start + timedelta(days=1),
+        accuracy__lte=MAX_ACCURACY_M,
+    ).order_by('timestamp', 'id').values_list('latitude', 'longitude', 'accuracy', 'timestamp')
+
+    totals = {'distance_m': 0.0, 'moving_seconds': 0.0, 'max_speed_mps': 0.0, 'point_count': 0}
+
+    def counted(iterator):
+        for row in iterator:
+            totals['point_count'] += 1
+            yield row
+
+    for distance, seconds in displacements(counted(rows.iterator(chunk_size=CHUNK_SIZE))):
+        if seconds < MIN_SEGMENT_SECONDS:
+            continue
+        speed = distance / seconds
+        if speed < MIN_MOVING_SPEED_MPS:
+            continue
+        totals['distance_m'] += distance
+        totals['moving_seconds'] += seconds
+        totals['max_speed_mps'] = max(totals['max_speed_mps'], speed)
+
+    totals['moving_seconds'] = int(round(totals['moving_seconds']))
+    return totals
+
+
+def refresh_employee_stats(employee_id):
+    """
+    Recompute the stats of every day that received new fixes since the
+    last run for this employee. Returns the list of recomputed days.
+    """
+    with transaction.atomic():
+        watermark = lock_watermark(PIPELINE, employee_id)
+        new_rows = Location.objects.for_employee(employee_id).filter(
+            id__gt=watermark.last_location_id,
+        )
+        last_id = new_rows.aggregate(last_id=Max('id'))['last_id']
+        if last_id is None:
+            return []
+
+        # order_by() drops the Meta ordering, which would defeat DISTINCT
+        days = sorted(
+            new_rows.filter(id__lte=last_id)
+            .order_by()
+            .annotate(day=TruncDate('timestamp'))
+            .values_list('day', flat=True)
+            .distinct()
+        )
+        for day in days:
+            DailyTravelStats.objects.update_or_create(
+                employee_id=employee_id,
+                date=day,
+                defaults=compute_day_stats(employee_id, day),
+            )
+
+        advance_watermark(watermark, last_id)
+
+    logger.info("Travel stats refreshed for employee %s: %s day(s)", employee_id, len(days))
+    return days
+
+
+def refresh_all_stats():
+    """
+    Refresh travel stats for every employee. Returns the number of recomputed days.
+    """
+    total = 0
+    for employee_id in User.objects.values_list('id', flat=True):
+        total += len(refresh_employee_stats(employee_id))
+    return total
@@ -5,7 +5,14 @@ from .views import (
     track_location_view, 
     location_history_view,
     employee_info_view,
+    employee_travel_stats_view,
+    employee_visits_view,
     employee_list_view,
+    export_columns_view,
+    geofence_event_list_view,
+    heatmap_tile_view,
+    team_timeline_view,
+    device_token_view,
     employee_login_view,
     employee_logout_view
 )
@@ -21,6 +28,7 @@ router.register(r'locations', LocationViewSet, basename='location')
 # PUT    /api/locations/{id}/     -> update location (LocationViewSet.update)
 # PATCH  /api/locations/{id}/     -> partial update (LocationViewSet.partial_update)
 # DELETE /api/locations/{id}/     -> delete location (LocationViewSet.destroy)
+# GET    /api/locations/changes/  -> rows created/deleted since a cursor (LocationViewSet.changes)
 
 urlpatterns = [
     # ==================== Authentication ====================
@@ -34,7 +42,14 @@ urlpatterns = [
     
     # Custom API endpoints
     path('api/employee/', employee_info_view, name='employee_info'),      # GET - Current logged-in employee detail
+    path('api/employee/travel-stats/', employee_travel_stats_view, name='employee_travel_stats'),  # GET - Daily distance/travel stats
+    path('api/employee/visits/', employee_visits_view, name='employee_visits'),  # GET - Stay points for a day
     path('api/employees/', employee_list_view, name='employee_list'),     # GET - All employees list
+    path('api/device-token/', device_token_view, name='device_token'),   # POST/DELETE - Issue/revoke device tokens
+    path('api/geofence-events/', geofence_event_list_view, name='geofence_events'),  # GET - Enter/exit events for a day
+    path('api/team/timeline/', team_timeline_view, name='team_timeline'),  # GET - Merged timeline of a manager's reports
+    path('api/export/columns/', export_columns_view, name='export_columns'),  # GET - One day as memory-mappable column files
+    path('api/heatmap/<int:zoom>/<int:x>/<int:y>/', heatmap_tile_view, name='heatmap_tile'),  # GET - Precomputed density tile
     
     # ==================== Application Pages ====================
     path('history/', location_history_view, name='location_history'),     # Employee's own location history
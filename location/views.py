@@ -1,17 +1,41 @@
 from rest_framework import viewsets, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
-from rest_framework.exceptions import ValidationError, PermissionDenied
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError, PermissionDenied, ParseError, UnsupportedMediaType
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.parsers import MultiPartParser
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.auth.models import User
-from .models import Location
-from .serializers import LocationSerializer
+from django.db import IntegrityError
+from django.db.models import Count, Max, Q
+from django.http import FileResponse
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from .models import Location, GeofenceEvent, DailyTravelStats, DeviceToken, LocationOutlier, ReportingLine, Visit
+from .serializers import (
+    LocationSerializer,
+    LocationSyncSerializer,
+    TeamLocationSerializer,
+    GeofenceEventSerializer,
+    DailyTravelStatsSerializer,
+    VisitSerializer,
+)
 from .permissions import IsOwnerOrReadOnly
+from .authentication import DeviceTokenAuthentication, issue_token
+from .throttling import IngestRateThrottle
+from .parsers import CompressedJSONParser, CompressedFormParser, RequestEntityTooLarge
+from . import changes, columnar, geofencing, heatmap, outliers, sharding, timeline, travel_stats, visits
+from datetime import datetime, timedelta
+import hashlib
 import logging
 
 logger = logging.getLogger('location')
 
+# Employees per (employee, timestamp) lookup query in employee_list_view
+EMPLOYEE_LIST_BATCH_SIZE = 200
+
 
 class LocationViewSet(viewsets.ModelViewSet):
     """
@@ -20,7 +44,21 @@ class LocationViewSet(viewsets.ModelViewSet):
     """
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
+    # Devices use stateless signed tokens; the web UI keeps using the session
+    authentication_classes = [DeviceTokenAuthentication, SessionAuthentication]
+    # Ingest accepts gzip/deflate JSON and form bodies; multipart is parsed as sent
+    parser_classes = [CompressedJSONParser, CompressedFormParser, MultiPartParser]
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
+    # Actions that write new fixes and are subject to per-device rate limiting
+    ingest_actions = ['create', 'sync']
+    
+    def get_throttles(self):
+        """
+        Apply the per-device rate limit to ingest actions only.
+        """
+        if self.action in self.ingest_actions:
+            return [IngestRateThrottle()]
+        return super().get_throttles()
     
     def get_queryset(self):
         """
@@ -28,7 +66,7 @@ class LocationViewSet(viewsets.ModelViewSet):
         Supports filtering by employee_id query parameter.
         """
         try:
-            queryset = Location.objects.filter(employee=self.request.user)
+            queryset = Location.objects.for_employee(self.request.user.id)
             
             # Support filtering by employee_id (only if it matches the authenticated user)
             employee_id = self.request.query_params.get('employee_id', None)
@@ -58,17 +96,48 @@ class LocationViewSet(viewsets.ModelViewSet):
         """
         try:
             # Always use the authenticated user as the employee
-            serializer.save(employee=self.request.user)
+            location = serializer.save(employee=self.request.user)
+            # Lazy %-style arguments: formatted on the log listener thread, if sampled
             logger.info(
-                f"Location created for user {self.request.user.username} "
-                f"(ID: {self.request.user.id})"
+                "Location created for user %s (ID: %s)",
+                self.request.user.username, self.request.user.id,
+                extra={'employee_id': self.request.user.id, 'location_id': location.id},
             )
+        except IntegrityError:
+            # Duplicate client_id, handled by create()
+            raise
         except Exception as e:
             logger.error(
                 f"Error creating location for user {self.request.user.id}: {str(e)}",
                 exc_info=True
             )
             raise
+
+        # Geofence evaluation must never fail the ingest itself
+        try:
+            geofencing.evaluate_location(location)
+        except Exception as e:
+            logger.error(
+                f"Error evaluating geofences for location {location.id}: {str(e)}",
+                exc_info=True
+            )
+    
+    def screen_outliers(self, employee_id, locations):
+        """
+        Run the impossible-speed filter and record the outliers.
+        Returns (locations to store, outliers). The filter must never fail
+        the ingest itself, so errors let every location through.
+        """
+        try:
+            accepted, rejected = outliers.screen(employee_id, locations)
+            outliers.record_outliers(rejected)
+            return accepted, rejected
+        except Exception as e:
+            logger.error(
+                f"Error in outlier filter for user {employee_id}: {str(e)}",
+                exc_info=True
+            )
+            return list(locations), []
     
     def create(self, request, *args, **kwargs):
         """
@@ -77,6 +146,20 @@ class LocationViewSet(viewsets.ModelViewSet):
         try:
             serializer = self.get_serializer(data=request.data)
             serializer.is_valid(raise_exception=True)
+            fields = dict(serializer.validated_data)
+            fields.pop('employee_id', None)
+            accepted, rejected = self.screen_outliers(
+                request.user.id, [Location(employee_id=request.user.id, **fields)]
+            )
+            if not accepted:
+                return Response(
+                    {
+                        'status': 'quarantined',
+                        'detail': 'Location rejected as an outlier (implied speed '
+                                  f'{rejected[0].implied_speed:.0f} m/s from the previous fix)',
+                    },
+                    status=status.HTTP_202_ACCEPTED
+                )
             self.perform_create(serializer)
             headers = self.get_success_headers(serializer.data)
             return Response(
@@ -84,6 +167,19 @@ class LocationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_201_CREATED,
                 headers=headers
             )
+        except IntegrityError:
+            # Retried upload of a point that already exists: return the stored row
+            client_id = serializer.validated_data.get('client_id')
+            existing = Location.objects.for_employee(request.user.id).filter(
+                client_id=client_id
+            ).first() if client_id else None
+            if existing is None:
+                logger.error("Integrity error in create", exc_info=True)
+                return Response(
+                    {'error': 'An error occurred while processing your request'},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+            return Response(self.get_serializer(existing).data, status=status.HTTP_200_OK)
         except ValidationError as e:
             logger.warning(f"Validation error in create: {str(e)}")
             return Response(
@@ -98,6 +194,9 @@ class LocationViewSet(viewsets.ModelViewSet):
                 {'error': 'You do not have permission to perform this action'},
                 status=status.HTTP_403_FORBIDDEN
             )
+        except (ParseError, UnsupportedMediaType, RequestEntityTooLarge) as e:
+            logger.warning(f"Rejected request body in create: {str(e)}")
+            return Response({'error': str(e.detail)}, status=e.status_code)
         except Exception as e:
             logger.error(f"Unexpected error in create: {str(e)}", exc_info=True)
             return Response(
@@ -146,6 +245,148 @@ class LocationViewSet(viewsets.ModelViewSet):
                 {'error': 'An error occurred while retrieving locations'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Changes feed for polling clients: the rows created and the IDs of rows
+        deleted since a cursor, oldest first. Omit `since` to get the current
+        cursor without any rows (e.g. right before loading the first page).
+        Keep polling with the returned cursor while has_more is true.
+        Rows and deletions stored in the last CHANGES_LOOKBACK_SECONDS are
+        sent again below the cursor; apply them idempotently by ID.
+        
+        GET /api/locations/changes/?since=<cursor>&limit=<n>
+        """
+        employee_id = request.user.id
+        since = request.query_params.get('since')
+        try:
+            limit = min(int(request.query_params.get('limit', changes.DEFAULT_LIMIT)), changes.MAX_LIMIT)
+            if limit < 1:
+                raise ValueError(limit)
+            if since is not None:
+                changes.decode_cursor(since)
+        except (ValueError, changes.InvalidCursor):
+            return Response(
+                {'error': f'Invalid since cursor or limit (1-{changes.MAX_LIMIT})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            if since is None:
+                return Response(
+                    {'created': [], 'deleted': [], 'cursor': changes.current_cursor(employee_id),
+                     'has_more': False},
+                    status=status.HTTP_200_OK
+                )
+
+            created, deleted, cursor, has_more = changes.changes_since(employee_id, since, limit)
+            # Every row belongs to the requesting user; saves a user query per row
+            for location in created:
+                location.employee = request.user
+            return Response(
+                {
+                    'created': self.get_serializer(created, many=True).data,
+                    'deleted': deleted,
+                    'cursor': cursor,
+                    'has_more': has_more,
+                },
+                status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            logger.error(f"Error in changes feed: {str(e)}", exc_info=True)
+            return Response(
+                {'error': 'An error occurred while retrieving changes'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """
+        Idempotent batch upload of fixes recorded while offline.
+        Points are identified by their client_id; points already stored are
+        skipped by the unique (employee, client_id) constraint instead of
+        per-row existence checks, so retrying a whole batch is safe.
+        Points implying an impossible speed are quarantined (see
+        location/outliers.py). Only points newer than the employee's latest
+        stored fix are checked against geofences.
+        
+        POST /api/locations/sync/
+        {"points": [{"client_id": "...", "latitude": ..., "longitude": ...,
+                     "accuracy": ..., "timestamp": "..."}, ...]}
+        """
+        serializer = LocationSyncSerializer(data=request.data, context={'request': request})
+        if not serializer.is_valid():
+            logger.warning(f"Validation error in sync for user {request.user.id}")
+            return Response(
+                {'error': 'Invalid data provided', 'details': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            employee_id = request.user.id
+            points = {}
+            for point in serializer.validated_data['points']:
+                point.pop('employee_id', None)
+                # Keep the first copy of a client_id repeated within the batch
+                points.setdefault(point['client_id'], point)
+
+            # One query for the whole batch, only used to report duplicates
+            # and to skip geofence evaluation of points seen before
+            existing = set(
+                Location.objects.for_employee(employee_id)
+                .filter(client_id__in=list(points))
+                .values_list('client_id', flat=True)
+            )
+            new_locations = [
+                Location(employee_id=employee_id, **point)
+                for client_id, point in points.items()
+                if client_id not in existing
+            ]
+            new_locations, rejected = self.screen_outliers(employee_id, new_locations)
+            quarantined = sum(
+                1 for outlier in rejected
+                if outlier.status == LocationOutlier.STATUS_QUARANTINED
+            )
+            # Geofence memberships reflect the employee's latest fix; older
+            # (offline) fixes cannot be replayed against them
+            latest = Location.objects.for_employee(employee_id).aggregate(
+                latest=Max('timestamp')
+            )['latest']
+            sharding.bulk_create_locations(new_locations, ignore_conflicts=True)
+            logger.info(
+                "Sync for user %s: %s new, %s duplicate, %s quarantined point(s)",
+                employee_id, len(new_locations), len(existing), quarantined,
+                extra={'employee_id': employee_id},
+            )
+        except Exception as e:
+            logger.error(f"Error in sync: {str(e)}", exc_info=True)
+            return Response(
+                {'error': 'An error occurred while processing your request'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        # Geofence evaluation must never fail the ingest itself
+        try:
+            newer = [location.client_id for location in new_locations
+                     if latest is None or location.timestamp > latest]
+            if newer:
+                # bulk_create(ignore_conflicts=True) leaves the primary keys unset
+                geofencing.evaluate_locations(list(
+                    Location.objects.for_employee(employee_id).filter(client_id__in=newer)
+                ))
+        except Exception as e:
+            logger.error(f"Error evaluating geofences in sync: {str(e)}", exc_info=True)
+
+        return Response(
+            {
+                'received': len(serializer.validated_data['points']),
+                'created': len(new_locations),
+                'quarantined': quarantined,
+                'duplicates': len(serializer.validated_data['points']) - len(new_locations) - quarantined,
+            },
+            status=status.HTTP_200_OK
+        )
 
 
 
@@ -233,7 +474,6 @@ def location_history_view(request):
     return render(request, 'location_history.html')
 
 
-
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def employee_info_view(request):
@@ -245,7 +485,7 @@ def employee_info_view(request):
     """
     try:
         user = request.user
-        location_count = Location.objects.filter(employee=user).count()
+        location_count = Location.objects.for_employee(user.id).count()
         
         data = {
             'employee_id': user.id,
@@ -257,7 +497,7 @@ def employee_info_view(request):
             'is_active': user.is_active,
         }
         
-        logger.info(f"Employee info retrieved for user {user.id}")
+        logger.info("Employee info retrieved for user %s", user.id)
         return Response(data, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -268,6 +508,102 @@ def employee_info_view(request):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def employee_travel_stats_view(request):
+    """
+    API endpoint to get the current employee's daily distance and travel statistics.
+    Days that received new fixes are recomputed before responding.
+    
+    GET /api/employee/travel-stats/?start=YYYY-MM-DD&end=YYYY-MM-DD
+    """
+    try:
+        today = datetime.now().date()
+        start_param = request.query_params.get('start')
+        end_param = request.query_params.get('end')
+        start = datetime.strptime(start_param, '%Y-%m-%d').date() if start_param else today
+        end = datetime.strptime(end_param, '%Y-%m-%d').date() if end_param else max(start, today)
+    except ValueError:
+        return Response(
+            {'error': 'Invalid date, expected YYYY-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if end < start or (end - start).days > 366:
+        return Response(
+            {'error': 'Date range must be between 1 and 366 days'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        user = request.user
+        travel_stats.refresh_employee_stats(user.id)
+
+        stats = DailyTravelStats.objects.filter(
+            employee=user, date__gte=start, date__lte=end
+        )
+        serializer = DailyTravelStatsSerializer(stats, many=True)
+        total_m = sum(row.distance_m for row in stats)
+
+        data = {
+            'employee_id': user.id,
+            'start': start,
+            'end': end,
+            'total_distance_km': round(total_m / 1000, 3),
+            'days': serializer.data,
+        }
+        return Response(data, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        logger.error(f"Error retrieving travel stats: {str(e)}", exc_info=True)
+        return Response(
+            {'error': 'An error occurred while retrieving travel statistics'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def employee_visits_view(request):
+    """
+    API endpoint to get the places where the current employee spent time on a day
+    (client sites, breaks), detected from their location fixes.
+    New fixes are processed before responding.
+    
+    GET /api/employee/visits/?date=YYYY-MM-DD
+    """
+    date_param = request.query_params.get('date')
+    try:
+        day = datetime.strptime(date_param, '%Y-%m-%d') if date_param else \
+            datetime.combine(datetime.now().date(), datetime.min.time())
+    except ValueError:
+        return Response(
+            {'error': 'Invalid date, expected YYYY-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        user = request.user
+        visits.refresh_employee_visits(user.id)
+
+        # Visits overlapping the day, including ones that started the day before
+        day_visits = Visit.objects.filter(
+            employee=user,
+            arrival__lt=day + timedelta(days=1),
+            departure__gte=day,
+        ).select_related('geofence').order_by('arrival')
+
+        serializer = VisitSerializer(day_visits, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        logger.error(f"Error retrieving visits: {str(e)}", exc_info=True)
+        return Response(
+            {'error': 'An error occurred while retrieving visits'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def employee_list_view(request):
@@ -278,24 +614,52 @@ def employee_list_view(request):
     GET /api/employees/
     """
     try:
-        # Get all employees who have location records
-        employees = User.objects.filter(locations__isnull=False).distinct()
+        # Per-employee counts and latest fix, gathered from every shard.
+        # Both queries are answered from the (employee, -timestamp) index:
+        # one grouped scan, then index lookups of (employee, latest timestamp).
+        def gather(queryset):
+            summary = list(
+                queryset.order_by()
+                .values('employee_id')
+                .annotate(location_count=Count('id'), latest_timestamp=Max('timestamp'))
+            )
+            latest = {}
+            for start in range(0, len(summary), EMPLOYEE_LIST_BATCH_SIZE):
+                pairs = Q()
+                for item in summary[start:start + EMPLOYEE_LIST_BATCH_SIZE]:
+                    pairs |= Q(employee_id=item['employee_id'], timestamp=item['latest_timestamp'])
+                for row in queryset.filter(pairs).order_by().values(
+                    'id', 'employee_id', 'latitude', 'longitude', 'accuracy', 'timestamp'
+                ):
+                    # Fixes sharing the latest timestamp: keep the last received
+                    current = latest.get(row['employee_id'])
+                    if current is None or row['id'] > current['id']:
+                        latest[row['employee_id']] = row
+            return summary, latest
+
+        counts = {}
+        latest_locations = {}
+        for summary, latest in sharding.scatter(gather):
+            for item in summary:
+                counts[item['employee_id']] = item['location_count']
+            latest_locations.update(latest)
+
+        employees = User.objects.filter(id__in=counts.keys())
         
         data = []
         for emp in employees:
-            location_count = Location.objects.filter(employee=emp).count()
-            latest_location = Location.objects.filter(employee=emp).first()
+            latest_location = latest_locations.get(emp.id)
             
             data.append({
                 'employee_id': emp.id,
                 'username': emp.username,
                 'email': emp.email,
-                'location_count': location_count,
+                'location_count': counts[emp.id],
                 'latest_location': {
-                    'latitude': str(latest_location.latitude) if latest_location else None,
-                    'longitude': str(latest_location.longitude) if latest_location else None,
-                    'accuracy': str(latest_location.accuracy) if latest_location else None,
-                    'timestamp': latest_location.timestamp if latest_location else None,
+                    'latitude': str(latest_location['latitude']),
+                    'longitude': str(latest_location['longitude']),
+                    'accuracy': str(latest_location['accuracy']),
+                    'timestamp': latest_location['timestamp'],
                 } if latest_location else None
             })
         
@@ -308,3 +672,261 @@ def employee_list_view(request):
             {'error': 'An error occurred while retrieving employee list'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def geofence_event_list_view(request):
+    """
+    API endpoint to get the authenticated employee's geofence enter/exit events.
+    Events are filtered to a single day (defaults to today).
+    
+    GET /api/geofence-events/?date=YYYY-MM-DD
+    """
+    date_param = request.query_params.get('date')
+    try:
+        day = datetime.strptime(date_param, '%Y-%m-%d') if date_param else \
+            datetime.combine(datetime.now().date(), datetime.min.time())
+    except ValueError:
+        return Response(
+            {'error': 'Invalid date, expected YYYY-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        # Range filter keeps the (employee, -timestamp) index usable
+        events = GeofenceEvent.objects.filter(
+            employee=request.user,
+            timestamp__gte=day,
+            timestamp__lt=day + timedelta(days=1),
+        ).select_related('geofence')
+
+        serializer = GeofenceEventSerializer(events, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        logger.error(f"Error retrieving geofence events: {str(e)}", exc_info=True)
+        return Response(
+            {'error': 'An error occurred while retrieving geofence events'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def team_timeline_view(request):
+    """
+    API endpoint to get the merged location timeline of the current manager's
+    reports, newest first, optionally limited to one day.
+    Pass the returned next_cursor back as `cursor` to get the next page.
+    
+    GET /api/team/timeline/?date=YYYY-MM-DD&limit=<n>&cursor=<cursor>
+    """
+    date_param = request.query_params.get('date')
+    try:
+        limit = min(int(request.query_params.get('limit', timeline.DEFAULT_LIMIT)), timeline.MAX_LIMIT)
+        if limit < 1:
+            raise ValueError(limit)
+        day = datetime.strptime(date_param, '%Y-%m-%d') if date_param else None
+    except ValueError:
+        return Response(
+            {'error': f'Invalid date (YYYY-MM-DD) or limit (1-{timeline.MAX_LIMIT})'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        report_ids = list(
+            ReportingLine.objects.filter(manager=request.user).values_list('employee_id', flat=True)
+        )
+        if not report_ids:
+            return Response(
+                {'error': 'You have no reports'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        locations, next_cursor = timeline.merged_timeline(
+            report_ids,
+            limit,
+            cursor=request.query_params.get('cursor'),
+            start=day,
+            end=day + timedelta(days=1) if day else None,
+        )
+        serializer = TeamLocationSerializer(timeline.attach_employees(locations), many=True)
+        return Response(
+            {'results': serializer.data, 'next_cursor': next_cursor},
+            status=status.HTTP_200_OK
+        )
+
+    except timeline.InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"Error retrieving team timeline: {str(e)}", exc_info=True)
+        return Response(
+            {'error': 'An error occurred while retrieving the team timeline'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_columns_view(request):
+    """
+    API endpoint to download one day of location fixes as column files that
+    can be memory-mapped with NumPy (see location/columnar.py), packed in an
+    uncompressed tar (gzip/deflate transfer compression is negotiated with
+    Accept-Encoding). Use the export_columns command for incremental exports.
+    
+    GET /api/export/columns/?date=YYYY-MM-DD&employee_id=<id>
+    """
+    try:
+        date_param = request.query_params.get('date')
+        day = datetime.strptime(date_param, '%Y-%m-%d').date() if date_param else datetime.now().date()
+        employee_id = request.query_params.get('employee_id')
+        employee_id = int(employee_id) if employee_id else None
+    except ValueError:
+        return Response(
+            {'error': 'Invalid date (YYYY-MM-DD) or employee_id'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        archive = columnar.export_archive(day, employee_id)
+        return FileResponse(
+            archive,
+            as_attachment=True,
+            filename=f'locations-{day:%Y-%m-%d}.tar',
+            content_type='application/x-tar'
+        )
+    except Exception as e:
+        logger.error(f"Error exporting location columns: {str(e)}", exc_info=True)
+        return Response(
+            {'error': 'An error occurred while exporting locations'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def heatmap_tile_view(request, zoom, x, y):
+    """
+    API endpoint to get the precomputed location density of one map tile
+    (Web Mercator z/x/y), summed over a date range (defaults to the last 7 days).
+    `counts` is a row-major grid of grid_size x grid_size cells, north-west first.
+    Responses carry ETag/Last-Modified and may be cached for HEATMAP_TILE_MAX_AGE.
+    
+    GET /api/heatmap/<zoom>/<x>/<y>/?start=YYYY-MM-DD&end=YYYY-MM-DD
+    """
+    if zoom not in heatmap.zooms() or x >= 2 ** zoom or y >= 2 ** zoom:
+        return Response(
+            {'error': f'Tile not available, precomputed zoom levels: {heatmap.zooms()}'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    try:
+        today = datetime.now().date()
+        start_param = request.query_params.get('start')
+        end_param = request.query_params.get('end')
+        end = datetime.strptime(end_param, '%Y-%m-%d').date() if end_param else today
+        start = datetime.strptime(start_param, '%Y-%m-%d').date() if start_param else \
+            end - timedelta(days=6)
+    except ValueError:
+        return Response(
+            {'error': 'Invalid date, expected YYYY-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if end < start or (end - start).days > 366:
+        return Response(
+            {'error': 'Date range must be between 1 and 366 days'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        # Answer conditional requests before decoding any counts
+        last_updated, tile_rows = heatmap.tile_version(zoom, x, y, start, end)
+        etag = quote_etag(hashlib.md5(
+            f'{zoom}/{x}/{y}/{start}/{end}/{last_updated}/{tile_rows}'.encode()
+        ).hexdigest())
+        last_modified = int(last_updated.timestamp()) if last_updated else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+        if response is None:
+            counts = heatmap.tile_counts(zoom, x, y, start, end)
+            response = Response(
+                {
+                    'zoom': zoom,
+                    'x': x,
+                    'y': y,
+                    'start': start,
+                    'end': end,
+                    'grid_size': heatmap.GRID_SIZE,
+                    'total': int(counts.sum()),
+                    'max': int(counts.max()),
+                    'counts': counts.tolist(),
+                },
+                status=status.HTTP_200_OK
+            )
+
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, max_age=settings.HEATMAP_TILE_MAX_AGE)
+        return response
+
+    except Exception as e:
+        logger.error(f"Error retrieving heatmap tile {zoom}/{x}/{y}: {str(e)}", exc_info=True)
+        return Response(
+            {'error': 'An error occurred while retrieving the heatmap tile'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['POST', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def device_token_view(request):
+    """
+    API endpoint to manage device tokens of the current employee.
+    POST issues a signed token for a device; DELETE revokes all tokens of a device.
+    
+    POST   /api/device-token/   {"device_id": "..."}
+    DELETE /api/device-token/   {"device_id": "..."}
+    """
+    device_id = str(request.data.get('device_id', '')).strip()
+    if not device_id or len(device_id) > 100:
+        return Response(
+            {'error': 'device_id is required (max 100 characters)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        if request.method == 'DELETE':
+            tokens = DeviceToken.objects.filter(
+                employee_id=request.user.id, device_id=device_id, revoked=False
+            )
+            revoked = 0
+            # save() per token so the revocation signal fires
+            for device_token in tokens:
+                device_token.revoked = True
+                device_token.save(update_fields=['revoked'])
+                revoked += 1
+            logger.info(f"Revoked {revoked} device token(s) for user {request.user.id}")
+            return Response({'revoked': revoked}, status=status.HTTP_200_OK)
+
+        user = request.user
+        token, device_token = issue_token(user, device_id)
+        logger.info(f"Device token issued for user {user.id} (device {device_id})")
+        return Response(
+            {
+                'token': token,
+                'device_id': device_id,
+                'expires_at': device_token.expires_at,
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+    except Exception as e:
+        logger.error(f"Error managing device token: {str(e)}", exc_info=True)
+        return Response(
+            {'error': 'An error occurred while processing the device token'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
@@ -0,0 +1,169 @@
+"""
+Stay-point (visit) detection.
+
+An employee's fixes are walked once in (timestamp, id) order and grouped
+into clusters: a fix joins the current cluster while it lies within
+STAY_RADIUS_M of the cluster centroid and follows the previous fix within
+MAX_GAP_SECONDS. A cluster lasting at least MIN_STAY_SECONDS becomes a Visit.
+
+Each run only reads fixes from the start of the cluster that was still open
+at the end of the previous run (kept in the watermark's resume_timestamp).
+Fixes that arrive late with older timestamps (offline sync) restart
+detection right after the last visit that ended before them; the visits
+after that point are rebuilt.
+"""
+import logging
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max, Min
+
+from . import geofencing
+from .geo import haversine_m
+from .models import Location, Visit
+from .watermarks import advance_watermark, lock_watermark
+
+logger = logging.getLogger('location')
+
+PIPELINE = 'visits'
+CHUNK_SIZE = 5000
+
+# Fixes within this distance of the cluster centroid belong to the same stay
+STAY_RADIUS_M = 100.0
+# Clusters shorter than this are just passing through
+MIN_STAY_SECONDS = 300
+# A longer silence between two fixes ends the stay
+MAX_GAP_SECONDS = 2 * 3600
+# Fixes less accurate than this cannot place the employee inside the radius
+MAX_ACCURACY_M = 100.0
+
+
+class Cluster:
+    """
+    Running centroid and time span of consecutive nearby fixes.
+    """
+    __slots__ = ('lat_sum', 'lon_sum', 'count', 'arrival', 'departure')
+
+    def __init__(self, lat, lon, timestamp):
+        self.lat_sum = lat
+        self.lon_sum = lon
+        self.count = 1
+        self.arrival = timestamp
+        self.departure = timestamp
+
+    @property
+    def centroid(self):
+        return self.lat_sum / self.count, self.lon_sum / self.count
+
+    @property
+    def duration_seconds(self):
+        return (self.departure - self.arrival).total_seconds()
+
+    def accepts(self, lat, lon, timestamp):
+        if (timestamp - self.departure).total_seconds() > MAX_GAP_SECONDS:
+            return False
+        return haversine_m(*self.centroid, lat, lon) <= STAY_RADIUS_M
+
+    def add(self, lat, lon, timestamp):
+        self.lat_sum += lat
+        self.lon_sum += lon
+        self.count += 1
+        self.departure = timestamp
+
+    def to_visit(self, employee_id, index):
+        lat, lon = self.centroid
+        matched = index.match(lat, lon)
+        return Visit(
+            employee_id=employee_id,
+            latitude=round(lat, 7),
+            longitude=round(lon, 7),
+            arrival=self.arrival,
+            departure=self.departure,
+            point_count=self.count,
+            geofence_id=min(matched) if matched else None,
+        )
+
+
+def detect_visits(rows):
+    """
+    Group (latitude, longitude, timestamp) rows, ordered by time, into
+    clusters. Returns (closed stays, last cluster); the last cluster may
+    still grow with later fixes.
+    """
+    stays = []
+    cluster = None
+    for lat, lon, timestamp in rows:
+        lat = float(lat)
+        lon = float(lon)
+        if cluster is not None and cluster.accepts(lat, lon, timestamp):
+            cluster.add(lat, lon, timestamp)
+            continue
+        if cluster is not None and cluster.duration_seconds >= MIN_STAY_SECONDS:
+            stays.append(cluster)
+        cluster = Cluster(lat, lon, timestamp)
+    return stays, cluster
+
+
+def refresh_employee_visits(employee_id):
+    """
+    Detect the visits of one employee from the fixes received since the
+    last run. Returns the number of visits (re)built.
+    """
+    with transaction.atomic():
+        watermark = lock_watermark(PIPELINE, employee_id)
+        locations = Location.objects.for_employee(employee_id)
+        summary = locations.filter(id__gt=watermark.last_location_id).aggregate(
+            last_id=Max('id'), earliest=Min('timestamp')
+        )
+        last_id = summary['last_id']
+        if last_id is None:
+            return 0
+
+        visits = Visit.objects.filter(employee_id=employee_id)
+        fixes = locations.filter(id__lte=last_id, accuracy__lte=MAX_ACCURACY_M)
+        resume = watermark.resume_timestamp
+        if resume is not None and summary['earliest'] >= resume:
+            # New fixes only extend the open cluster
+            fixes = fixes.filter(timestamp__gte=resume)
+            visits = visits.filter(departure__gte=resume)
+        else:
+            # First run or late fixes: clusters never span a closed visit,
+            # so detection can restart right after the last one before them
+            previous = Visit.objects.filter(
+                employee_id=employee_id, departure__lt=summary['earliest']
+            ).order_by('-departure').values_list('departure', flat=True).first()
+            if previous is not None:
+                fixes = fixes.filter(timestamp__gt=previous)
+                visits = visits.filter(departure__gt=previous)
+        visits.delete()
+
+        stays, cluster = detect_visits(
+            fixes.order_by('timestamp', 'id')
+            .values_list('latitude', 'longitude', 'timestamp')
+            .iterator(chunk_size=CHUNK_SIZE)
+        )
+        if cluster is not None:
+            # Report an ongoing stay; it is rebuilt from resume_timestamp next run
+            if cluster.duration_seconds >= MIN_STAY_SECONDS:
+                stays.append(cluster)
+            watermark.resume_timestamp = cluster.arrival
+            watermark.save(update_fields=['resume_timestamp', 'updated_at'])
+
+        index = geofencing.get_index()
+        Visit.objects.bulk_create(
+            [stay.to_visit(employee_id, index) for stay in stays], batch_size=1000
+        )
+        advance_watermark(watermark, last_id)
+
+    logger.info("Visits refreshed for employee %s: %s visit(s)", employee_id, len(stays))
+    return len(stays)
+
+
+def refresh_all_visits():
+    """
+    Refresh visits for every employee. Returns the number of visits (re)built.
+    """
+    total = 0
+    for employee_id in User.objects.values_list('id', flat=True):
+        total += refresh_employee_visits(employee_id)
+    return total
@@ -0,0 +1,24 @@
+"""
+Progress tracking for incremental pipelines that consume Location rows by ID.
+"""
+from .models import ProcessingWatermark
+
+
+def lock_watermark(pipeline, employee_id=None):
+    """
+    Fetch (creating if needed) and row-lock the watermark of a pipeline.
+    Must be called inside transaction.atomic() so concurrent runs serialize.
+    """
+    ProcessingWatermark.objects.get_or_create(pipeline=pipeline, employee_id=employee_id)
+    return ProcessingWatermark.objects.select_for_update().get(
+        pipeline=pipeline, employee_id=employee_id
+    )
+
+
+def advance_watermark(watermark, last_location_id):
+    """
+    Move the watermark forward; never moves it backwards.
+    """
+    if last_location_id and last_location_id > watermark.last_location_id:
+        watermark.last_location_id = last_location_id
+        watermark.save(update_fields=['last_location_id', 'updated_at'])